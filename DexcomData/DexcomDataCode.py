@@ -0,0 +1,842 @@
+import datetime
+import requests
+import webbrowser
+import threading
+import time
+from typing import Callable, Optional, Dict, Any, Iterable, Iterator, List, Tuple, Union
+import datetime
+
+from .transport import DexcomTransport, get_default_transport
+from .records import latest_record
+from .readings import Reading, ReadingSeries, RecordLike
+from .timestamps import format_utc, to_epoch
+from .store import ReadingStore
+from .cadence import CadenceScheduler
+from .alerts import AlertEngine
+from .dispatch import CallbackDispatcher
+from .metrics import RollingMetrics
+from .trend import TrendEstimator
+from .backfill import Backfill
+from .decoding import Decoder, iter_records, loads
+from .singleflight import SingleFlight
+from .units import mg_dl_to_mmol_l
+
+def format_glucose_reading(reading: Dict[str, Any]) -> str:
+    """Format glucose reading for display"""
+    if not reading:
+        return "No reading available"
+    
+    value = reading.get('value', 0)
+    
+    # Convert to mmol/L
+    mmol_value = mg_dl_to_mmol_l(value)
+    
+    # Format timestamp
+    if isinstance(reading, Reading):
+        formatted_time = format_utc(reading.system_time)
+    else:
+        system_time = reading.get('systemTime', '')
+        try:
+            formatted_time = format_utc(to_epoch(system_time))
+        except (TypeError, ValueError):
+            formatted_time = system_time
+    
+    return f"Glucose: {value} mg/dL ({mmol_value} mmol/L) at {formatted_time}"
+
+
+def format_readings(readings: Union[ReadingSeries, Iterable[RecordLike]]) -> List[str]:
+    """Format many readings like format_glucose_reading, in one pass
+    
+    Timestamps are parsed at most once (not at all for a ReadingSeries)
+    and the mmol/L column is converted in a single vectorized call.
+    """
+    if isinstance(readings, ReadingSeries):
+        times = readings.system_time
+        values = readings.value
+    else:
+        parsed = [r if isinstance(r, Reading) else Reading.from_dict(r) for r in readings]
+        times = [r.system_time for r in parsed]
+        values = [r.value or 0 for r in parsed]
+    mmol_values = mg_dl_to_mmol_l(values)
+    
+    return [f"Glucose: {value} mg/dL ({mmol_value} mmol/L) at {format_utc(ts)}"
+            for ts, value, mmol_value in zip(times, values, mmol_values)]
+
+class DexcomAuth:
+    """Handle Dexcom API authentication"""
+    
+    def __init__(self, client_id: str, client_secret: str, 
+                 redirect_uri: str = 'http://localhost:5000/callback',
+                 base_url: str = 'https://api.dexcom.jp/v2',
+                 transport: Optional[DexcomTransport] = None,
+                 refresh_margin: float = 300,
+                 retry_interval: float = 30):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.auth_url = f'{base_url}/oauth2/login'
+        self.token_url = f'{base_url}/oauth2/token'
+        self.transport = transport or get_default_transport()
+        
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None  # epoch seconds, from expires_in
+        
+        # Refresh this many seconds before expiry; retry failures this often
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        
+        # Concurrent refreshes are collapsed onto whichever caller holds the lock
+        self._refresh_lock = threading.Lock()
+        self._token_generation = 0
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._auto_refresh = False
+    
+    def get_auth_url(self) -> str:
+        params = {
+            'client_id': self.client_id,
+            'redirect_uri': self.redirect_uri,
+            'response_type': 'code',
+            'scope': 'offline_access'
+        }
+        return self.auth_url + '?' + requests.compat.urlencode(params)
+    
+    def open_browser_auth(self) -> None:
+        url = self.get_auth_url()
+        print("Opening browser for Dexcom authentication...")
+        webbrowser.open(url)
+    
+    def exchange_code_for_tokens(self, auth_code: str) -> bool:
+        """Exchange authorization code for access tokens"""
+        payload = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'code': auth_code,
+            'grant_type': 'authorization_code',
+            'redirect_uri': self.redirect_uri
+        }
+        
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        
+        try:
+            print("Requesting access token...")
+            response = self.transport.post(self.token_url, data=payload, headers=headers)
+            response.raise_for_status()
+            token_data = response.json()
+            
+            with self._refresh_lock:
+                self._store_tokens(token_data)
+            
+            print("Access token retrieved successfully")
+            return True
+            
+        except requests.exceptions.RequestException as e:
+            print(f"Error getting access token: {e}")
+            return False
+    
+    def _store_tokens(self, token_data: Dict[str, Any]) -> None:
+        """Save a token response (caller holds _refresh_lock)"""
+        self.access_token = token_data['access_token']
+        self.refresh_token = token_data.get('refresh_token', self.refresh_token)
+        expires_in = token_data.get('expires_in')
+        self.expires_at = time.time() + float(expires_in) if expires_in else None
+        self._token_generation += 1
+        self._schedule_refresh()
+    
+    def refresh_access_token(self) -> bool:
+        """Refresh the access token using refresh token
+        
+        Callers that arrive while another refresh is in flight wait for it
+        and share its result instead of sending a second request.
+        """
+        generation = self._token_generation
+        with self._refresh_lock:
+            if self._token_generation != generation:
+                return self.access_token is not None
+            
+            if not self.refresh_token:
+                print("No refresh token available. Re-authentication required.")
+                return False
+            
+            payload = {
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'grant_type': 'refresh_token',
+                'refresh_token': self.refresh_token,
+                'redirect_uri': self.redirect_uri
+            }
+            
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+            
+            try:
+                print("Refreshing access token...")
+                response = self.transport.post(self.token_url, data=payload, headers=headers)
+                response.raise_for_status()
+                
+                self._store_tokens(response.json())
+                
+                print("Access token refreshed successfully")
+                return True
+                
+            except Exception as e:
+                print(f"Error refreshing token: {e}")
+                # Keep a token that has not expired yet; the timer retries soon
+                if self.expires_at is None or time.time() >= self.expires_at:
+                    self.access_token = None
+                self._schedule_refresh(retry=True)
+                return False
+    
+    def token_expires_in(self) -> Optional[float]:
+        """Seconds until the access token expires (None if unknown)"""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+    
+    def get_access_token(self) -> Optional[str]:
+        """Return an access token that is not about to expire, refreshing first if needed"""
+        remaining = self.token_expires_in()
+        if remaining is not None and remaining <= self.refresh_margin:
+            self.refresh_access_token()
+        return self.access_token
+    
+    def start_auto_refresh(self) -> None:
+        """Refresh the token on a background timer ahead of its expiry"""
+        with self._refresh_lock:
+            self._auto_refresh = True
+            self._schedule_refresh()
+    
+    def stop_auto_refresh(self) -> None:
+        """Cancel the background refresh timer"""
+        with self._refresh_lock:
+            self._auto_refresh = False
+            if self._refresh_timer:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+    
+    @property
+    def auto_refresh_enabled(self) -> bool:
+        return self._auto_refresh
+    
+    def _schedule_refresh(self, retry: bool = False) -> None:
+        """(Re)arm the refresh timer (caller holds _refresh_lock)"""
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if not self._auto_refresh or not self.refresh_token:
+            return
+        
+        if retry:
+            delay = self.retry_interval
+        elif self.expires_at is not None:
+            delay = max(self.expires_at - self.refresh_margin - time.time(), 0)
+        else:
+            return
+        
+        self._refresh_timer = threading.Timer(delay, self.refresh_access_token)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+    
+    def is_authenticated(self) -> bool:
+        """Check if currently authenticated"""
+        return self.access_token is not None
+
+
+"""Data retrieval module for Dexcom API"""
+
+class DexcomData:
+    """Handle Dexcom glucose data retrieval"""
+    
+    # Longest window the EGV endpoint serves in a single request
+    MAX_WINDOW = datetime.timedelta(days=30)
+    
+    def __init__(self, base_url: str = 'https://api.dexcom.jp/v3',
+                 transport: Optional[DexcomTransport] = None,
+                 verbose: bool = True,
+                 decoder: Optional[Decoder] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 coalesce: bool = True,
+                 history_retention: Optional[datetime.timedelta] = datetime.timedelta(hours=24)):
+        self.data_url = f'{base_url}/users/self/egvs'
+        self.data_range_url = f'{base_url}/users/self/dataRange'
+        self.transport = transport or get_default_transport()
+        self.verbose = verbose  # print progress for every request (errors always print)
+        self.decoder = decoder or loads  # bytes -> parsed JSON (orjson when installed)
+        
+        # Identical concurrent fetches share one request and its parsed result;
+        # pass SingleFlight(ttl=...) to also reuse results for a few seconds
+        self.single_flight = (single_flight or SingleFlight()) if coalesce else None
+        
+        # Incremental mode state, keyed by account
+        self.last_seen: Dict[str, int] = {}  # epoch seconds of newest systemTime
+        self.history: Dict[str, ReadingSeries] = {}
+        # history[account] keeps readings this close to its newest one (None keeps all)
+        self.history_retention = history_retention
+        
+        # [first, last] EGV systemTimes per account, from get_data_range
+        self.data_ranges: Dict[str, Tuple[int, int]] = {}
+    
+    def get_glucose_data(self, access_token: str, 
+                        hours_back: int = 6,
+                        start_time: Optional[datetime.datetime] = None,
+                        end_time: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+        """Fetch EGV records for the last hours_back hours or [start_time, end_time] (UTC)
+        
+        Concurrent calls for the same token and window share one request
+        (and, if single_flight has a ttl, its result is reused that long),
+        so the returned dict may be shared and should not be modified.
+        """
+        if self.single_flight is None:
+            return self._fetch_glucose_data(access_token, hours_back, start_time, end_time)
+        # A relative window ("last 6 hours") is keyed as requested; the
+        # ttl bounds how far its end can lag behind now
+        window = (hours_back if start_time is None else None,
+                  start_time.isoformat() if start_time else None,
+                  end_time.isoformat() if end_time else None)
+        return self.single_flight.do(
+            (access_token, 'egvs', window),
+            lambda: self._fetch_glucose_data(access_token, hours_back, start_time, end_time),
+            cacheable=lambda data: 'error' not in data)
+    
+    def _fetch_glucose_data(self, access_token: str, hours_back: int,
+                            start_time: Optional[datetime.datetime],
+                            end_time: Optional[datetime.datetime]) -> Dict[str, Any]:
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json'
+        }
+        params, description = self._window_params(hours_back, start_time, end_time)
+        
+        response = None
+        try:
+            if self.verbose:
+                print(f"Fetching glucose data from {description}...")
+            response = self.transport.get(self.data_url, headers=headers, params=params)
+            response.raise_for_status()
+            
+            data = self.decoder(response.content)
+            if not isinstance(data, dict):
+                raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+            record_count = len(data.get('records', []))
+            if self.verbose:
+                print(f"Retrieved {record_count} glucose readings")
+            
+            return data
+            
+        # ValueError: a 200 whose body is not JSON (e.g. a proxy's HTML page)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching glucose data: {e}")
+            return {
+                'error': str(e), 
+                'status_code': getattr(response, 'status_code', 'unknown'),
+                'records': []
+            }
+    
+    def _window_params(self, hours_back: int, start_time: Optional[datetime.datetime],
+                       end_time: Optional[datetime.datetime]):
+        """(query params, description) for the last hours_back hours or [start_time, end_time]"""
+        if end_time is None:
+            end_time = datetime.datetime.now(datetime.timezone.utc)
+        if start_time is None:
+            start_time = end_time - datetime.timedelta(hours=hours_back)
+            description = f"last {hours_back} hours"
+        else:
+            description = f"{start_time:%Y-%m-%d %H:%M:%S} to {end_time:%Y-%m-%d %H:%M:%S}"
+        
+        params = {
+            'startDate': start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'endDate': end_time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        return params, description
+    
+    def iter_glucose_data(self, access_token: str,
+                          hours_back: int = 6,
+                          start_time: Optional[datetime.datetime] = None,
+                          end_time: Optional[datetime.datetime] = None,
+                          chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+        """Stream EGV records as the response body arrives
+        
+        Records are yielded in response order (newest first) while the
+        download is still running, and the full body is never held in
+        memory. Unlike get_glucose_data, request failures raise
+        requests.RequestException and a body that is not an EGV response
+        raises ValueError.
+        """
+        headers = {'Authorization': f'Bearer {access_token}'}
+        params, description = self._window_params(hours_back, start_time, end_time)
+        if self.verbose:
+            print(f"Streaming glucose data from {description}...")
+        
+        response = self.transport.get(self.data_url, headers=headers, params=params, stream=True)
+        try:
+            response.raise_for_status()
+            yield from iter_records(response.iter_content(chunk_size))
+        finally:
+            response.close()
+    
+    def get_new_readings(self, access_token: str, account: str = 'self',
+                         hours_back: int = 6) -> Optional[List[Reading]]:
+        """Fetch only readings newer than the last one seen for this account
+        
+        The first call fetches the last hours_back hours; later calls ask
+        for startDate just after the newest systemTime seen so far. New
+        readings are merged into history[account] without duplicates and
+        returned oldest first; readings older than history_retention before
+        the newest are dropped from it. Returns None if the request failed.
+        """
+        start_time, end_time = self._incremental_window(account, hours_back)
+        data = self.get_glucose_data(access_token, start_time=start_time, end_time=end_time)
+        if 'error' in data:
+            return None
+        return self._merge_incremental(account, data)
+    
+    def _incremental_window(self, account: str, hours_back: int):
+        """(start_time, end_time) covering everything after the last reading seen"""
+        end_time = datetime.datetime.now(datetime.timezone.utc)
+        last = self.last_seen.get(account)
+        if last is None:
+            start_time = end_time - datetime.timedelta(hours=hours_back)
+        else:
+            start_time = datetime.datetime.fromtimestamp(last + 1, datetime.timezone.utc)
+            start_time = max(start_time, end_time - self.MAX_WINDOW)
+        return start_time, end_time
+    
+    def _merge_incremental(self, account: str, data: Dict[str, Any]) -> List[Reading]:
+        """Merge a response into history[account], returning the new readings oldest first"""
+        last = self.last_seen.get(account)
+        history = self.history.setdefault(account, ReadingSeries())
+        readings = [Reading.from_dict(r) for r in data.get('records', []) if r.get('systemTime')]
+        if last is not None:
+            readings = [r for r in readings if r.system_time > last]
+        # The API returns newest first; inserting oldest first makes every
+        # insert an append instead of a shift of the whole series
+        readings.sort(key=lambda r: r.system_time)
+        new_readings = history.extend(readings)
+        if new_readings:
+            self.last_seen[account] = history.latest_time
+            if self.history_retention is not None:
+                history.drop_before(history.latest_time - int(self.history_retention.total_seconds()))
+        return new_readings
+    
+    def get_range(self, access_token: str, start_time: datetime.datetime,
+                  end_time: datetime.datetime, store: ReadingStore,
+                  account: str = 'self',
+                  settle_time: datetime.timedelta = datetime.timedelta(hours=1)) -> ReadingSeries:
+        """Readings in [start_time, end_time], answered from the store first
+        
+        Only intervals the store has not fetched before are requested from
+        the API (in MAX_WINDOW chunks). Intervals newer than settle_time are
+        not marked as fetched, since late readings may still arrive there.
+        """
+        start = int(start_time.timestamp())
+        end = int(end_time.timestamp())
+        settled = int((datetime.datetime.now(datetime.timezone.utc) - settle_time).timestamp())
+        window = int(self.MAX_WINDOW.total_seconds())
+        
+        for gap_start, gap_end in store.missing_intervals(account, start, end):
+            chunk_start = gap_start
+            while chunk_start < gap_end:
+                chunk_end = min(chunk_start + window, gap_end)
+                data = self.get_glucose_data(
+                    access_token,
+                    start_time=datetime.datetime.fromtimestamp(chunk_start, datetime.timezone.utc),
+                    end_time=datetime.datetime.fromtimestamp(chunk_end, datetime.timezone.utc))
+                if 'error' in data:
+                    break
+                store.upsert(account, (r for r in data.get('records', []) if r.get('systemTime')))
+                store.mark_fetched(account, chunk_start, min(chunk_end, settled))
+                chunk_start = chunk_end
+        
+        return store.query(account, start, end)
+    
+    def backfill(self, access_token, start_time: datetime.datetime,
+                 end_time: datetime.datetime, sink, account: str = 'self',
+                 **options) -> Dict[str, Any]:
+        """Fetch a long range in parallel windows, streaming readings to sink in time order
+        
+        sink is a ReadingStore or a callable taking a list of Readings;
+        options (max_workers, rate_limit, checkpoint, window, ...) are
+        passed to Backfill.
+        """
+        return Backfill(self, **options).run(access_token, start_time, end_time, sink,
+                                             account=account)
+    
+    def reset_incremental(self, account: Optional[str] = None) -> None:
+        """Forget incremental state for one account, or all accounts"""
+        if account is None:
+            self.last_seen.clear()
+            self.history.clear()
+        else:
+            self.last_seen.pop(account, None)
+            self.history.pop(account, None)
+    
+    def get_latest_reading(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """Get the most recent glucose reading (shares get_glucose_data's 6-hour fetch)"""
+        data = self.get_glucose_data(access_token, hours_back=6)
+        
+        return latest_record(data.get('records') or [])
+    
+    def get_data_range(self, access_token: str, account: str = 'self',
+                       refresh: bool = False) -> Optional[Tuple[int, int]]:
+        """[first, last] EGV systemTimes (epoch seconds), or None if there is no data
+        
+        Asks the dataRange endpoint, which returns only the bounds, and
+        falls back to probing small windows if that endpoint fails. The
+        result is cached per account until refresh=True.
+        """
+        if not refresh and account in self.data_ranges:
+            return self.data_ranges[account]
+        
+        bounds = self._request_data_range(access_token)
+        if bounds is False:
+            bounds = self._probe_data_range(access_token)
+        if bounds is not None:
+            self.data_ranges[account] = bounds
+        else:
+            self.data_ranges.pop(account, None)
+        return bounds
+    
+    def _request_data_range(self, access_token: str):
+        """Bounds from the dataRange endpoint; None if it reports no EGVs, False if it failed"""
+        headers = {'Authorization': f'Bearer {access_token}'}
+        try:
+            response = self.transport.get(self.data_range_url, headers=headers)
+            response.raise_for_status()
+            body = self.decoder(response.content)
+            if not isinstance(body, dict):
+                raise ValueError(f"Expected a JSON object, got {type(body).__name__}")
+            egvs = body.get('egvs') or {}
+            first = (egvs.get('start') or {}).get('systemTime')
+            last = (egvs.get('end') or {}).get('systemTime')
+            if not first or not last:
+                return None
+            return to_epoch(first), to_epoch(last)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if self.verbose:
+                print(f"dataRange unavailable ({e}), probing instead")
+            return False
+    
+    def _probe_window(self, access_token: str, start: int, end: int) -> Optional[List[int]]:
+        """systemTimes in [start, end], or None if the request failed"""
+        data = self.get_glucose_data(
+            access_token,
+            start_time=datetime.datetime.fromtimestamp(start, datetime.timezone.utc),
+            end_time=datetime.datetime.fromtimestamp(end, datetime.timezone.utc))
+        if 'error' in data:
+            return None
+        return [to_epoch(r['systemTime']) for r in data.get('records', []) if r.get('systemTime')]
+    
+    def _probe_data_range(self, access_token: str,
+                          probe: datetime.timedelta = datetime.timedelta(hours=6),
+                          horizon: datetime.timedelta = datetime.timedelta(days=365)
+                          ) -> Optional[Tuple[int, int]]:
+        """Find the data bounds with small requests instead of bulk downloads
+        
+        The newest reading is found by stepping back from now in windows
+        that double in size. The oldest is found by binary search over
+        probe-sized windows, assuming no gap in the data longer than probe.
+        """
+        now = int(time.time())
+        limit = now - int(horizon.total_seconds())
+        step = int(probe.total_seconds())
+        max_window = int(self.MAX_WINDOW.total_seconds())
+        
+        last = None
+        end = now
+        size = 3600
+        while end > limit:
+            start = max(end - size, limit)
+            times = self._probe_window(access_token, start, end)
+            if times is None:
+                return None
+            if times:
+                last = max(times)
+                break
+            end = start
+            size = min(size * 2, max_window)
+        if last is None:
+            return None
+        
+        # Invariant: data exists at or after hi; none in the probe window before lo
+        lo, hi = limit, last
+        while hi - lo > step:
+            mid = (lo + hi) // 2
+            times = self._probe_window(access_token, mid - step, mid)
+            if times is None:
+                return None
+            if times:
+                hi = min(times)
+            else:
+                lo = mid
+        times = self._probe_window(access_token, lo, hi)
+        if times is None:
+            return None
+        return (min(times + [hi]), last)
+    
+    def debug_data_availability(self, access_token: str, account: str = 'self',
+                                count_all: bool = False) -> Dict[str, Any]:
+        """Report which of the usual look-back ranges contain records, and how many
+        
+        The data range tells which ranges can have data at all. Of those,
+        only the narrowest is downloaded, and the next wider one only if
+        it came back empty. Ranges wider than the first one with data
+        contain it, so they report has_data without being downloaded and
+        their record_count is None. count_all=True downloads the widest
+        range once instead and counts every range. The bounds themselves
+        are available from get_data_range (cached in data_ranges).
+        """
+        bounds = self.get_data_range(access_token, account=account, refresh=True)
+        now = time.time()
+        results = {}
+        time_ranges = [
+            ("1 hour", 1),
+            ("6 hours", 6), 
+            ("24 hours", 24),
+            ("7 days", 168),
+            ("30 days", 720)
+        ]
+        
+        candidates = [hours for _, hours in time_ranges
+                      if bounds is not None and bounds[1] >= now - hours * 3600]
+        times: List[int] = []
+        downloaded = 0  # hours covered by times
+        for hours in candidates[-1:] if count_all else candidates:
+            data = self.get_glucose_data(access_token, hours_back=hours)
+            if 'error' in data:
+                break
+            times = [to_epoch(r['systemTime']) for r in data.get('records', []) if r.get('systemTime')]
+            downloaded = hours
+            if times:
+                break
+        
+        for range_name, hours in time_ranges:
+            if hours <= downloaded:
+                cutoff = now - hours * 3600
+                record_count = sum(1 for t in times if t >= cutoff)
+                has_data = record_count > 0
+                print(f"{range_name}: {record_count} records")
+            else:
+                # Not downloaded: holds records exactly when a narrower range does
+                record_count, has_data = None, bool(times)
+                print(f"{range_name}: {'has records' if has_data else 'no records'} (not counted)")
+            results[range_name] = {
+                'hours': hours,
+                'record_count': record_count,
+                'has_data': has_data
+            }
+        
+        if bounds is not None:
+            first, last = (datetime.datetime.fromtimestamp(t, datetime.timezone.utc) for t in bounds)
+            print(f"Data available from {first:%Y-%m-%d %H:%M:%S} to {last:%Y-%m-%d %H:%M:%S} UTC")
+        return results
+
+
+# dexcom_monitor/monitor.py
+"""Continuous monitoring module"""
+
+class DexcomMonitor:
+    """Continuous glucose monitoring"""
+    
+    def __init__(self, auth: DexcomAuth, data: DexcomData, 
+                 update_interval: int = 300,  # 5 minutes default
+                 account: str = 'self',
+                 store: Optional[ReadingStore] = None,
+                 cadence: Optional[CadenceScheduler] = None,
+                 metrics: Optional[RollingMetrics] = None,
+                 trend: Optional[TrendEstimator] = None,
+                 alerts: Optional[AlertEngine] = None,
+                 dispatcher: Optional[CallbackDispatcher] = None):
+        self.auth = auth
+        self.data = data
+        self.update_interval = update_interval
+        self.account = account
+        self.store = store
+        # When set, poll just after each reading is expected instead of every update_interval
+        self.cadence = cadence
+        # Rolling TIR/mean/GMI/CV, updated per reading instead of rescanning history
+        self.metrics = metrics
+        self.metrics_callback: Optional[Callable[[Reading, Dict[str, Dict[str, Any]]], None]] = None
+        # Rate of change and 15/30 minute projections, updated per reading
+        self.trend = trend
+        self.trend_callback: Optional[Callable[[Reading, Dict[str, Any]], None]] = None
+        # Declarative alert rules; events go to the engine's callback
+        self.alerts = alerts
+        # When set, callbacks run on the dispatcher's workers instead of in the poll loop
+        self.dispatcher = dispatcher
+        self._started_dispatcher = False
+        self.running = False
+        self.monitor_thread: Optional[threading.Thread] = None
+        self._started_auto_refresh = False
+        self.callback: Optional[Callable] = None
+        self.subscribers: List[Callable[[Reading], None]] = []
+        self.latest_reading: Optional[Reading] = None
+        
+        # Resume from persisted readings so a restart neither loses the
+        # latest reading nor re-downloads what is already stored
+        if store is not None:
+            self.latest_reading = store.latest(account)
+            if self.latest_reading and account not in data.last_seen:
+                data.last_seen[account] = self.latest_reading.system_time
+            if metrics is not None:
+                metrics.load(store, account)
+            if trend is not None:
+                trend.load(store, account)
+    
+    def set_callback(self, callback: Callable[[Reading], None]) -> None:
+        """Set callback function for new readings"""
+        self.callback = callback
+    
+    def add_callback(self, callback: Callable[[Reading], None]) -> None:
+        """Subscribe another callback to new readings, alongside set_callback's"""
+        self.subscribers.append(callback)
+    
+    def remove_callback(self, callback: Callable[[Reading], None]) -> None:
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+    
+    def set_metrics_callback(self, callback: Callable[[Reading, Dict[str, Dict[str, Any]]], None]) -> None:
+        """Set a callback receiving each new reading and a metrics snapshot
+        
+        Creates a RollingMetrics with the default windows if none was given.
+        """
+        if self.metrics is None:
+            self.metrics = RollingMetrics()
+            if self.store is not None:
+                self.metrics.load(self.store, self.account)
+        self.metrics_callback = callback
+    
+    def set_trend_callback(self, callback: Callable[[Reading, Dict[str, Any]], None]) -> None:
+        """Set a callback receiving each new reading and a trend forecast
+        
+        Creates a TrendEstimator with the defaults if none was given.
+        """
+        if self.trend is None:
+            self.trend = TrendEstimator()
+            if self.store is not None:
+                self.trend.load(self.store, self.account)
+        self.trend_callback = callback
+    
+    def start_monitoring(self) -> bool:
+        """Start continuous monitoring"""
+        if not self.auth.is_authenticated():
+            print("Not authenticated. Cannot start monitoring.")
+            return False
+        
+        if self.running:
+            print("Monitoring already running.")
+            return False
+        
+        # Keep the token fresh ahead of expiry so polls never carry a stale one
+        if not self.auth.auto_refresh_enabled:
+            self.auth.start_auto_refresh()
+            self._started_auto_refresh = True
+        if self.dispatcher is not None and not self.dispatcher.running:
+            self.dispatcher.start()
+            self._started_dispatcher = True
+        
+        self.running = True
+        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self.monitor_thread.start()
+        
+        if self.cadence is not None:
+            print("Started glucose monitoring (updates aligned to the sensor cadence)")
+        else:
+            print(f"Started glucose monitoring (updates every {self.update_interval//60} minutes)")
+        return True
+    
+    def stop_monitoring(self) -> None:
+        """Stop continuous monitoring"""
+        self.running = False
+        if self.monitor_thread:
+            self.monitor_thread.join(timeout=5)
+        if self._started_auto_refresh:
+            self.auth.stop_auto_refresh()
+            self._started_auto_refresh = False
+        if self._started_dispatcher:
+            self.dispatcher.stop()
+            self._started_dispatcher = False
+        print("Stopped glucose monitoring")
+    
+    def _monitor_loop(self) -> None:
+        """Main monitoring loop"""
+        while self.running:
+            try:
+                if not self.auth.is_authenticated():
+                    print("Authentication lost. Stopping monitor.")
+                    break
+                
+                # Fetch only readings newer than the last one seen
+                new_readings = self.data.get_new_readings(self.auth.get_access_token(),
+                                                          account=self.account)
+                
+                # Fall back to refresh-on-failure (e.g. token revoked early)
+                if new_readings is None:
+                    print("No data received, attempting token refresh...")
+                    if self.auth.refresh_access_token():
+                        new_readings = self.data.get_new_readings(self.auth.access_token,
+                                                                  account=self.account)
+                
+                if self.cadence is not None:
+                    self.cadence.record_poll(r.system_time for r in new_readings or [])
+                
+                if new_readings and self.store is not None:
+                    self.store.upsert(self.account, new_readings)
+                if new_readings and self.metrics is not None:
+                    self.metrics.extend(new_readings)
+                if new_readings and self.trend is not None:
+                    self.trend.extend(new_readings)
+                if new_readings and self.alerts is not None:
+                    self.alerts.evaluate(self.account, new_readings, trend=self.trend)
+                
+                reading = new_readings[-1] if new_readings else None
+                if reading:
+                    self.latest_reading = reading
+                    print(format_glucose_reading(reading))
+                    
+                    # Call user callbacks if set
+                    for callback in [self.callback] + self.subscribers:
+                        if callback:
+                            self._notify(callback, reading)
+                    if self.metrics_callback:
+                        self._notify(self.metrics_callback, reading, self.metrics.snapshot())
+                    if self.trend_callback:
+                        self._notify(self.trend_callback, reading, self.trend.forecast())
+                elif new_readings is not None:
+                    print("No new glucose reading")
+                else:
+                    print("No glucose reading available")
+                
+            except Exception as e:
+                print(f"Monitor error: {e}")
+            
+            # Wait for next update
+            if self.cadence is not None:
+                time.sleep(self.cadence.next_delay())
+            else:
+                time.sleep(self.update_interval)
+    
+    def _notify(self, callback: Callable, *args: Any) -> None:
+        """Hand a callback to the dispatcher, or call it inline without one"""
+        if self.dispatcher is not None:
+            self.dispatcher.submit(callback, *args, key=self.account)
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Callback error: {e}")
+    
+    def get_current_reading(self) -> Optional[Reading]:
+        """Get the most recent reading from cache"""
+        return self.latest_reading
+    
+    def get_metrics(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Current rolling metrics per window, or None without a metrics engine"""
+        if self.metrics is None:
+            return None
+        self.metrics.expire(int(time.time()))
+        return self.metrics.snapshot()
+    
+    def get_forecast(self) -> Optional[Dict[str, Any]]:
+        """Current rate of change and projected values, or None without a trend estimator"""
+        if self.trend is None:
+            return None
+        return self.trend.forecast()
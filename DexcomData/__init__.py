@@ -3,9 +3,25 @@ from .DexcomDataCode import (
     DexcomData, 
     DexcomMonitor,
     format_glucose_reading,
-    mg_dl_to_mmol_l,
-    mmol_l_to_mg_dl
+    format_readings
 )
+from .agp import agp, agp_batch
+from .alerts import AlertEngine, AlertEvent, AlertRule
+from .aio import AsyncDexcomAuth, AsyncDexcomData, AsyncDexcomMonitor, AsyncDexcomTransport
+from .backfill import Backfill, BackfillCheckpoint
+from .cadence import CadenceScheduler
+from .dispatch import CallbackDispatcher
+from .fleet import FleetMonitor
+from .metrics import RollingMetrics
+from .push import Broadcaster, sse_frame
+from .readings import Reading, ReadingSeries
+from .records import latest_record
+from .sessions import AccountSession, RefreshScheduler, SessionStore
+from .singleflight import SingleFlight
+from .store import ReadingStore
+from .trend import TrendEstimator, trend_arrow
+from .units import mg_dl_to_mmol_l, mmol_l_to_mg_dl
+from .transport import DexcomTransport, get_default_transport, set_default_transport
 
 __version__ = "0.1.0"
 __author__ = "Dhanya"
@@ -14,7 +30,38 @@ __all__ = [
     "DexcomAuth",
     "DexcomData", 
     "DexcomMonitor",
+    "FleetMonitor",
+    "CadenceScheduler",
+    "CallbackDispatcher",
+    "SingleFlight",
+    "RollingMetrics",
+    "TrendEstimator",
+    "AlertEngine",
+    "AlertRule",
+    "AlertEvent",
+    "trend_arrow",
+    "agp",
+    "agp_batch",
+    "Backfill",
+    "BackfillCheckpoint",
+    "AsyncDexcomAuth",
+    "AsyncDexcomData",
+    "AsyncDexcomMonitor",
+    "AsyncDexcomTransport",
     "format_glucose_reading",
+    "format_readings",
     "mg_dl_to_mmol_l",
-    "mmol_l_to_mg_dl"
+    "mmol_l_to_mg_dl",
+    "Reading",
+    "ReadingSeries",
+    "latest_record",
+    "ReadingStore",
+    "SessionStore",
+    "AccountSession",
+    "RefreshScheduler",
+    "Broadcaster",
+    "sse_frame",
+    "DexcomTransport",
+    "get_default_transport",
+    "set_default_transport"
 ]
\ No newline at end of file
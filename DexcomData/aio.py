@@ -0,0 +1,415 @@
+"""Asyncio client for the Dexcom API
+
+Mirrors DexcomAuth, DexcomData and DexcomMonitor on top of aiohttp, so a
+single event loop can poll thousands of accounts concurrently. Requires
+the optional dependency: pip install DexcomData[async]
+"""
+
+import asyncio
+import datetime
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional
+    aiohttp = None
+
+from .DexcomDataCode import DexcomData, format_glucose_reading
+from .alerts import AlertEngine
+from .decoding import Decoder, loads
+from .metrics import RollingMetrics
+from .records import latest_record
+from .readings import Reading, ReadingSeries
+from .store import ReadingStore
+from .trend import TrendEstimator
+
+
+def _require_aiohttp() -> None:
+    if aiohttp is None:
+        raise ImportError("aiohttp is required for the asyncio client: pip install DexcomData[async]")
+
+
+class AsyncDexcomTransport:
+    """Shared aiohttp session with a bounded connection pool
+
+    The session is created lazily inside the running event loop.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 0,
+                 keepalive_timeout: float = 30, timeout: float = 30,
+                 session: Optional['aiohttp.ClientSession'] = None):
+        _require_aiohttp()
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._session = session
+
+    @property
+    def session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> 'AsyncDexcomTransport':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class AsyncDexcomAuth:
+    """Handle Dexcom API authentication (asyncio)"""
+
+    def __init__(self, client_id: str, client_secret: str,
+                 redirect_uri: str = 'http://localhost:5000/callback',
+                 base_url: str = 'https://api.dexcom.jp/v2',
+                 transport: Optional[AsyncDexcomTransport] = None,
+                 refresh_margin: float = 300,
+                 retry_interval: float = 30):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.auth_url = f'{base_url}/oauth2/login'
+        self.token_url = f'{base_url}/oauth2/token'
+        self.transport = transport or AsyncDexcomTransport()
+
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None
+
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._token_generation = 0
+        self._refresh_task: Optional['asyncio.Task[None]'] = None
+
+    def get_auth_url(self) -> str:
+        params = {
+            'client_id': self.client_id,
+            'redirect_uri': self.redirect_uri,
+            'response_type': 'code',
+            'scope': 'offline_access'
+        }
+        return self.auth_url + '?' + urlencode(params)
+
+    def _lock(self) -> asyncio.Lock:
+        # Created on first use so it binds to the running loop
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        return self._refresh_lock
+
+    def _store_tokens(self, token_data: Dict[str, Any]) -> None:
+        self.access_token = token_data['access_token']
+        self.refresh_token = token_data.get('refresh_token', self.refresh_token)
+        expires_in = token_data.get('expires_in')
+        self.expires_at = time.time() + float(expires_in) if expires_in else None
+        self._token_generation += 1
+
+    async def _post_token(self, payload: Dict[str, str]) -> Dict[str, Any]:
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        async with self.transport.session.post(self.token_url, data=payload, headers=headers) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def exchange_code_for_tokens(self, auth_code: str) -> bool:
+        """Exchange authorization code for access tokens"""
+        payload = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'code': auth_code,
+            'grant_type': 'authorization_code',
+            'redirect_uri': self.redirect_uri
+        }
+        try:
+            token_data = await self._post_token(payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error getting access token: {e}")
+            return False
+        async with self._lock():
+            self._store_tokens(token_data)
+        return True
+
+    async def refresh_access_token(self) -> bool:
+        """Refresh the access token; concurrent callers share one in-flight refresh"""
+        generation = self._token_generation
+        async with self._lock():
+            if self._token_generation != generation:
+                return self.access_token is not None
+            if not self.refresh_token:
+                print("No refresh token available. Re-authentication required.")
+                return False
+
+            payload = {
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'grant_type': 'refresh_token',
+                'refresh_token': self.refresh_token,
+                'redirect_uri': self.redirect_uri
+            }
+            try:
+                self._store_tokens(await self._post_token(payload))
+                return True
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+                print(f"Error refreshing token: {e}")
+                if self.expires_at is None or time.time() >= self.expires_at:
+                    self.access_token = None
+                return False
+
+    def token_expires_in(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+
+    async def get_access_token(self) -> Optional[str]:
+        """Return an access token that is not about to expire, refreshing first if needed"""
+        remaining = self.token_expires_in()
+        if remaining is not None and remaining <= self.refresh_margin:
+            await self.refresh_access_token()
+        return self.access_token
+
+    def is_authenticated(self) -> bool:
+        return self.access_token is not None
+
+    def start_auto_refresh(self) -> None:
+        """Refresh ahead of expiry in a background task"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._auto_refresh_loop())
+
+    async def stop_auto_refresh(self) -> None:
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def auto_refresh_enabled(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    async def _auto_refresh_loop(self) -> None:
+        while self.refresh_token:
+            remaining = self.token_expires_in()
+            if remaining is None:
+                return
+            await asyncio.sleep(max(remaining - self.refresh_margin, 0))
+            while not await self.refresh_access_token():
+                await asyncio.sleep(self.retry_interval)
+
+
+class AsyncDexcomData:
+    """Handle Dexcom glucose data retrieval (asyncio)"""
+
+    MAX_WINDOW = DexcomData.MAX_WINDOW
+
+    # Incremental bookkeeping is shared with the blocking client
+    _incremental_window = DexcomData._incremental_window
+    _merge_incremental = DexcomData._merge_incremental
+    reset_incremental = DexcomData.reset_incremental
+
+    def __init__(self, base_url: str = 'https://api.dexcom.jp/v3',
+                 transport: Optional[AsyncDexcomTransport] = None,
+                 decoder: Optional[Decoder] = None,
+                 history_retention: Optional[datetime.timedelta] = datetime.timedelta(hours=24)):
+        self.data_url = f'{base_url}/users/self/egvs'
+        self.transport = transport or AsyncDexcomTransport()
+        self.decoder = decoder or loads
+        self.last_seen: Dict[str, int] = {}
+        self.history: Dict[str, ReadingSeries] = {}
+        self.history_retention = history_retention
+
+    async def get_glucose_data(self, access_token: str,
+                               hours_back: int = 6,
+                               start_time: Optional[datetime.datetime] = None,
+                               end_time: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+        """Fetch EGV records for the last hours_back hours or [start_time, end_time] (UTC)"""
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json'
+        }
+        if end_time is None:
+            end_time = datetime.datetime.now(datetime.timezone.utc)
+        if start_time is None:
+            start_time = end_time - datetime.timedelta(hours=hours_back)
+        params = {
+            'startDate': start_time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'endDate': end_time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+
+        status: Union[int, str] = 'unknown'
+        try:
+            async with self.transport.session.get(self.data_url, headers=headers, params=params) as response:
+                status = response.status
+                response.raise_for_status()
+                data = self.decoder(await response.read())
+                if not isinstance(data, dict):
+                    raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+                return data
+        # ValueError: a 200 whose body is not JSON (e.g. a proxy's HTML page)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error fetching glucose data: {e}")
+            return {'error': str(e), 'status_code': status, 'records': []}
+
+    async def get_latest_reading(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """Get the most recent glucose reading"""
+        data = await self.get_glucose_data(access_token, hours_back=6)
+        return latest_record(data.get('records') or [])
+
+    async def get_new_readings(self, access_token: str, account: str = 'self',
+                               hours_back: int = 6) -> Optional[List[Reading]]:
+        """Fetch only readings newer than the last one seen (see DexcomData.get_new_readings)"""
+        start_time, end_time = self._incremental_window(account, hours_back)
+        data = await self.get_glucose_data(access_token, start_time=start_time, end_time=end_time)
+        if 'error' in data:
+            return None
+        return self._merge_incremental(account, data)
+
+
+AsyncCallback = Callable[[Reading], Union[None, Awaitable[None]]]
+
+
+class AsyncDexcomMonitor:
+    """Continuous glucose monitoring as an asyncio task"""
+
+    def __init__(self, auth: AsyncDexcomAuth, data: AsyncDexcomData,
+                 update_interval: float = 300,
+                 account: str = 'self',
+                 store: Optional[ReadingStore] = None,
+                 verbose: bool = True,
+                 metrics: Optional[RollingMetrics] = None,
+                 trend: Optional[TrendEstimator] = None,
+                 alerts: Optional[AlertEngine] = None):
+        self.auth = auth
+        self.data = data
+        self.update_interval = update_interval
+        self.account = account
+        self.store = store
+        self.verbose = verbose
+        self.metrics = metrics
+        self.trend = trend
+        self.alerts = alerts
+        self.callback: Optional[AsyncCallback] = None
+        self.latest_reading: Optional[Reading] = None
+        self.task: Optional['asyncio.Task[None]'] = None
+        self._started_auto_refresh = False
+
+        if store is not None:
+            self.latest_reading = store.latest(account)
+            if self.latest_reading and account not in data.last_seen:
+                data.last_seen[account] = self.latest_reading.system_time
+            if metrics is not None:
+                metrics.load(store, account)
+            if trend is not None:
+                trend.load(store, account)
+
+    def set_callback(self, callback: AsyncCallback) -> None:
+        """Set a plain or async callback for new readings"""
+        self.callback = callback
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start_monitoring(self) -> bool:
+        """Start the polling task on the running event loop"""
+        if not self.auth.is_authenticated():
+            print("Not authenticated. Cannot start monitoring.")
+            return False
+        if self.running:
+            print("Monitoring already running.")
+            return False
+        if not self.auth.auto_refresh_enabled:
+            self.auth.start_auto_refresh()
+            self._started_auto_refresh = True
+        self.task = asyncio.ensure_future(self._monitor_loop())
+        return True
+
+    async def stop_monitoring(self) -> None:
+        """Cancel the polling task and wait for it to finish"""
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._started_auto_refresh:
+            await self.auth.stop_auto_refresh()
+            self._started_auto_refresh = False
+
+    async def poll_once(self) -> Optional[Reading]:
+        """Run a single poll cycle, returning the newest new reading"""
+        new_readings = await self.data.get_new_readings(await self.auth.get_access_token(),
+                                                        account=self.account)
+        if new_readings is None and await self.auth.refresh_access_token():
+            new_readings = await self.data.get_new_readings(self.auth.access_token,
+                                                            account=self.account)
+        if not new_readings:
+            return None
+
+        if self.store is not None:
+            self.store.upsert(self.account, new_readings)
+        if self.metrics is not None:
+            self.metrics.extend(new_readings)
+        if self.trend is not None:
+            self.trend.extend(new_readings)
+        if self.alerts is not None:
+            self.alerts.evaluate(self.account, new_readings, trend=self.trend)
+        reading = new_readings[-1]
+        self.latest_reading = reading
+        if self.verbose:
+            print(format_glucose_reading(reading))
+
+        if self.callback:
+            try:
+                result = self.callback(reading)
+                if inspect.isawaitable(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Callback error: {e}")
+        return reading
+
+    async def _monitor_loop(self) -> None:
+        while True:
+            if not self.auth.is_authenticated():
+                print("Authentication lost. Stopping monitor.")
+                return
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Monitor error: {e}")
+            await asyncio.sleep(self.update_interval)
+
+    def get_current_reading(self) -> Optional[Reading]:
+        return self.latest_reading
+
+    def get_metrics(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Current rolling metrics per window (see DexcomMonitor.get_metrics)"""
+        if self.metrics is None:
+            return None
+        self.metrics.expire(int(time.time()))
+        return self.metrics.snapshot()
+
+    def get_forecast(self) -> Optional[Dict[str, Any]]:
+        """Current rate of change and projections (see DexcomMonitor.get_forecast)"""
+        if self.trend is None:
+            return None
+        return self.trend.forecast()
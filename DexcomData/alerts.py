@@ -0,0 +1,299 @@
+"""Declarative glucose alert rules with hysteresis, durations and snooze
+
+Rules are declared once, as AlertRule objects or plain dicts, and
+compiled by AlertEngine into tuples of bound comparison methods, so
+evaluating a reading is a handful of C-level calls per rule with no
+per-reading parsing or attribute lookups. Each account keeps a few
+integers of state per rule, and only readings newer than the last one
+evaluated for an account are looked at, so replays and overlapping
+fetches never re-alert.
+
+An alert fires once when its condition has held for `duration` seconds
+and stays active, without repeating, until the value crosses back past
+the `clear` level (hysteresis); then a 'cleared' event is emitted.
+`snooze` suppresses new alerts of the same rule for that many seconds
+after one fires.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+from .dispatch import CallbackDispatcher
+from .readings import Reading
+from .trend import TrendEstimator
+
+
+METRICS = ('value', 'rate', 'projected')
+
+
+class AlertRule:
+    """One alert condition
+
+    metric is 'value' (mg/dL), 'rate' (mg/dL per minute) or 'projected'
+    (mg/dL `horizon` minutes ahead, from the trend). Exactly one of below
+    or above sets the threshold; clear defaults to the threshold itself.
+    """
+
+    __slots__ = ('name', 'metric', 'below', 'above', 'duration', 'clear',
+                 'snooze', 'horizon', 'severity')
+
+    def __init__(self, name: str, metric: str = 'value',
+                 below: Optional[float] = None, above: Optional[float] = None,
+                 duration: int = 0, clear: Optional[float] = None,
+                 snooze: int = 0, horizon: int = 30, severity: str = 'warning'):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown alert metric {metric!r}, expected one of {METRICS}")
+        if (below is None) == (above is None):
+            raise ValueError(f"Alert rule {name!r} needs exactly one of below or above")
+        threshold = below if below is not None else above
+        if clear is not None and (clear < threshold if below is not None else clear > threshold):
+            raise ValueError(f"Alert rule {name!r}: clear level is on the alerting side of the threshold")
+        self.name = name
+        self.metric = metric
+        self.below = below
+        self.above = above
+        self.duration = duration
+        self.clear = clear
+        self.snooze = snooze
+        self.horizon = horizon
+        self.severity = severity
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> 'AlertRule':
+        return cls(**spec)
+
+    def __repr__(self) -> str:
+        side = f"below={self.below}" if self.below is not None else f"above={self.above}"
+        return f"AlertRule({self.name!r}, {self.metric!r}, {side})"
+
+
+class AlertEvent:
+    """An alert firing or clearing for one account"""
+
+    __slots__ = ('account', 'rule', 'kind', 'severity', 'time', 'value', 'since', 'reading')
+
+    def __init__(self, account: str, rule: str, kind: str, severity: str,
+                 time: int, value: float, since: int, reading: Reading):
+        self.account = account
+        self.rule = rule
+        self.kind = kind  # 'fired' or 'cleared'
+        self.severity = severity
+        self.time = time  # system_time of the reading that triggered the event
+        self.value = value  # metric value at that reading
+        self.since = since  # start of the episode; (account, rule, since) identifies it
+        self.reading = reading
+
+    @property
+    def key(self):
+        return (self.account, self.rule, self.since, self.kind)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'account': self.account, 'rule': self.rule, 'kind': self.kind,
+                'severity': self.severity, 'time': self.time, 'value': self.value,
+                'since': self.since}
+
+    def __repr__(self) -> str:
+        return (f"AlertEvent({self.account!r}, {self.rule!r}, {self.kind!r}, "
+                f"value={self.value}, time={self.time})")
+
+
+def _compile(rule: AlertRule):
+    """(metric, horizon, fires, clears, duration, snooze, name, severity)
+
+    fires/clears are bound float comparisons: for a below-70 rule with a
+    clear level of 80, fires is (70.0).__gt__ (value < 70) and clears is
+    (80.0).__lt__ (value > 80).
+    """
+    if rule.below is not None:
+        level = float(rule.below)
+        clear = float(rule.clear if rule.clear is not None else rule.below)
+        fires, clears = level.__gt__, clear.__lt__
+    else:
+        level = float(rule.above)
+        clear = float(rule.clear if rule.clear is not None else rule.above)
+        fires, clears = level.__lt__, clear.__gt__
+    return (rule.metric, rule.horizon, fires, clears, rule.duration, rule.snooze,
+            rule.name, rule.severity)
+
+
+class _AccountState:
+    __slots__ = ('last_time', 'trend', 'since', 'active', 'snoozed_until')
+
+    def __init__(self, rules: int, trend: Optional[TrendEstimator]):
+        self.last_time: Optional[int] = None
+        self.trend = trend
+        # Per rule: start of the current episode (None when the condition
+        # does not hold), whether it has fired, and the end of any snooze
+        self.since: List[Optional[int]] = [None] * rules
+        self.active = [False] * rules
+        self.snoozed_until = [0] * rules
+
+
+RuleLike = Union[AlertRule, Dict[str, Any]]
+
+
+class AlertEngine:
+    """Evaluate compiled alert rules for many accounts
+
+    Feed each account's new readings with evaluate(account, readings) (or
+    many accounts at once with evaluate_batch) and collect the returned
+    AlertEvents. Rate and projection rules use a TrendEstimator per
+    account, either the caller's (the monitor's own estimator) or one the
+    engine keeps. Events also go to `callback`, through `dispatcher` when
+    one is given.
+    """
+
+    def __init__(self, rules: Iterable[RuleLike],
+                 callback: Optional[Callable[[AlertEvent], None]] = None,
+                 dispatcher: Optional[CallbackDispatcher] = None):
+        self.rules: List[AlertRule] = [r if isinstance(r, AlertRule) else AlertRule.from_dict(r)
+                                       for r in rules]
+        names = [r.name for r in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Alert rule names must be unique")
+        self._compiled = tuple(_compile(r) for r in self.rules)
+        self._index = {name: i for i, name in enumerate(names)}
+        self._needs_trend = any(r.metric != 'value' for r in self.rules)
+        self.callback = callback
+        self.dispatcher = dispatcher
+        self.accounts: Dict[str, _AccountState] = {}
+        self.counts = {'readings': 0, 'fired': 0, 'cleared': 0, 'suppressed': 0}
+        # Accounts may be evaluated from several worker threads (FleetMonitor);
+        # per-account state is only touched by one poll at a time, the counters
+        # are shared
+        self._lock = threading.Lock()
+
+    def _state(self, account: str, trend: Optional[TrendEstimator]) -> _AccountState:
+        state = self.accounts.get(account)
+        if state is None:
+            if trend is None and self._needs_trend:
+                trend = TrendEstimator()
+            state = self.accounts[account] = _AccountState(len(self._compiled), trend)
+        elif trend is not None:
+            state.trend = trend
+        return state
+
+    def evaluate(self, account: str, readings: Sequence[Reading],
+                 trend: Optional[TrendEstimator] = None) -> List[AlertEvent]:
+        """Evaluate new readings (oldest first) for one account
+
+        Pass the monitor's TrendEstimator as `trend`, already updated with
+        these readings, to share it; otherwise the engine feeds its own.
+        Events are also passed to the engine's callback, if set.
+        """
+        state = self._state(account, trend)
+        owns_trend = trend is None and state.trend is not None
+        events: List[AlertEvent] = []
+        last_time = state.last_time
+        evaluated = suppressed = 0
+        for reading in readings:
+            ts = reading.system_time
+            if last_time is not None and ts <= last_time:
+                continue
+            last_time = ts
+            evaluated += 1
+            if owns_trend:
+                state.trend.add(reading)
+            if reading.value:
+                suppressed += self._evaluate_reading(
+                    account, state, reading, ts, events,
+                    trend is not None and reading is not readings[-1])
+        state.last_time = last_time
+        fired = sum(event.kind == 'fired' for event in events)
+        with self._lock:
+            counts = self.counts
+            counts['readings'] += evaluated
+            counts['fired'] += fired
+            counts['cleared'] += len(events) - fired
+            counts['suppressed'] += suppressed
+        if self.callback and self.dispatcher is not None:
+            for event in events:
+                # Keyed by episode, so coalescing never merges a fire with its clear
+                self.dispatcher.submit(self.callback, event, key=event.key)
+        elif self.callback:
+            for event in events:
+                try:
+                    self.callback(event)
+                except Exception as e:
+                    print(f"Alert callback error: {e}")
+        return events
+
+    def _evaluate_reading(self, account: str, state: _AccountState, reading: Reading,
+                          ts: int, events: List[AlertEvent], stale_trend: bool) -> int:
+        """Append the reading's events, returning how many were snoozed"""
+        value = reading.value
+        suppressed = 0
+        trend = state.trend
+        since, active = state.since, state.active
+        rate = projected = None
+        for i, (metric, horizon, fires, clears, duration, snooze,
+                name, severity) in enumerate(self._compiled):
+            if metric == 'value':
+                x = value
+            elif stale_trend:
+                # A shared estimator only reflects the newest reading
+                continue
+            elif metric == 'rate':
+                if rate is None:
+                    rate = trend.rate
+                x = rate
+            else:
+                if projected is None:
+                    projected = {}
+                x = projected.get(horizon)
+                if x is None:
+                    x = projected[horizon] = trend.project(horizon)
+            if x is None:
+                continue
+
+            if active[i]:
+                if clears(x):
+                    active[i] = False
+                    events.append(AlertEvent(account, name, 'cleared', severity, ts, x,
+                                             since[i], reading))
+                    since[i] = None
+                continue
+            if not fires(x):
+                since[i] = None
+                continue
+            if since[i] is None:
+                since[i] = ts
+            if ts - since[i] < duration:
+                continue
+            if ts < state.snoozed_until[i]:
+                suppressed += 1
+                continue
+            active[i] = True
+            if snooze:
+                state.snoozed_until[i] = ts + snooze
+            events.append(AlertEvent(account, name, 'fired', severity, ts, x, since[i], reading))
+        return suppressed
+
+    def evaluate_batch(self, batch: Mapping[str, Sequence[Reading]]) -> List[AlertEvent]:
+        """Evaluate new readings for many accounts in one tick"""
+        events: List[AlertEvent] = []
+        for account, readings in batch.items():
+            if readings:
+                events.extend(self.evaluate(account, readings))
+        return events
+
+    def snooze(self, account: str, rule: str, seconds: int, now: Optional[int] = None) -> None:
+        """Suppress new alerts of one rule for an account, e.g. after acknowledgement"""
+        now = int(time.time()) if now is None else now
+        state = self._state(account, None)
+        state.snoozed_until[self._index[rule]] = now + seconds
+
+    def active(self, account: str) -> List[str]:
+        """Names of the rules currently alerting for an account"""
+        state = self.accounts.get(account)
+        if state is None:
+            return []
+        return [rule.name for rule, on in zip(self.rules, state.active) if on]
+
+    def reset(self, account: Optional[str] = None) -> None:
+        """Forget alert state for one account, or for all"""
+        if account is None:
+            self.accounts.clear()
+        else:
+            self.accounts.pop(account, None)
@@ -0,0 +1,230 @@
+"""Parallel, resumable backfill of long historical ranges"""
+
+import collections
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from .readings import Reading
+from .store import ReadingStore
+
+
+Sink = Union[ReadingStore, Callable[[List[Reading]], Any]]
+TokenSource = Union[str, Callable[[], Optional[str]]]
+
+
+def plan_windows(start: int, end: int, window: int) -> List[Tuple[int, int]]:
+    """Split [start, end] (epoch seconds) into consecutive windows of at most `window` seconds"""
+    windows = []
+    while start < end:
+        windows.append((start, min(start + window, end)))
+        start += window
+    return windows
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second, with bursts of `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BackfillCheckpoint:
+    """Progress of one backfill, saved as JSON after every window written to the sink
+
+    Only the end of the contiguous prefix that reached the sink is
+    recorded, so resuming never skips a window that was fetched but not
+    yet written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, account: str, start: int, end: int) -> Optional[int]:
+        """Epoch second to resume from, if the file belongs to this backfill"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('account') != account or state.get('start') != start or state.get('end') != end:
+            return None
+        return state.get('done_until')
+
+    def save(self, account: str, start: int, end: int, done_until: int) -> None:
+        # Write then rename, so an interrupted save leaves the previous checkpoint intact
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'account': account, 'start': start, 'end': end,
+                       'done_until': done_until}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class Backfill:
+    """Fetch [start, end] in API-sized windows on a worker pool
+
+    At most max_workers requests are in flight, optionally capped further
+    to rate_limit requests per second. Windows complete in any order but
+    are written to the sink strictly oldest first, de-duplicated on
+    systemTime, so the sink sees one ordered stream. The sink is either a
+    ReadingStore (readings are upserted and the window marked fetched) or
+    a callable receiving each window's readings as a list.
+
+    With a checkpoint path, progress is saved after every window reaches
+    the sink and a later run over the same account and range resumes from
+    there. If data.get_data_range has been called for the account,
+    windows before its first reading are skipped. Failed windows are
+    retried `retries` times; if a window still fails the backfill stops,
+    leaving the checkpoint at the last window written.
+    """
+
+    def __init__(self, data, window: Optional[datetime.timedelta] = None,
+                 max_workers: int = 4,
+                 rate_limit: Optional[float] = None,
+                 checkpoint: Optional[str] = None,
+                 retries: int = 2,
+                 retry_delay: float = 5,
+                 settle_time: datetime.timedelta = datetime.timedelta(hours=1),
+                 verbose: bool = False):
+        self.data = data
+        self.window = int((window or data.MAX_WINDOW).total_seconds())
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.checkpoint = BackfillCheckpoint(checkpoint) if checkpoint else None
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.settle_time = settle_time
+        self.verbose = verbose
+        self._cancelled = threading.Event()
+
+    def _token(self, access_token: TokenSource) -> Optional[str]:
+        return access_token() if callable(access_token) else access_token
+
+    def _fetch(self, access_token: TokenSource, window: Tuple[int, int]) -> Optional[List[Reading]]:
+        """Readings in one window oldest first, or None if every attempt failed"""
+        window_start, window_end = window
+        for attempt in range(self.retries + 1):
+            if self._cancelled.is_set():
+                return None
+            if attempt:
+                time.sleep(self.retry_delay * attempt)
+            if self.limiter is not None:
+                self.limiter.acquire()
+            data = self.data.get_glucose_data(
+                self._token(access_token),
+                start_time=datetime.datetime.fromtimestamp(window_start, datetime.timezone.utc),
+                end_time=datetime.datetime.fromtimestamp(window_end, datetime.timezone.utc))
+            if 'error' not in data:
+                readings = [Reading.from_dict(r) for r in data.get('records', []) if r.get('systemTime')]
+                readings.sort(key=lambda r: r.system_time)
+                return readings
+        return None
+
+    def run(self, access_token: TokenSource, start_time: datetime.datetime,
+            end_time: datetime.datetime, sink: Sink, account: str = 'self') -> Dict[str, Any]:
+        """Backfill [start_time, end_time] into sink, returning progress counters
+
+        access_token may be a callable (e.g. auth.get_access_token) so a long
+        backfill picks up refreshed tokens.
+        """
+        start = int(start_time.timestamp())
+        end = int(end_time.timestamp())
+        resume = self.checkpoint.load(account, start, end) if self.checkpoint else None
+        position = max(start, resume or start)
+        # Nothing exists before the first reading; skip those windows if known
+        bounds = getattr(self.data, 'data_ranges', {}).get(account)
+        if bounds is not None:
+            position = max(position, min(bounds[0], end))
+        windows = plan_windows(position, end, self.window)
+        settled = int((datetime.datetime.now(datetime.timezone.utc) - self.settle_time).timestamp())
+
+        stats = {'windows': len(windows), 'written_windows': 0, 'readings': 0,
+                 'duplicates': 0, 'resumed_from': resume, 'done_until': position,
+                 'complete': False}
+        if self.verbose and resume:
+            print(f"Resuming backfill for {account} from "
+                  f"{datetime.datetime.fromtimestamp(resume, datetime.timezone.utc):%Y-%m-%d %H:%M:%S}")
+
+        self._cancelled.clear()
+        last_written: Optional[int] = None
+        pending: Deque[Tuple[Tuple[int, int], Future]] = collections.deque()
+        remaining = iter(windows)
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='dexcom-backfill') as executor:
+            def submit_next() -> None:
+                window = next(remaining, None)
+                if window is not None:
+                    pending.append((window, executor.submit(self._fetch, access_token, window)))
+
+            # Keep a bounded number of windows ahead of the sink so memory
+            # stays flat however long the range is
+            for _ in range(self.max_workers * 2):
+                submit_next()
+
+            while pending:
+                window, future = pending.popleft()
+                readings = future.result()
+                if readings is None:
+                    print(f"Backfill stopped: window starting "
+                          f"{datetime.datetime.fromtimestamp(window[0], datetime.timezone.utc):%Y-%m-%d %H:%M:%S} failed")
+                    self._cancelled.set()
+                    for _, other in pending:
+                        other.cancel()
+                    return stats
+                submit_next()
+
+                # Adjacent windows share their boundary second
+                if last_written is not None:
+                    fresh = [r for r in readings if r.system_time > last_written]
+                    stats['duplicates'] += len(readings) - len(fresh)
+                    readings = fresh
+                if readings:
+                    last_written = readings[-1].system_time
+
+                if isinstance(sink, ReadingStore):
+                    sink.upsert(account, readings)
+                    sink.mark_fetched(account, window[0], min(window[1], settled))
+                else:
+                    sink(readings)
+
+                stats['written_windows'] += 1
+                stats['readings'] += len(readings)
+                stats['done_until'] = window[1]
+                if self.checkpoint:
+                    self.checkpoint.save(account, start, end, window[1])
+                if self.verbose:
+                    print(f"Backfilled {stats['written_windows']}/{len(windows)} windows "
+                          f"({stats['readings']} readings)")
+
+        stats['complete'] = True
+        return stats
+
+    def cancel(self) -> None:
+        """Stop a running backfill after the windows already in flight"""
+        self._cancelled.set()
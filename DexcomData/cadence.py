@@ -0,0 +1,133 @@
+"""Sensor-cadence-aware poll scheduling"""
+
+import math
+import time
+from typing import Any, Dict, Iterable, Optional
+
+
+class CadenceScheduler:
+    """Decide when to poll an account next, based on when its readings arrive
+
+    CGM readings are produced every `period` seconds at a fixed phase, and
+    show up in the API some time after their systemTime. The scheduler
+    keeps bounds on that publishing lag: a poll that finds the expected
+    reading gives an upper bound, one that misses it a lower bound. Polls
+    are aimed at the upper bound once the bounds are within `tolerance`,
+    otherwise halfway between them, so the next reading is picked up
+    shortly after it is published instead of a fixed interval after
+    whenever the loop happened to start. The lower bound decays a little
+    with every reading so the estimate can follow a shrinking lag.
+
+    When no reading has appeared for more than a full period past its
+    expected time (sensor warm-up, signal loss), polls back off
+    exponentially from retry_delay up to max_backoff.
+
+    All times are epoch seconds.
+    """
+
+    def __init__(self, period: float = 300, tolerance: float = 30,
+                 retry_delay: float = 30, max_backoff: float = 1800,
+                 min_delay: float = 5, lag_decay: float = 0.5):
+        self.period = period
+        self.tolerance = tolerance
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.min_delay = min_delay
+        self.lag_decay = lag_decay
+
+        # Bounds on the publishing lag, as offsets from the expected systemTime
+        self.lag_low = 0.0
+        self.lag_high = math.inf
+
+        self.last_reading_time: Optional[int] = None
+        self.misses = 0
+
+        # Metrics
+        self.polls = 0
+        self.wasted_polls = 0
+        self.readings_seen = 0
+        self._freshness_total = 0.0
+        self.last_freshness: Optional[float] = None
+
+    @property
+    def publish_lag(self) -> Optional[float]:
+        """Best current estimate of the publishing lag (None until learned)"""
+        return None if self.lag_high == math.inf else self.lag_high
+
+    def record_poll(self, reading_times: Iterable[int], now: Optional[float] = None) -> None:
+        """Record the outcome of a poll with the systemTimes of its new readings"""
+        now = time.time() if now is None else now
+        times = sorted(reading_times)
+        self.polls += 1
+        if not times:
+            self.wasted_polls += 1
+            self.misses += 1
+            # Only the first miss for a reading says something about the lag;
+            # later ones are retries during a gap in the data
+            if self.misses == 1 and self.last_reading_time is not None:
+                offset = now - (self.last_reading_time + self.period)
+                if 0 <= offset < self.period:
+                    self.lag_low = max(self.lag_low, offset)
+                    if self.lag_low >= self.lag_high:
+                        # The lag grew past what we knew; relearn the upper bound
+                        self.lag_high = math.inf
+            return
+
+        newest = times[-1]
+        if self.last_reading_time is None or newest > self.last_reading_time:
+            self.last_reading_time = newest
+        # Only the newest reading's age bounds the publishing lag; older ones
+        # in the same batch were simply waiting for this poll
+        lag = max(now - newest, 0.0)
+        self.lag_high = min(self.lag_high, lag)
+        self.lag_low = max(min(self.lag_low - self.lag_decay, self.lag_high), 0.0)
+        self.misses = 0
+        self.readings_seen += len(times)
+        self._freshness_total += lag
+        self.last_freshness = lag
+
+    def expected_arrival(self) -> Optional[float]:
+        """When the next reading should be available from the API"""
+        if self.last_reading_time is None or self.lag_high == math.inf:
+            return None
+        return self.last_reading_time + self.period + self.lag_high
+
+    def next_delay(self, now: Optional[float] = None) -> float:
+        """Seconds to wait before the next poll"""
+        now = time.time() if now is None else now
+        if self.last_reading_time is None:
+            # Nothing learned yet: poll on the nominal period, backing off on misses
+            return self.period if self.misses == 0 else self._backoff()
+
+        expected = self.last_reading_time + self.period
+        if now - expected >= self.period:
+            # A whole period overdue: warm-up or signal loss
+            return self._backoff()
+
+        if self.lag_high == math.inf:
+            offset = self.lag_low + self.retry_delay
+        elif self.lag_high - self.lag_low <= self.tolerance:
+            offset = self.lag_high
+        else:
+            offset = (self.lag_low + self.lag_high) / 2
+        target = expected + offset
+        if target <= now:
+            target = now + self.retry_delay if self.misses else expected + self.period + offset
+        return max(target - now, self.min_delay)
+
+    def _backoff(self) -> float:
+        return min(self.retry_delay * (2 ** max(self.misses - 1, 0)), self.max_backoff)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Freshness latency (seconds from systemTime to poll) and wasted poll counts"""
+        polls = self.polls
+        useful = polls - self.wasted_polls
+        return {
+            'polls': polls,
+            'wasted_polls': self.wasted_polls,
+            'wasted_ratio': self.wasted_polls / polls if polls else 0.0,
+            'mean_freshness': self._freshness_total / useful if useful else None,
+            'last_freshness': self.last_freshness,
+            'publish_lag': self.publish_lag,
+            'misses': self.misses,
+        }
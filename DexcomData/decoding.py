@@ -0,0 +1,128 @@
+"""JSON decoding of API responses: a fast whole-body path and a streaming record parser"""
+
+import codecs
+import json
+from typing import Any, Callable, Iterable, Iterator, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+Decoder = Callable[[Union[bytes, str]], Any]
+
+
+def loads(body: Union[bytes, str]) -> Any:
+    """Decode a JSON body, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class _NeedMore(Exception):
+    pass
+
+
+class RecordStream:
+    """Incremental parser for the `records` array of an EGV response
+
+    Feed it chunks of bytes as they arrive and iterate over the records
+    completed so far. Only the unparsed tail of the body is buffered, so
+    memory stays proportional to one record rather than the whole
+    response. Top-level fields other than `records` (recordType, userId,
+    ...) are skipped.
+    """
+
+    def __init__(self, key: str = 'records'):
+        self._key = f'"{key}"'
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'seek'  # seek -> items -> done
+        self.count = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == 'done'
+
+    def feed(self, chunk: bytes) -> Iterator[dict]:
+        """Add a chunk and yield every record it completes"""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        while True:
+            try:
+                record = self._next()
+            except _NeedMore:
+                return
+            if record is None:
+                return
+            self.count += 1
+            yield record
+
+    def close(self) -> None:
+        """Check that the body ended after a complete records array"""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b'', final=True)
+        self._pos = 0
+        if self._state != 'done':
+            raise ValueError(f"Response ended before the {self._key} array was complete")
+
+    def _skip_whitespace(self) -> None:
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        self._pos = pos
+
+    def _next(self):
+        buffer = self._buffer
+        if self._state == 'seek':
+            index = buffer.find(self._key, self._pos)
+            if index < 0:
+                # Keep enough of the tail to match a key split across chunks
+                self._pos = max(self._pos, len(buffer) - len(self._key))
+                raise _NeedMore
+            after = index + len(self._key)
+            rest = buffer[after:].lstrip()
+            if not rest or (rest[0] == ':' and not rest[1:].lstrip()):
+                raise _NeedMore
+            if rest[0] != ':' or rest[1:].lstrip()[0] != '[':
+                # The key text appeared inside some other value
+                self._pos = after
+                return self._next()
+            self._pos = buffer.index('[', after) + 1
+            self._state = 'items'
+            buffer = self._buffer
+
+        if self._state == 'done':
+            return None
+
+        while True:
+            self._skip_whitespace()
+            if self._pos >= len(buffer):
+                raise _NeedMore
+            char = buffer[self._pos]
+            if char == ',':
+                self._pos += 1
+                continue
+            if char == ']':
+                self._pos += 1
+                self._state = 'done'
+                return None
+            try:
+                record, end = self._decoder.raw_decode(buffer, self._pos)
+            except json.JSONDecodeError:
+                # Records end in '}', so a failed decode here is a partial record
+                raise _NeedMore
+            self._pos = end
+            return record
+
+
+def iter_records(chunks: Iterable[bytes], key: str = 'records') -> Iterator[dict]:
+    """Yield records from a JSON body arriving as an iterable of byte chunks"""
+    stream = RecordStream(key)
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+        if stream.done:
+            break
+    stream.close()
@@ -0,0 +1,244 @@
+"""Non-blocking callback dispatch through a bounded queue
+
+Monitors hand callbacks to a CallbackDispatcher instead of calling them
+inline, so a slow consumer (a database write, a push notification) no
+longer stretches the polling period. Calls wait in a bounded queue and
+run on worker threads, or in worker processes for CPU-heavy callbacks.
+The overflow policy decides what happens under pressure:
+
+    block     when the queue is full the publisher waits for space (up to
+              block_timeout seconds, then the call is dropped)
+    drop      when the queue is full the new call is dropped
+    coalesce  a call that is still queued for the same callback and key
+              (e.g. account) takes the new arguments, so a lagging consumer
+              skips straight to the latest reading; when the queue is full
+              the oldest call is dropped
+
+With more than one worker, calls for the same key may run concurrently.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+
+POLICIES = ('block', 'drop', 'coalesce')
+
+# Latency samples kept per callback for the percentiles in stats()
+_SAMPLES = 1024
+
+
+def callback_name(callback: Callable) -> str:
+    """Name used for a callback's metrics"""
+    return getattr(callback, '__qualname__', None) or repr(callback)
+
+
+class _CallbackStats:
+    __slots__ = ('calls', 'errors', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=_SAMPLES)
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.samples.append(elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+        count = len(samples)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'mean_ms': 1000 * self.total / self.calls if self.calls else 0.0,
+            'p50_ms': 1000 * samples[count // 2] if count else 0.0,
+            'p99_ms': 1000 * samples[min(count - 1, int(count * 0.99))] if count else 0.0,
+            'max_ms': 1000 * self.max,
+        }
+
+
+class CallbackDispatcher:
+    """Run callbacks on a worker pool fed by a bounded queue
+
+    submit(callback, *args, key=account) queues one call and returns at
+    once. Start the workers with start() (monitors do this when they
+    start) and stop them with stop(), which by default drains the queue
+    first; calls submitted before start() wait in the queue. With
+    processes=True callbacks run in a ProcessPoolExecutor, so callbacks
+    and their arguments must be picklable.
+    """
+
+    def __init__(self, max_queue: int = 1024, workers: int = 4,
+                 policy: str = 'coalesce', processes: bool = False,
+                 block_timeout: Optional[float] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        self.max_queue = max_queue
+        self.workers = workers
+        self.policy = policy
+        self.processes = processes
+        self.block_timeout = block_timeout
+
+        # Queued calls are [coalesce key, callback, args, enqueue time]
+        self._queue: Deque[List[Any]] = deque()
+        self._pending: Dict[Any, List[Any]] = {}  # coalesce key -> queued call
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._idle = 0
+        self.running = False
+
+        self.counts = {'submitted': 0, 'delivered': 0, 'dropped': 0,
+                       'coalesced': 0, 'blocked': 0}
+        self.max_depth = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._callbacks: Dict[str, _CallbackStats] = {}
+
+    def start(self) -> None:
+        """Start the worker threads (and process pool); safe to call twice"""
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        if self.processes:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._threads = [threading.Thread(target=self._worker, daemon=True,
+                                          name=f"dexcom-dispatch-{i}")
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = 5) -> None:
+        """Stop the workers, delivering queued calls first unless drain=False"""
+        with self._cond:
+            if not drain:
+                self.counts['dropped'] += len(self._queue)
+                self._queue.clear()
+                self._pending.clear()
+            self.running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def submit(self, callback: Callable, *args: Any, key: Hashable = None) -> bool:
+        """Queue callback(*args), returning False if the call was dropped"""
+        now = time.monotonic()
+        with self._cond:
+            self.counts['submitted'] += 1
+            # Keyed on the callback itself: distinct lambdas, or bound methods of
+            # different instances, share a __qualname__ but must not be merged
+            coalesce_key = (callback, key) if self.policy == 'coalesce' else None
+            if coalesce_key is not None:
+                queued = self._pending.get(coalesce_key)
+                if queued is not None:
+                    # Replace the queued call's arguments; it keeps its place in line
+                    queued[2] = args
+                    self.counts['coalesced'] += 1
+                    return True
+
+            if len(self._queue) >= self.max_queue:
+                if self.policy == 'drop':
+                    self.counts['dropped'] += 1
+                    return False
+                if self.policy == 'coalesce':
+                    oldest = self._queue.popleft()
+                    self._pending.pop(oldest[0], None)
+                    self.counts['dropped'] += 1
+                else:
+                    self.counts['blocked'] += 1
+                    deadline = None if self.block_timeout is None else now + self.block_timeout
+                    while len(self._queue) >= self.max_queue and self.running:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.counts['dropped'] += 1
+                            return False
+                        self._cond.wait(remaining)
+                    if len(self._queue) >= self.max_queue:
+                        # Stopped while waiting
+                        self.counts['dropped'] += 1
+                        return False
+
+            call = [coalesce_key, callback, args, now]
+            self._queue.append(call)
+            if coalesce_key is not None:
+                self._pending[coalesce_key] = call
+            if len(self._queue) > self.max_depth:
+                self.max_depth = len(self._queue)
+            self._cond.notify()
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if not self.running:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                coalesce_key, callback, args, queued_at = self._queue.popleft()
+                if coalesce_key is not None:
+                    self._pending.pop(coalesce_key, None)
+                self._cond.notify_all()  # wake publishers blocked on a full queue
+
+            started = time.monotonic()
+            failed = False
+            try:
+                if self._pool is not None:
+                    self._pool.submit(callback, *args).result()
+                else:
+                    callback(*args)
+            except Exception as e:
+                failed = True
+                print(f"Callback error in {callback_name(callback)}: {e}")
+            finished = time.monotonic()
+
+            with self._cond:
+                self.counts['delivered'] += 1
+                wait = started - queued_at
+                self._wait_total += wait
+                if wait > self._wait_max:
+                    self._wait_max = wait
+                name = callback_name(callback)
+                stats = self._callbacks.get(name)
+                if stats is None:
+                    stats = self._callbacks[name] = _CallbackStats()
+                stats.record(finished - started, failed)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the queue is empty and every worker is idle"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if not self._queue and self._idle == len(self._threads):
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, drop/coalesce counters, queue wait and per-callback latency"""
+        with self._cond:
+            delivered = self.counts['delivered']
+            return {
+                'queue_depth': len(self._queue),
+                'max_depth': self.max_depth,
+                **self.counts,
+                'mean_wait_ms': 1000 * self._wait_total / delivered if delivered else 0.0,
+                'max_wait_ms': 1000 * self._wait_max,
+                'callbacks': {name: s.snapshot() for name, s in self._callbacks.items()},
+            }
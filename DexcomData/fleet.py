@@ -0,0 +1,358 @@
+"""Monitoring many accounts from a single scheduler thread"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .DexcomDataCode import DexcomAuth, DexcomData
+from .alerts import AlertEngine
+from .cadence import CadenceScheduler
+from .dispatch import CallbackDispatcher
+from .metrics import RollingMetrics
+from .readings import Reading
+from .store import ReadingStore
+from .trend import TrendEstimator
+
+
+class FleetAccount:
+    """Per-account state held by a FleetMonitor"""
+
+    __slots__ = ('account', 'auth', 'data', 'callback', 'latest_reading',
+                 'polls', 'failures', 'generation', 'cadence', 'metrics', 'trend')
+
+    def __init__(self, account: str, auth: DexcomAuth, data: DexcomData,
+                 callback: Optional[Callable[[str, Reading], None]] = None):
+        self.account = account
+        self.auth = auth
+        self.data = data
+        self.callback = callback
+        self.latest_reading: Optional[Reading] = None
+        self.polls = 0
+        self.failures = 0
+        self.generation = 0
+        self.cadence: Optional[CadenceScheduler] = None
+        self.metrics: Optional[RollingMetrics] = None
+        self.trend: Optional[TrendEstimator] = None
+
+
+class FleetMonitor:
+    """Poll many (auth, data) pairs from one timer heap and a bounded worker pool
+
+    Instead of one sleeping thread per account, every account has an entry
+    in a heap ordered by its next due time. Accounts are staggered across
+    the update interval when added and each reschedule adds a little
+    jitter, so polls stay spread out instead of arriving as a burst.
+    Fetches run on a ThreadPoolExecutor of max_workers threads, and at
+    most max_concurrency fetches are in flight across the whole fleet.
+
+    Tokens are refreshed on demand through DexcomAuth.get_access_token, so
+    no per-account refresh timer threads are started. With metrics=True
+    every account keeps a RollingMetrics, so dashboards can read current
+    time in range and friends without rescanning history. With trend=True
+    every account keeps a TrendEstimator for 15/30 minute projections, and
+    an AlertEngine evaluates its rules for every account's new readings.
+    With a CallbackDispatcher, callbacks run on its workers instead of
+    holding up the fetch threads.
+    """
+
+    def __init__(self, update_interval: float = 300,
+                 max_workers: int = 32,
+                 max_concurrency: Optional[int] = None,
+                 jitter: float = 0.05,
+                 store: Optional[ReadingStore] = None,
+                 verbose: bool = False,
+                 adaptive: bool = False,
+                 metrics: bool = False,
+                 trend: bool = False,
+                 alerts: Optional[AlertEngine] = None,
+                 dispatcher: Optional[CallbackDispatcher] = None):
+        self.update_interval = update_interval
+        self.adaptive = adaptive  # per-account CadenceScheduler instead of a fixed interval
+        self.metrics = metrics    # per-account RollingMetrics, updated on every new reading
+        self.trend = trend        # per-account TrendEstimator, updated on every new reading
+        self.alerts = alerts      # shared by all accounts; state is kept per account
+        self.dispatcher = dispatcher
+        self._started_dispatcher = False
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self.jitter = jitter  # fraction of update_interval
+        self.store = store
+        self.verbose = verbose
+        self.callback: Optional[Callable[[str, Reading], None]] = None
+        self.subscribers: List[Callable[[str, Reading], None]] = []
+        self.metrics_callback: Optional[Callable[[str, Reading, Dict[str, Any]], None]] = None
+        self.trend_callback: Optional[Callable[[str, Reading, Dict[str, Any]], None]] = None
+
+        self.accounts: Dict[str, FleetAccount] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = 0
+        # Never reused, so heap entries of a removed account stay stale after it is re-added
+        self._generations = itertools.count(1)
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scheduler: Optional[threading.Thread] = None
+        self.running = False
+
+        # Scheduling lag: how late polls start relative to their due time
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._started_polls = 0
+        self._in_flight = 0
+
+    def set_callback(self, callback: Callable[[str, Reading], None]) -> None:
+        """Set a fleet-wide callback, called as callback(account, reading)"""
+        self.callback = callback
+
+    def add_callback(self, callback: Callable[[str, Reading], None]) -> None:
+        """Subscribe another fleet-wide callback(account, reading)"""
+        self.subscribers.append(callback)
+
+    def remove_callback(self, callback: Callable[[str, Reading], None]) -> None:
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def set_metrics_callback(self, callback: Callable[[str, Reading, Dict[str, Any]], None]) -> None:
+        """Set a fleet-wide callback, called as callback(account, reading, metrics snapshot)
+
+        Only called when the fleet was created with metrics=True.
+        """
+        self.metrics_callback = callback
+
+    def set_trend_callback(self, callback: Callable[[str, Reading, Dict[str, Any]], None]) -> None:
+        """Set a fleet-wide callback, called as callback(account, reading, trend forecast)
+
+        Only called when the fleet was created with trend=True.
+        """
+        self.trend_callback = callback
+
+    def add_account(self, account: str, auth: DexcomAuth, data: DexcomData,
+                    callback: Optional[Callable[[str, Reading], None]] = None,
+                    first_poll: Optional[float] = None) -> None:
+        """Add or replace an account; its first poll is staggered across the interval"""
+        entry = FleetAccount(account, auth, data, callback)
+        if self.adaptive:
+            entry.cadence = CadenceScheduler(period=self.update_interval)
+        if self.metrics:
+            entry.metrics = RollingMetrics()
+        if self.trend:
+            entry.trend = TrendEstimator()
+        if self.store is not None:
+            entry.latest_reading = self.store.latest(account)
+            if entry.latest_reading and account not in data.last_seen:
+                data.last_seen[account] = entry.latest_reading.system_time
+            if entry.metrics is not None:
+                entry.metrics.load(self.store, account)
+            if entry.trend is not None:
+                entry.trend.load(self.store, account)
+
+        if first_poll is None:
+            first_poll = time.monotonic() + random.uniform(0, self.update_interval)
+        with self._cond:
+            entry.generation = next(self._generations)
+            self.accounts[account] = entry
+            self._push(first_poll, entry)
+            self._cond.notify()
+
+    def remove_account(self, account: str) -> None:
+        """Stop polling an account and drop its incremental state
+
+        Its heap entry is discarded when it comes due.
+        """
+        with self._cond:
+            entry = self.accounts.pop(account, None)
+        if entry is not None:
+            entry.data.reset_incremental(account)
+
+    def _push(self, due: float, entry: FleetAccount) -> None:
+        # Caller holds self._cond
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, entry.account, entry.generation))
+
+    def start_monitoring(self) -> bool:
+        """Start the scheduler thread and worker pool"""
+        if self.running:
+            print("Fleet monitoring already running.")
+            return False
+        self.running = True
+        if self.dispatcher is not None and not self.dispatcher.running:
+            self.dispatcher.start()
+            self._started_dispatcher = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='dexcom-fleet')
+        self._scheduler = threading.Thread(target=self._schedule_loop, daemon=True,
+                                           name='dexcom-fleet-scheduler')
+        self._scheduler.start()
+        print(f"Started fleet monitoring of {len(self.accounts)} accounts "
+              f"({self.max_workers} workers, {self.max_concurrency} concurrent fetches)")
+        return True
+
+    def stop_monitoring(self, wait: bool = True) -> None:
+        """Stop scheduling new polls and shut the worker pool down"""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._scheduler:
+            self._scheduler.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+        if self._started_dispatcher:
+            self.dispatcher.stop(drain=wait)
+            self._started_dispatcher = False
+        print("Stopped fleet monitoring")
+
+    def _schedule_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self.running:
+                    if self._heap:
+                        delay = self._heap[0][0] - time.monotonic()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if not self.running:
+                    return
+                due, _, account, generation = heapq.heappop(self._heap)
+                entry = self.accounts.get(account)
+                if entry is None or entry.generation != generation:
+                    continue
+
+            # Global concurrency cap: wait for a free slot outside the lock
+            while not self._slots.acquire(timeout=0.5):
+                if not self.running:
+                    return
+            lag = time.monotonic() - due
+            with self._cond:
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+                self._started_polls += 1
+                self._in_flight += 1
+            try:
+                self._executor.submit(self._poll, entry, due)
+            except RuntimeError:
+                # Executor shut down while we were waiting for a slot
+                with self._cond:
+                    self._in_flight -= 1
+                self._slots.release()
+                return
+
+    def _next_due(self, entry: FleetAccount, due: float) -> float:
+        if entry.cadence is not None:
+            return time.monotonic() + entry.cadence.next_delay()
+        spread = self.jitter * self.update_interval
+        next_due = due + self.update_interval + random.uniform(-spread, spread)
+        # Never schedule in the past if a poll ran long
+        return max(next_due, time.monotonic())
+
+    def _poll(self, entry: FleetAccount, due: float) -> None:
+        try:
+            self.poll_account(entry)
+        finally:
+            self._slots.release()
+            with self._cond:
+                self._in_flight -= 1
+                if self.running and self.accounts.get(entry.account) is entry:
+                    self._push(self._next_due(entry, due), entry)
+                    self._cond.notify()
+
+    def poll_account(self, entry: FleetAccount) -> Optional[Reading]:
+        """Fetch new readings for one account and dispatch the newest"""
+        entry.polls += 1
+        try:
+            if not entry.auth.is_authenticated():
+                entry.failures += 1
+                return None
+            new_readings = entry.data.get_new_readings(entry.auth.get_access_token(),
+                                                       account=entry.account)
+            if new_readings is None and entry.auth.refresh_access_token():
+                new_readings = entry.data.get_new_readings(entry.auth.access_token,
+                                                           account=entry.account)
+            if entry.cadence is not None:
+                entry.cadence.record_poll(r.system_time for r in new_readings or [])
+            if new_readings is None:
+                entry.failures += 1
+                return None
+            if not new_readings:
+                return None
+
+            if self.store is not None:
+                self.store.upsert(entry.account, new_readings)
+            if entry.metrics is not None:
+                entry.metrics.extend(new_readings)
+            if entry.trend is not None:
+                entry.trend.extend(new_readings)
+            if self.alerts is not None:
+                self.alerts.evaluate(entry.account, new_readings, trend=entry.trend)
+            reading = new_readings[-1]
+            entry.latest_reading = reading
+            if self.verbose:
+                print(f"[{entry.account}] {reading!r}")
+
+            for callback in [entry.callback, self.callback] + self.subscribers:
+                if callback:
+                    self._notify(callback, entry.account, reading)
+            if self.metrics_callback and entry.metrics is not None:
+                self._notify(self.metrics_callback, entry.account, reading,
+                             entry.metrics.snapshot())
+            if self.trend_callback and entry.trend is not None:
+                self._notify(self.trend_callback, entry.account, reading,
+                             entry.trend.forecast())
+            return reading
+        except Exception as e:
+            entry.failures += 1
+            print(f"Fleet poll error for {entry.account}: {e}")
+            return None
+
+    def _notify(self, callback: Callable, account: str, *args: Any) -> None:
+        if self.dispatcher is not None:
+            self.dispatcher.submit(callback, account, *args, key=account)
+            return
+        try:
+            callback(account, *args)
+        except Exception as e:
+            print(f"Callback error for {account}: {e}")
+
+    def get_current_reading(self, account: str) -> Optional[Reading]:
+        entry = self.accounts.get(account)
+        return entry.latest_reading if entry else None
+
+    def get_metrics(self, account: str) -> Optional[Dict[str, Any]]:
+        """Current rolling metrics for one account (requires metrics=True)"""
+        entry = self.accounts.get(account)
+        if entry is None or entry.metrics is None:
+            return None
+        entry.metrics.expire(int(time.time()))
+        return entry.metrics.snapshot()
+
+    def get_forecast(self, account: str) -> Optional[Dict[str, Any]]:
+        """Current rate of change and projections for one account (requires trend=True)"""
+        entry = self.accounts.get(account)
+        if entry is None or entry.trend is None:
+            return None
+        return entry.trend.forecast()
+
+    def stats(self) -> Dict[str, Any]:
+        """Fleet-wide counters"""
+        entries = list(self.accounts.values())
+        started = self._started_polls
+        stats = {
+            'accounts': len(entries),
+            'polls': sum(e.polls for e in entries),
+            'failures': sum(e.failures for e in entries),
+            'in_flight': self._in_flight,
+            'scheduled': len(self._heap),
+            'mean_lag': self._lag_total / started if started else 0.0,
+            'max_lag': self._lag_max,
+        }
+        if self.adaptive:
+            cadences = [e.cadence.metrics() for e in entries if e.cadence is not None]
+            freshness = [m['mean_freshness'] for m in cadences if m['mean_freshness'] is not None]
+            stats['wasted_polls'] = sum(m['wasted_polls'] for m in cadences)
+            stats['mean_freshness'] = sum(freshness) / len(freshness) if freshness else None
+        return stats
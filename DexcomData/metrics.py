@@ -0,0 +1,151 @@
+"""Rolling glycemic metrics with constant-time updates"""
+
+import math
+import time
+from array import array
+from typing import Any, Dict, Iterable, Optional
+
+from .readings import Reading
+from .store import ReadingStore
+
+
+DEFAULT_WINDOWS = {'1h': 3600, '24h': 86400, '14d': 14 * 86400}
+
+
+class RollingWindow:
+    """Running sums over the readings of the last `length` seconds
+
+    Windows do not hold readings themselves: RollingMetrics keeps one
+    shared buffer and each window remembers the index of its oldest
+    reading. Values are whole mg/dL, so the sums are exact integers and
+    never drift however long the window runs.
+    """
+
+    __slots__ = ('length', 'low', 'high', 'head', 'count', 'total',
+                 'total_sq', 'below', 'above')
+
+    def __init__(self, length: int, low: int = 70, high: int = 180):
+        self.length = length
+        self.low = low
+        self.high = high
+        self.head = 0  # index of the oldest reading in the shared buffer
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.below = 0
+        self.above = 0
+
+    def add(self, value: int) -> None:
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        if value < self.low:
+            self.below += 1
+        elif value > self.high:
+            self.above += 1
+
+    def expire(self, times: array, values: array, now: int) -> None:
+        """Drop readings older than the window, measured back from now"""
+        cutoff = now - self.length
+        head = self.head
+        end = len(times)
+        while head < end and times[head] <= cutoff:
+            value = values[head]
+            self.count -= 1
+            self.total -= value
+            self.total_sq -= value * value
+            if value < self.low:
+                self.below -= 1
+            elif value > self.high:
+                self.above -= 1
+            head += 1
+        self.head = head
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Mean, SD, CV, GMI and time below/in/above range (percent of readings)"""
+        count = self.count
+        if not count:
+            return {'count': 0, 'mean': None, 'sd': None, 'cv': None, 'gmi': None,
+                    'time_below': None, 'time_in_range': None, 'time_above': None}
+        mean = self.total / count
+        variance = max(self.total_sq / count - mean * mean, 0.0)
+        sd = math.sqrt(variance)
+        in_range = count - self.below - self.above
+        return {
+            'count': count,
+            'mean': round(mean, 1),
+            'sd': round(sd, 1),
+            'cv': round(100 * sd / mean, 1) if mean else None,
+            'gmi': round(3.31 + 0.02392 * mean, 2),
+            'time_below': round(100 * self.below / count, 1),
+            'time_in_range': round(100 * in_range / count, 1),
+            'time_above': round(100 * self.above / count, 1),
+        }
+
+
+class RollingMetrics:
+    """Time in range, mean glucose, GMI and CV over several sliding windows
+
+    Feed readings as they arrive with add(); each one updates every
+    window in constant time, and snapshot() reads the current metrics
+    without touching history. Readings older than the newest one seen are
+    ignored, so replays and overlapping fetches do not double count.
+    Thresholds are mg/dL (defaults: 70-180 target range).
+
+    Readings are kept once, as 10 bytes each in compact arrays spanning the
+    longest window (about 40 KB for 14 days), however many windows there are.
+    """
+
+    def __init__(self, windows: Optional[Dict[str, int]] = None,
+                 low: int = 70, high: int = 180):
+        self.low = low
+        self.high = high
+        self.windows = {name: RollingWindow(length, low, high)
+                        for name, length in (windows or DEFAULT_WINDOWS).items()}
+        self.latest_time: Optional[int] = None
+        self.skipped = 0
+        self._times = array('q')
+        self._values = array('H')
+
+    def add(self, reading: Reading) -> bool:
+        """Add one reading, returning False if it was skipped"""
+        value = reading.value
+        ts = reading.system_time
+        if not value or (self.latest_time is not None and ts <= self.latest_time):
+            self.skipped += 1
+            return False
+        self.latest_time = ts
+        self._times.append(ts)
+        self._values.append(value)
+        for window in self.windows.values():
+            window.add(value)
+        self.expire(ts)
+        return True
+
+    def extend(self, readings: Iterable[Reading]) -> int:
+        """Add readings oldest first, returning how many were used"""
+        return sum(self.add(r) for r in readings)
+
+    def load(self, store: ReadingStore, account: str, now: Optional[int] = None) -> int:
+        """Prime the windows from stored readings (once, e.g. at startup)"""
+        now = int(time.time()) if now is None else now
+        longest = max(window.length for window in self.windows.values())
+        return self.extend(store.query(account, now - longest, now))
+
+    def expire(self, now: int) -> None:
+        """Age the windows to `now` (epoch seconds) when no new reading has arrived"""
+        times, values = self._times, self._values
+        windows = self.windows.values()
+        for window in windows:
+            window.expire(times, values, now)
+        # Compact once the readings no window needs make up half the buffer
+        oldest = min(window.head for window in windows)
+        if oldest > 64 and oldest * 2 > len(times):
+            del times[:oldest]
+            del values[:oldest]
+            for window in windows:
+                window.head -= oldest
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current metrics for every window, keyed by window name"""
+        return {name: window.snapshot() for name, window in self.windows.items()}
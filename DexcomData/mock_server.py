@@ -0,0 +1,368 @@
+"""Local stand-in for the Dexcom API, for offline testing and benchmarks
+
+Serves /v2/oauth2/token, /v3/users/self/egvs and /v3/users/self/dataRange
+with synthetic CGM traces and can inject latency, 401/429/5xx errors and
+non-JSON 200 responses:
+
+    with MockDexcomServer(latency=0.02, error_rates={429: 0.01}) as server:
+        auth = DexcomAuth('id', 'secret', base_url=server.auth_base_url)
+        data = DexcomData(base_url=server.data_base_url)
+
+Or run standalone: python -m DexcomData.mock_server --port 8000
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+_TRENDS = [(-3, 'doubleDown'), (-2, 'singleDown'), (-1, 'fortyFiveDown'),
+           (1, 'flat'), (2, 'fortyFiveUp'), (3, 'singleUp')]
+
+
+def _trend_name(rate: float) -> str:
+    for limit, name in _TRENDS:
+        if rate < limit:
+            return name
+    return 'doubleUp'
+
+
+class SyntheticTrace:
+    """Deterministic synthetic CGM trace for one account
+
+    Glucose follows a daily cycle, a few meal-sized excursions and
+    hash-based noise, sampled every `period` seconds at an account-specific
+    phase. The same account and time always give the same value.
+    """
+
+    def __init__(self, account: str, period: int = 300):
+        digest = hashlib.sha256(account.encode()).digest()
+        self.account = account
+        self.period = period
+        self.phase = int.from_bytes(digest[:2], 'big') % period
+        self.baseline = 110 + digest[2] % 40
+        self.seed = int.from_bytes(digest[3:7], 'big')
+
+    def value_at(self, t: int) -> int:
+        day = 2 * math.pi * (t % 86400) / 86400
+        meals = 2 * math.pi * (t % 21600) / 21600
+        noise = (hash((self.seed, t)) % 1000) / 1000 - 0.5
+        value = self.baseline + 35 * math.sin(day) + 25 * max(math.sin(meals), 0) ** 3 + 6 * noise
+        return int(min(max(value, 40), 400))
+
+    def times(self, start: int, end: int) -> range:
+        """Sample times in [start, end]"""
+        first = start - (start - self.phase) % self.period
+        if first < start:
+            first += self.period
+        return range(first, end + 1, self.period)
+
+    def records(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """EGV records in [start, end], newest first like the real API"""
+        records = []
+        previous = None
+        for t in self.times(start, end):
+            value = self.value_at(t)
+            if previous is None:
+                previous = self.value_at(t - self.period)
+            rate = round((value - previous) / (self.period / 60), 1)
+            previous = value
+            stamp = time.strftime(TIME_FORMAT, time.gmtime(t))
+            records.append({
+                'recordId': f'{self.seed:08x}-{t}',
+                'systemTime': stamp,
+                'displayTime': stamp,
+                'transmitterId': f'{self.seed:08x}',
+                'transmitterTicks': t - 1_600_000_000,
+                'value': value,
+                'status': None,
+                'trend': _trend_name(rate),
+                'trendRate': rate,
+                'unit': 'mg/dL',
+                'rateUnit': 'mg/dL/min',
+                'displayDevice': 'iOS',
+                'transmitterGeneration': 'g7',
+            })
+        records.reverse()
+        return records
+
+
+class MockDexcomServer:
+    """Threaded HTTP server imitating the Dexcom OAuth and EGV endpoints
+
+    latency: seconds added to every response (plus uniform latency_jitter)
+    error_rates: probability per status code, e.g. {401: 0.01, 429: 0.02, 503: 0.01}
+    malformed_rate: probability of answering a data request with 200 and an
+        HTML body, as a captive portal or misbehaving proxy would
+    publish_lag: readings newer than this many seconds are not returned yet
+    history_days: how far back each account's data goes
+    data_range: serve the dataRange endpoint (False answers it with 404)
+    strict_tokens: reject bearer tokens the server did not issue (or that
+        expired) with 401; otherwise any bearer token is accepted and used
+        as the account identity
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rates: Optional[Dict[int, float]] = None,
+                 malformed_rate: float = 0.0,
+                 publish_lag: int = 0,
+                 token_lifetime: int = 7200,
+                 strict_tokens: bool = False,
+                 period: int = 300,
+                 history_days: float = 90,
+                 data_range: bool = True,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rates = dict(error_rates or {})
+        self.malformed_rate = malformed_rate
+        self.publish_lag = publish_lag
+        self.token_lifetime = token_lifetime
+        self.strict_tokens = strict_tokens
+        self.period = period
+        self.history_start = int(time.time() - history_days * 86400)
+        self.data_range = data_range
+        self._random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, Tuple[str, float]] = {}  # access token -> (account, expires)
+        self._refresh_tokens: Dict[str, str] = {}        # refresh token -> account
+        self._traces: Dict[str, SyntheticTrace] = {}
+        self.counts: Dict[str, int] = {}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # -- lifecycle -------------------------------------------------------
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def auth_base_url(self) -> str:
+        return f'{self.base_url}/v2'
+
+    @property
+    def data_base_url(self) -> str:
+        return f'{self.base_url}/v3'
+
+    def start(self) -> 'MockDexcomServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True,
+                                        name='mock-dexcom')
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockDexcomServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # -- state -----------------------------------------------------------
+
+    def trace(self, account: str) -> SyntheticTrace:
+        with self._lock:
+            trace = self._traces.get(account)
+            if trace is None:
+                trace = self._traces[account] = SyntheticTrace(account, self.period)
+            return trace
+
+    def issue_tokens(self, account: str) -> Dict[str, Any]:
+        access = secrets.token_hex(16)
+        refresh = secrets.token_hex(16)
+        with self._lock:
+            self._tokens[access] = (account, time.time() + self.token_lifetime)
+            self._refresh_tokens[refresh] = account
+        return {'access_token': access, 'refresh_token': refresh,
+                'expires_in': self.token_lifetime, 'token_type': 'Bearer'}
+
+    def expire_token(self, access_token: str) -> None:
+        """Make an issued access token fail with 401 from now on"""
+        with self._lock:
+            if access_token in self._tokens:
+                account, _ = self._tokens[access_token]
+                self._tokens[access_token] = (account, 0)
+
+    def account_for(self, access_token: str) -> Optional[str]:
+        with self._lock:
+            entry = self._tokens.get(access_token)
+        if entry is None:
+            return None if self.strict_tokens else access_token
+        account, expires = entry
+        return account if time.time() < expires else None
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _injected_error(self) -> Optional[int]:
+        roll = self._random.random()
+        for status, rate in self.error_rates.items():
+            if roll < rate:
+                return status
+            roll -= rate
+        return None
+
+    # -- request handling ------------------------------------------------
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any],
+                      headers: Optional[Dict[str, str]] = None) -> None:
+                self._send_bytes(status, json.dumps(body).encode(), 'application/json', headers)
+
+            def _send_bytes(self, status: int, payload: bytes, content_type: str,
+                            headers: Optional[Dict[str, str]] = None) -> None:
+                # Counted before replying, so a client that has its response sees it counted
+                server._count(f'{self.command} {urlparse(self.path).path} {status}')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _simulate(self) -> bool:
+                """Apply latency and injected errors; True if a response was sent"""
+                delay = server.latency
+                if server.latency_jitter:
+                    delay += server._random.uniform(0, server.latency_jitter)
+                if delay:
+                    time.sleep(delay)
+                status = server._injected_error()
+                if status is None:
+                    return False
+                headers = {'Retry-After': '1'} if status == 429 else None
+                self._send(status, {'error': f'injected {status}'}, headers)
+                return True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                if urlparse(self.path).path != '/v2/oauth2/token':
+                    self._send(404, {'error': 'not found'})
+                    return
+                if self._simulate():
+                    return
+                grant = form.get('grant_type')
+                if grant == 'authorization_code' and form.get('code'):
+                    self._send(200, server.issue_tokens(form['code']))
+                elif grant == 'refresh_token':
+                    with server._lock:
+                        account = server._refresh_tokens.get(form.get('refresh_token', ''))
+                    if account is None:
+                        self._send(400, {'error': 'invalid_grant'})
+                    else:
+                        self._send(200, server.issue_tokens(account))
+                else:
+                    self._send(400, {'error': 'unsupported_grant_type'})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                routes = {'/v3/users/self/egvs': self._egvs}
+                if server.data_range:
+                    routes['/v3/users/self/dataRange'] = self._data_range
+                handler = routes.get(url.path)
+                if handler is None:
+                    self._send(404, {'error': 'not found'})
+                    return
+                if self._simulate():
+                    return
+                auth = self.headers.get('Authorization', '')
+                account = server.account_for(auth[7:]) if auth.startswith('Bearer ') else None
+                if account is None:
+                    self._send(401, {'error': 'invalid_token'})
+                    return
+                if server.malformed_rate and server._random.random() < server.malformed_rate:
+                    self._send_bytes(200, b'<html><body>Service unavailable</body></html>', 'text/html')
+                    return
+                handler(url, account)
+
+            def _data_range(self, url, account: str) -> None:
+                trace = server.trace(account)
+                times = trace.times(server.history_start, int(time.time()) - server.publish_lag)
+                egvs = None
+                if len(times):
+                    egvs = {edge: {'systemTime': stamp, 'displayTime': stamp}
+                            for edge, stamp in (('start', time.strftime(TIME_FORMAT, time.gmtime(times[0]))),
+                                                ('end', time.strftime(TIME_FORMAT, time.gmtime(times[-1]))))}
+                self._send(200, {'recordType': 'dataRange', 'recordVersion': '3.0',
+                                 'userId': account, 'calibrations': None, 'egvs': egvs,
+                                 'events': None})
+
+            def _egvs(self, url, account: str) -> None:
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    start = _parse(query['startDate'])
+                    end = _parse(query['endDate'])
+                except (KeyError, ValueError):
+                    self._send(400, {'error': 'startDate and endDate are required'})
+                    return
+                start = max(start, server.history_start)
+                end = min(end, int(time.time()) - server.publish_lag)
+                records = server.trace(account).records(start, end) if end >= start else []
+                self._send(200, {'recordType': 'egv', 'recordVersion': '3.0',
+                                 'userId': account, 'records': records})
+
+        return Handler
+
+
+def _parse(value: str) -> int:
+    dt = datetime.datetime.strptime(value[:19], TIME_FORMAT)
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local mock Dexcom API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', action='append', default=[], metavar='STATUS=RATE',
+                        help='inject an error, e.g. --error-rate 429=0.05')
+    args = parser.parse_args()
+
+    error_rates = {}
+    for item in args.error_rate:
+        status, rate = item.split('=')
+        error_rates[int(status)] = float(rate)
+
+    server = MockDexcomServer(args.host, args.port, latency=args.latency, error_rates=error_rates)
+    print(f"Mock Dexcom API on {server.base_url} (auth: {server.auth_base_url}, data: {server.data_base_url})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
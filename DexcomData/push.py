@@ -0,0 +1,161 @@
+"""Fan-out of live readings to streaming subscribers (Server-Sent Events)
+
+Each account has a channel holding its most recent events. publish()
+serializes an event once, as a complete SSE frame, and appends it to the
+channel; every subscriber reads the same bytes from there, so the cost of
+a new reading does not grow with the number of dashboards beyond waking
+them up. Subscribers remember the id of the last event they sent and
+resume from it, which is also how a reconnecting EventSource's
+Last-Event-ID header is honoured. Idle streams get a comment line every
+`heartbeat` seconds so proxies keep them open.
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+
+# (event id, SSE frame, raw payload)
+Event = Tuple[int, bytes, bytes]
+Backlog = Callable[[str, int, int], Iterable[Tuple[int, bytes]]]
+
+HEARTBEAT_FRAME = b': heartbeat\n\n'
+
+
+def sse_frame(event_id: int, data: Union[str, bytes], event: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Events frame"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    lines = [f'id: {event_id}']
+    if event:
+        lines.append(f'event: {event}')
+    lines.extend('data: ' + line for line in data.split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+class _Channel:
+    __slots__ = ('cond', 'events', 'subscribers')
+
+    def __init__(self, history: int):
+        self.cond = threading.Condition()
+        self.events: Deque[Event] = deque(maxlen=history)
+        self.subscribers = 0
+
+
+class Broadcaster:
+    """Per-account event channels that many streams read from
+
+    Event ids must increase per account; the server uses the reading's
+    systemTime in epoch seconds, so ids stay meaningful across restarts.
+    `history` events are kept per account for resuming; older gaps can be
+    filled from a backlog callable (e.g. the reading store).
+    """
+
+    def __init__(self, history: int = 288, heartbeat: float = 15.0):
+        self.history = history
+        self.heartbeat = heartbeat
+        self.closed = False
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+        self.counts = {'published': 0, 'streams': 0}
+
+    def _channel(self, account: str) -> _Channel:
+        channel = self._channels.get(account)
+        if channel is None:
+            with self._lock:
+                channel = self._channels.setdefault(account, _Channel(self.history))
+        return channel
+
+    def publish(self, account: str, event_id: int, data: Union[str, bytes],
+                event: Optional[str] = None) -> bool:
+        """Serialize an event once and wake the account's subscribers
+
+        Returns False (and drops the event) if its id is not newer than
+        the last one published for the account.
+        """
+        payload = data.encode('utf-8') if isinstance(data, str) else data
+        frame = sse_frame(event_id, payload, event)
+        channel = self._channel(account)
+        with channel.cond:
+            if channel.events and event_id <= channel.events[-1][0]:
+                return False
+            channel.events.append((event_id, frame, payload))
+            channel.cond.notify_all()
+        self.counts['published'] += 1
+        return True
+
+    def latest_id(self, account: str) -> Optional[int]:
+        channel = self._channels.get(account)
+        if channel is None or not channel.events:
+            return None
+        return channel.events[-1][0]
+
+    def subscribers(self, account: Optional[str] = None) -> int:
+        """Open streams for one account, or for all"""
+        if account is not None:
+            channel = self._channels.get(account)
+            return channel.subscribers if channel else 0
+        return sum(channel.subscribers for channel in list(self._channels.values()))
+
+    def stream(self, account: str, last_event_id: Optional[int] = None,
+               backlog: Optional[Backlog] = None, raw: bool = False) -> Iterator[bytes]:
+        """Yield SSE frames for an account until close() (or the client goes away)
+
+        Without last_event_id the stream starts with the newest event.
+        With one, every later event is replayed first: from the channel,
+        and for ids older than it holds from backlog(account, after, before),
+        which yields (id, payload) pairs. raw=True yields bare payloads and
+        no heartbeats (for WebSocket transports).
+        """
+        channel = self._channel(account)
+        with channel.cond:
+            channel.subscribers += 1
+        self.counts['streams'] += 1
+        try:
+            if not raw:
+                yield b'retry: 5000\n\n'
+            with channel.cond:
+                events = list(channel.events)
+            if last_event_id is None:
+                last = events[-1][0] - 1 if events else -1
+            else:
+                last = last_event_id
+                oldest = events[0][0] if events else None
+                if backlog is not None and (oldest is None or last < oldest):
+                    for event_id, payload in backlog(account, last, oldest if oldest is not None else 2**62):
+                        yield payload if raw else sse_frame(event_id, payload, 'reading')
+                        last = event_id
+
+            while not self.closed:
+                with channel.cond:
+                    pending = self._after(channel.events, last)
+                    if not pending:
+                        channel.cond.wait(self.heartbeat)
+                        pending = self._after(channel.events, last)
+                if pending:
+                    for event_id, frame, payload in pending:
+                        yield payload if raw else frame
+                    last = pending[-1][0]
+                elif not raw and not self.closed:
+                    yield HEARTBEAT_FRAME
+        finally:
+            with channel.cond:
+                channel.subscribers -= 1
+
+    @staticmethod
+    def _after(events: Deque[Event], last: int) -> list:
+        """Events newer than `last`, scanning back from the newest"""
+        pending = []
+        for event in reversed(events):
+            if event[0] <= last:
+                break
+            pending.append(event)
+        pending.reverse()
+        return pending
+
+    def close(self) -> None:
+        """End every stream (e.g. at shutdown)"""
+        self.closed = True
+        for channel in list(self._channels.values()):
+            with channel.cond:
+                channel.cond.notify_all()
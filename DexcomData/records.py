@@ -0,0 +1,34 @@
+"""Helpers for raw EGV record dicts"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from .timestamps import to_epoch
+
+
+def latest_record(records: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return the record with the newest systemTime in a single pass
+
+    Timestamps with the same offset suffix as the current newest are
+    compared as strings, which orders the fixed API format exactly;
+    anything else is compared as epoch seconds, so mixed offsets still
+    order correctly.
+    """
+    latest = None
+    latest_time = None
+    suffix = None
+    for record in records:
+        system_time = record.get('systemTime')
+        if not system_time:
+            if latest is None:
+                latest = record
+            continue
+        if system_time[19:] == suffix:
+            if system_time <= latest_time:
+                continue
+        elif latest_time is not None and to_epoch(system_time) <= to_epoch(latest_time):
+            continue
+        latest = record
+        latest_time = system_time
+        suffix = system_time[19:]
+    return latest
+
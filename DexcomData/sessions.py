@@ -0,0 +1,200 @@
+"""Per-account token and reading state for servers with many users
+
+A SessionStore maps account names to AccountSession objects across a
+fixed number of shards. Lookups are a single dict read with no lock, so
+request handlers never contend with each other or with the poller; the
+shard locks are only taken to add or remove accounts. Within a session,
+token updates are serialized by the session's own lock, and the reading
+state is published as one immutable snapshot that readers pick up with a
+single attribute read. A RefreshScheduler runs every session's proactive
+token refresh from one thread.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class AccountSession:
+    """Tokens and the latest reading window of one account
+
+    Token fields are written under `lock`, which a refresh holds so that
+    concurrent callers share one refresh. `latest_data` / `latest_reading`
+    are read lock-free from `snapshot`; writers replace the whole snapshot
+    under `update_lock` with publish(). `last_error` holds the error of
+    the latest failed fetch, if it failed, while the snapshot keeps the
+    readings held before it.
+    """
+
+    __slots__ = ('account', 'access_token', 'refresh_token', 'expires_at',
+                 'generation', 'lock', 'update_lock', 'refresh_at', 'snapshot', 'last_error')
+
+    def __init__(self, account: str):
+        self.account = account
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None  # epoch seconds, from expires_in
+        self.generation = 0  # bumped on every token change
+        self.lock = threading.Lock()
+        self.update_lock = threading.RLock()
+        self.refresh_at: Optional[float] = None  # time.monotonic() of the pending refresh
+        # (latest_data, latest_reading, version, views), replaced as a whole
+        self.snapshot: tuple = (None, None, 0, None)
+        self.last_error: Optional[Dict[str, Any]] = None
+
+    @property
+    def latest_data(self) -> Optional[Dict[str, Any]]:
+        return self.snapshot[0]
+
+    @property
+    def latest_reading(self) -> Optional[Dict[str, Any]]:
+        return self.snapshot[1]
+
+    @property
+    def version(self) -> int:
+        """Incremented on every publish, e.g. for cache validation"""
+        return self.snapshot[2]
+
+    @property
+    def views(self) -> Optional[Dict[str, Any]]:
+        """Representations rendered from this snapshot when it was published"""
+        return self.snapshot[3]
+
+    def publish(self, data: Optional[Dict[str, Any]], latest_reading: Optional[Dict[str, Any]],
+                views: Optional[Dict[str, Any]] = None) -> None:
+        """Replace the reading state (caller holds update_lock)
+
+        views holds anything derived from the data, e.g. pre-rendered
+        responses, so readers get it from the same snapshot.
+        """
+        self.snapshot = (data, latest_reading, self.snapshot[2] + 1, views)
+
+    def is_authenticated(self) -> bool:
+        return self.access_token is not None
+
+    def cancel_refresh(self) -> None:
+        """Drop the pending scheduled refresh, if any"""
+        self.refresh_at = None
+
+    def __repr__(self) -> str:
+        state = 'authenticated' if self.access_token else 'signed out'
+        return f"AccountSession({self.account!r}, {state})"
+
+
+class SessionStore:
+    """Sharded account -> AccountSession map with lock-free reads"""
+
+    def __init__(self, shards: int = 16):
+        self._shards: List[Dict[str, AccountSession]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _index(self, account: str) -> int:
+        return hash(account) % len(self._shards)
+
+    def get(self, account: str) -> Optional[AccountSession]:
+        """The account's session, or None (no locking)"""
+        return self._shards[hash(account) % len(self._shards)].get(account)
+
+    def get_or_create(self, account: str) -> AccountSession:
+        session = self.get(account)
+        if session is not None:
+            return session
+        index = self._index(account)
+        with self._locks[index]:
+            return self._shards[index].setdefault(account, AccountSession(account))
+
+    def remove(self, account: str) -> Optional[AccountSession]:
+        """Drop an account, cancelling its scheduled refresh"""
+        index = self._index(account)
+        with self._locks[index]:
+            session = self._shards[index].pop(account, None)
+        if session is not None:
+            session.cancel_refresh()
+        return session
+
+    def sessions(self) -> List[AccountSession]:
+        """All sessions, copied shard by shard"""
+        result: List[AccountSession] = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                result.extend(shard.values())
+        return result
+
+    def authenticated(self) -> List[AccountSession]:
+        return [s for s in self.sessions() if s.access_token is not None]
+
+    def __contains__(self, account: str) -> bool:
+        return self.get(account) is not None
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self) -> Iterator[AccountSession]:
+        return iter(self.sessions())
+
+
+class RefreshScheduler:
+    """Run token refreshes for any number of sessions from one thread
+
+    Pending refreshes sit in a heap ordered by due time, so thousands of
+    signed-in accounts cost one thread rather than a timer thread each.
+    A session has at most one pending refresh, the one at its refresh_at:
+    scheduling again or cancel_refresh() replaces it, and heap entries
+    that no longer match are discarded when they come due. The thread is
+    started by the first schedule().
+    """
+
+    def __init__(self, refresh: Callable[[AccountSession], Any]):
+        self.refresh = refresh
+        self._heap: List[Tuple[float, int, AccountSession]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.counts = {'scheduled': 0, 'refreshed': 0, 'errors': 0}
+
+    def schedule(self, session: AccountSession, delay: float) -> None:
+        """Refresh the session in `delay` seconds, replacing its pending refresh"""
+        due = time.monotonic() + delay
+        with self._cond:
+            session.refresh_at = due
+            heapq.heappush(self._heap, (due, next(self._seq), session))
+            self.counts['scheduled'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name='dexcom-token-refresh')
+                self._thread.start()
+            self._cond.notify()
+
+    def _next_due(self) -> AccountSession:
+        """Wait for and pop the next refresh that is still wanted"""
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, session = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                if session.refresh_at == due:
+                    session.refresh_at = None
+                    return session
+
+    def _run(self) -> None:
+        while True:
+            session = self._next_due()
+            try:
+                self.refresh(session)
+                self.counts['refreshed'] += 1
+            except Exception as e:
+                self.counts['errors'] += 1
+                print(f"Scheduled token refresh failed for {session.account}: {e}")
+
+    def pending(self) -> int:
+        """Sessions with a refresh scheduled"""
+        with self._cond:
+            return len({id(session) for due, _, session in self._heap if session.refresh_at == due})
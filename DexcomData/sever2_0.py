@@ -1,14 +1,45 @@
-from flask import Flask, request
+from flask import Flask, Response, request, redirect, stream_with_context
+from flask import session as cookie_session
+from itsdangerous import BadSignature
+from urllib.parse import parse_qs
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_cookie
 import requests
 import webbrowser
 import threading
 import time
 import datetime
+import gzip
+import hashlib
+import json
+import secrets
+import sys
 from dotenv import load_dotenv
 import os
 
+try:
+    from flask_sock import Sock
+except ImportError:  # /ws needs the websocket extra; /stream works without it
+    Sock = None
+
+# Run as a script (python DexcomData/sever2_0.py): make the package importable
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DexcomData.push import Broadcaster
+from DexcomData.readings import Reading
+from DexcomData.records import latest_record
+from DexcomData.sessions import RefreshScheduler, SessionStore
+from DexcomData.store import ReadingStore
+from DexcomData.units import mg_dl_to_mmol_l
+from DexcomData.timestamps import format_utc, from_epoch, to_epoch
+from DexcomData.transport import get_default_transport
+
 app = Flask(__name__)
 load_dotenv()
+# Signs the session cookie that ties a browser to its Dexcom account. Without
+# SECRET_KEY every restart signs everyone out, like the in-memory tokens do.
+app.secret_key = os.getenv("SECRET_KEY") or secrets.token_hex(32)
 
 # Package into a library (lib structure, clean interface of functions that can be called, get setup.py structure)
 
@@ -20,46 +51,178 @@ AUTH_URL = 'https://api.dexcom.jp/v2/oauth2/login'
 TOKEN_URL = 'https://api.dexcom.jp/v2/oauth2/token'
 DATA_URL = 'https://api.dexcom.jp/v3/users/self/egvs'
 
-# Store tokens
-access_token = None
-refresh_token = None
-latest_data = None
+# The library's shared pooled transport: polls reuse the TLS connection to
+# Dexcom, and every call gets the transport's default timeout
+transport = get_default_transport()
+
+# Readings persist across restarts, keyed by account
+store = ReadingStore(os.getenv("DEXCOM_STORE_PATH", "dexcom_readings.db"))
+
+# Tokens and the held 24-hour window of every signed-in account, keyed by
+# Dexcom userId. Request handlers look sessions up without locking; each
+# session serializes its own token refreshes and publishes its readings as
+# one snapshot.
+sessions = SessionStore()
+REFRESH_MARGIN = 300  # refresh this long before the token expires
+REFRESH_RETRY = 30    # retry a failed refresh after this many seconds
+
+# /data bodies are rendered once per published snapshot and served with
+# strong ETags; clients are told to cache until the next poll is due
+POLL_INTERVAL = 300
+next_poll_at = 0.0  # epoch seconds, set by background_monitor
+
+# New readings are serialized once and fanned out to every /stream (and
+# /ws) subscriber of the account; event ids are systemTime epoch seconds
+broadcaster = Broadcaster(heartbeat=15.0)
+
+# /api/readings pages through the local store, never through Dexcom
+API_PAGE_SIZE = 288     # readings per page when no limit is given
+API_MAX_PAGE_SIZE = 10000
+GZIP_MIN_SIZE = 1024    # smaller bodies are sent uncompressed
+# Field -> getter on a ReadingStore.query_rows row
+# (system_time, value, display_time, trend, trend_rate)
+READING_FIELDS = {
+    'systemTime': lambda row: from_epoch(row[0]),
+    'displayTime': lambda row: from_epoch(row[2]),
+    'value': lambda row: row[1],
+    'unit': lambda row: 'mg/dL',
+    'trend': lambda row: row[3],
+    'trendRate': lambda row: row[4],
+}
+
+# OAuth state nonce -> start time, for logins that have not called back yet
+pending_logins = {}
+pending_lock = threading.Lock()
+LOGIN_TIMEOUT = 600
+
+# Session cookies DataFastPath has verified: cookie -> (account, recheck at)
+verified_cookies = {}
+COOKIE_RECHECK = 60
+MAX_VERIFIED_COOKIES = 10000
 
 def print_to_serial(message):
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] {message}")
 
-def open_browser():
+def login_url(state):
+    """Dexcom login URL whose callback must bring back `state`"""
+    now = time.time()
+    with pending_lock:
+        for nonce, started in list(pending_logins.items()):
+            if now - started > LOGIN_TIMEOUT:
+                del pending_logins[nonce]
+        pending_logins[state] = now
     params = {
         'client_id': CLIENT_ID,
         'redirect_uri': REDIRECT_URI,
         'response_type': 'code',
-        'scope': 'offline_access'
+        'scope': 'offline_access',
+        'state': state
     }
-    url = AUTH_URL + '?' + requests.compat.urlencode(params)
+    return AUTH_URL + '?' + requests.compat.urlencode(params)
+
+def open_browser():
     print_to_serial("Opening browser for Dexcom authentication...")
-    webbrowser.open(url)
+    webbrowser.open('http://localhost:5000/login')
+
+def authorize(account, requested=None):
+    """(session, None) if the caller signed in as `account` may read `requested`, else (None, (message, status))
+    
+    `requested` is the optional ?account=; it must name the caller's own
+    account, since the cookie is the only proof of who the caller is.
+    """
+    if account is None:
+        return None, ("Not authenticated. Log in at /login.", 401)
+    if requested and requested != account:
+        return None, ("Not allowed to read another account.", 403)
+    session = sessions.get(account)
+    if session is None or not session.access_token:
+        return None, ("Not authenticated. Log in at /login.", 401)
+    return session, None
+
+def caller_session():
+    """authorize() for the account in the request's signed session cookie"""
+    return authorize(cookie_session.get('account'), request.args.get('account'))
+
+def cookie_account(environ):
+    """Account in a WSGI request's session cookie, verified outside Flask
+    
+    Checking the signature costs more than serving /data, so a verified
+    cookie is trusted for COOKIE_RECHECK seconds before it is checked again.
+    """
+    header = environ.get('HTTP_COOKIE')
+    if not header:
+        return None
+    value = parse_cookie(header).get(app.config['SESSION_COOKIE_NAME'])
+    if not value:
+        return None
+    now = time.time()
+    verified = verified_cookies.get(value)
+    if verified is not None and verified[1] > now:
+        return verified[0]
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        data = serializer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+    account = data.get('account') if isinstance(data, dict) else None
+    if len(verified_cookies) >= MAX_VERIFIED_COOKIES:
+        verified_cookies.clear()
+    verified_cookies[value] = (account, now + COOKIE_RECHECK)
+    return account
+
+def dexcom_user_id(token_data, glucose_data):
+    """The Dexcom userId a new token belongs to
+    
+    Taken from the token response when it carries one, otherwise from the
+    EGV response fetched with the token, which always does.
+    """
+    for source in (token_data, glucose_data):
+        if isinstance(source, dict) and source.get('userId'):
+            return str(source['userId'])
+    return None
 
 @app.route('/')
 def home():
     return "Server is running. Please complete Dexcom login."
 
+@app.route('/login')
+def login():
+    # The state goes into this browser's cookie as well, so a callback link
+    # from someone else's login cannot sign this browser in
+    state = secrets.token_urlsafe(16)
+    cookie_session['login_state'] = state
+    return redirect(login_url(state))
+
 @app.route('/callback')
 def callback():
-    global access_token, refresh_token, latest_data
     auth_code = request.args.get('code')
-    print_to_serial(f"Received authorization code: {auth_code[:10]}...")
+    state = request.args.get('state', '')
+    with pending_lock:
+        started = pending_logins.pop(state, None)
+    if started is None or state != cookie_session.pop('login_state', None):
+        print_to_serial("Callback with an unknown or expired login state.")
+        return "Unknown or expired login. Start again from /login.", 403
     
     if auth_code:
+        print_to_serial(f"Received authorization code: {auth_code[:10]}...")
         token = get_access_token(auth_code)
         if token:
-            access_token = token['access_token']
-            refresh_token = token.get('refresh_token')
-            print_to_serial("Authentication successful! Access token obtained.")
+            # Get initial glucose data, which also names the Dexcom account
+            data = get_glucose_data(token['access_token'])
+            account = dexcom_user_id(token, data)
+            if account is None:
+                print_to_serial("Could not determine the Dexcom account for the new token.")
+                return "Could not determine your Dexcom account. Try again from /login.", 502
+            session = sessions.get_or_create(account)
+            with session.lock:
+                store_tokens(session, token)
+            cookie_session.permanent = True
+            cookie_session['account'] = account
+            print_to_serial(f"Authentication successful for {account}! Access token obtained.")
             
-            # Get initial glucose data
-            latest_data = get_glucose_data(access_token)
-            display_glucose_data()
+            set_latest_data(session, data)
+            display_glucose_data(session)
             
             return "Authorization complete. Check your console for glucose readings."
         else:
@@ -69,36 +232,248 @@ def callback():
         print_to_serial("No authorization code found in callback URL.")
         return "No authorization code found in the URL."
 
-@app.route('/data')
-def show_glucose_data():
-    global latest_data
-    if not access_token:
-        return "Not authenticated. Restart and log in."
+def render_data_text(latest_data, latest_reading):
+    """The /data text for a snapshot"""
     if not latest_data:
         return "No data available."
     
     if 'records' in latest_data and latest_data['records']:
         records = latest_data['records']
         if records:
-            # Sort by timestamp to get the latest reading
-            sorted_records = sorted(records, key=lambda x: x.get('systemTime', ''))
-            latest_reading = sorted_records[-1]
-            print(latest_reading)
             return f"Glucose: {latest_reading['value']} mg/dL at {latest_reading['systemTime']}"
         else:
             return "No glucose readings available"
     # Legacy format support
     elif 'egvs' in latest_data and latest_data['egvs']:
         values = latest_data['egvs']
-        latest_reading = values[-1]
-        return f"Glucose: {latest_reading['value']} mg/dL at {latest_reading['systemTime']}"
+        legacy_reading = values[-1]
+        return f"Glucose: {legacy_reading['value']} mg/dL at {legacy_reading['systemTime']}"
     
     return f"No readings found. Response: {latest_data}"
 
-def display_glucose_data():
+def render_data_json(latest_data, latest_reading):
+    """The /data JSON document for a snapshot"""
+    reading = latest_reading
+    if reading is None and isinstance(latest_data, dict) and latest_data.get('egvs'):
+        reading = latest_data['egvs'][-1]
+    document = {'reading': None, 'count': 0}
+    if isinstance(latest_data, dict):
+        if 'error' in latest_data:
+            document['error'] = latest_data['error']
+        document['count'] = len(latest_data.get('records') or latest_data.get('egvs') or [])
+    if reading:
+        value = reading.get('value')
+        document['reading'] = {
+            'value': value,
+            'unit': 'mg/dL',
+            'mmol_l': mg_dl_to_mmol_l(value) if value is not None else None,
+            'systemTime': reading.get('systemTime'),
+            'displayTime': reading.get('displayTime'),
+            'trend': reading.get('trend'),
+            'trendRate': reading.get('trendRate'),
+        }
+    return json.dumps(document, separators=(',', ':'))
+
+def _view(body, content_type):
+    """(body bytes, content type, strong ETag) for a rendered response"""
+    data = body.encode('utf-8')
+    return data, content_type, '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+
+def render_data_views(latest_data, latest_reading):
+    """Pre-render both /data representations for a new snapshot"""
+    return {
+        'text': _view(render_data_text(latest_data, latest_reading), 'text/html; charset=utf-8'),
+        'json': _view(render_data_json(latest_data, latest_reading), 'application/json'),
+    }
+
+def etag_matches(header, etag):
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for it)"""
+    if header == etag or header == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag[:2] == 'W/':
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def wants_json(format_arg, accept):
+    # Only parse Accept when it could ask for JSON
+    return format_arg == 'json' or ('json' in accept and
+                                    parse_accept_header(accept, MIMEAccept).best == 'application/json')
+
+def data_response(session, json_requested, if_none_match):
+    """(status, headers, body) for /data from the session's pre-rendered views"""
+    # One read of the snapshot: data and rendered views always belong together
+    latest_data, latest_reading, _, views = session.snapshot
+    if views is None:
+        views = render_data_views(latest_data, latest_reading)
+    body, content_type, etag = views['json' if json_requested else 'text']
+    headers = [
+        ('ETag', etag),
+        ('Cache-Control', f"private, max-age={max(int(next_poll_at - time.time()), 0)}"),
+        ('Vary', 'Accept'),
+    ]
+    if if_none_match and etag_matches(if_none_match, etag):
+        return '304 Not Modified', headers, b''
+    headers.append(('Content-Type', content_type))
+    headers.append(('Content-Length', str(len(body))))
+    return '200 OK', headers, body
+
+@app.route('/data')
+def show_glucose_data():
+    session, error = caller_session()
+    if error:
+        return error
+    status, headers, body = data_response(
+        session, wants_json(request.args.get('format'), request.headers.get('Accept', '')),
+        request.headers.get('If-None-Match'))
+    return Response(body, status=status, headers=headers)
+
+def reading_event(record):
+    """(event id, JSON payload) pushed to stream subscribers for one record"""
+    reading = record if isinstance(record, Reading) else Reading.from_dict(record)
+    return reading.system_time, json.dumps(reading.to_dict(), separators=(',', ':')).encode('utf-8')
+
+def publish_readings(account, records):
+    """Push records to the account's subscribers, oldest first"""
+    events = sorted(reading_event(r) for r in records if r.get('systemTime'))
+    for event_id, payload in events:
+        broadcaster.publish(account, event_id, payload, 'reading')
+
+def stored_events(account, after, before):
+    """Stream backlog: stored readings strictly between two event ids"""
+    for reading in store.query(account, after + 1, before - 1):
+        yield reading_event(reading)
+
+def last_event_id():
+    """Resume point from the Last-Event-ID header (or ?lastEventId=), if any"""
+    value = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@app.route('/stream')
+def stream_glucose_data():
+    """Server-Sent Events: one `reading` event per new reading, heartbeats while idle"""
+    session, error = caller_session()
+    if error:
+        return error
+    events = broadcaster.stream(session.account, last_event_id(), backlog=stored_events)
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # keep reverse proxies from buffering the stream
+    })
+
+if Sock is not None:
+    sock = Sock(app)
+    
+    @sock.route('/ws')
+    def websocket_glucose_data(ws):
+        """WebSocket variant of /stream: each message is one reading's JSON"""
+        session, error = caller_session()
+        if error:
+            ws.close(reason=1008, message=error[0])
+            return
+        for payload in broadcaster.stream(session.account, last_event_id(),
+                                          backlog=stored_events, raw=True):
+            ws.send(payload.decode('utf-8'))
+
+def parse_time(value, default):
+    """Epoch seconds from an epoch number or a timestamp string"""
+    if value is None or value == '':
+        return default
+    try:
+        return int(float(value))
+    except ValueError:
+        return to_epoch(value)
+
+def api_error(message, status=400):
+    return Response(json.dumps({'error': message}), status=status, mimetype='application/json')
+
+@app.route('/api/readings')
+def api_readings():
+    """Stored readings in a time range, one page at a time, oldest first
+    
+    ?start= / ?end= are epoch seconds or timestamps (default: the last 24
+    hours), ?fields= a comma-separated subset of READING_FIELDS, ?limit=
+    the page size. Pass the returned next_cursor as ?cursor= for the next
+    page; it is null on the last one.
+    """
+    session, error = caller_session()
+    if error:
+        return api_error(*error)
+    args = request.args
+    try:
+        end = parse_time(args.get('end'), int(time.time()))
+        start = parse_time(args.get('start'), end - 24 * 3600)
+        limit = int(args.get('limit') or API_PAGE_SIZE)
+        cursor = args.get('cursor')
+        if cursor:
+            start = max(start, int(cursor) + 1)
+    except ValueError as e:
+        return api_error(f"Invalid query parameter: {e}")
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        return api_error(f"limit must be between 1 and {API_MAX_PAGE_SIZE}")
+    fields = [f for f in args.get('fields', '').split(',') if f] or list(READING_FIELDS)
+    unknown = [f for f in fields if f not in READING_FIELDS]
+    if unknown:
+        return api_error(f"Unknown fields: {', '.join(unknown)}")
+    
+    # One extra row tells whether another page follows
+    # Raw rows rather than a ReadingSeries, so trendRate keeps its stored precision
+    rows = store.query_rows(session.account, start, end, limit + 1)
+    page = rows[:limit]
+    getters = [(field, READING_FIELDS[field]) for field in fields]
+    document = {
+        'account': session.account,
+        'start': start,
+        'end': end,
+        'count': len(page),
+        'readings': [{field: get(r) for field, get in getters} for r in page],
+        'next_cursor': str(page[-1][0]) if len(rows) > limit else None,
+    }
+    body = json.dumps(document, separators=(',', ':')).encode('utf-8')
+    response = Response(body, mimetype='application/json')
+    response.headers['Vary'] = 'Accept-Encoding'
+    if len(body) >= GZIP_MIN_SIZE and request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+class DataFastPath:
+    """WSGI middleware answering GET /data for signed-in accounts before Flask
+    
+    Flask's request setup and routing cost more than serving the
+    pre-rendered bytes themselves, so the hot polling path skips them.
+    Everything else, including /data requests that are not authorized,
+    goes to Flask, which answers them with 401 or 403.
+    """
+    
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+    
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') != '/data' or environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+        query_string = environ.get('QUERY_STRING')
+        query = parse_qs(query_string) if query_string else {}
+        session, error = authorize(cookie_account(environ), query.get('account', ('',))[0])
+        if error:
+            return self.wsgi_app(environ, start_response)
+        status, headers, body = data_response(
+            session, wants_json(query.get('format', ('',))[0], environ.get('HTTP_ACCEPT', '')),
+            environ.get('HTTP_IF_NONE_MATCH'))
+        start_response(status, headers)
+        return [body] if environ['REQUEST_METHOD'] == 'GET' else []
+
+app.wsgi_app = DataFastPath(app.wsgi_app)
+
+def display_glucose_data(session):
     """Display glucose data on serial monitor"""
-    global latest_data
-    print(latest_data)
+    latest_data, latest_reading = session.snapshot[:2]
     if not latest_data:
         print_to_serial("No glucose data available")
         return
@@ -108,24 +483,19 @@ def display_glucose_data():
         return
     if 'records' in latest_data:
         records = latest_data['records']
-        if records and len(records) > 0:
-            # Sort by timestamp to get the latest reading
-            sorted_records = sorted(records, key=lambda x: x.get('systemTime', ''))
-            latest_reading = sorted_records[-1]
-            
+        if records and len(records) > 0 and latest_reading:
             glucose_value = latest_reading['value']
             system_time = latest_reading['systemTime']
             
             # Convert system time to readable format
             try:
-                dt = datetime.datetime.fromisoformat(system_time.replace('Z', '+08:00'))
-                readable_time = dt.strftime("%Y-%m-%d %H:%M:%S UTC")
-            except:
+                readable_time = format_utc(to_epoch(system_time))
+            except (TypeError, ValueError):
                 readable_time = system_time
             
             print_to_serial("=" * 50)
-            print_to_serial(f"GLUCOSE READING")
-            print_to_serial(f"Value: {glucose_value} mg/dL ({round(glucose_value/18.018, 2)} mmol/L)")
+            print_to_serial(f"GLUCOSE READING ({session.account})")
+            print_to_serial(f"Value: {glucose_value} mg/dL ({mg_dl_to_mmol_l(glucose_value)} mmol/L)")
             print_to_serial(f"Time:  {readable_time}")
             print_to_serial(f"Total readings: {len(records)}")
             print_to_serial("=" * 50)
@@ -135,20 +505,19 @@ def display_glucose_data():
     elif 'egvs' in latest_data and latest_data['egvs']:
         values = latest_data['egvs']
         if values:
-            latest_reading = values[-1]
-            glucose_value = latest_reading['value']
-            system_time = latest_reading['systemTime']
+            legacy_reading = values[-1]
+            glucose_value = legacy_reading['value']
+            system_time = legacy_reading['systemTime']
             
             # Convert system time to readable format
             try:
-                dt = datetime.datetime.fromisoformat(system_time.replace('Z', '+08:00'))
-                readable_time = dt.strftime("%Y-%m-%d %H:%M:%S UTC")
-            except:
+                readable_time = format_utc(to_epoch(system_time))
+            except (TypeError, ValueError):
                 readable_time = system_time
             
             print_to_serial("=" * 50)
-            print_to_serial(f"GLUCOSE READING")
-            print_to_serial(f"Value: {glucose_value} mg/dL ({round(glucose_value/18.018, 2)} mmol/L)")
+            print_to_serial(f"GLUCOSE READING ({session.account})")
+            print_to_serial(f"Value: {glucose_value} mg/dL ({mg_dl_to_mmol_l(glucose_value)} mmol/L)")
             print_to_serial(f"Time:  {readable_time}")
             print_to_serial(f"Total readings: {len(values)}")
             print_to_serial("=" * 50)
@@ -171,7 +540,7 @@ def get_access_token(auth_code):
     }
     try:
         print_to_serial("Requesting access token...")
-        response = requests.post(TOKEN_URL, data=payload, headers=headers)
+        response = transport.post(TOKEN_URL, data=payload, headers=headers)
         response.raise_for_status()
         print_to_serial("Access token retrieved successfully")
         return response.json()
@@ -179,7 +548,8 @@ def get_access_token(auth_code):
         print_to_serial(f"Error getting access token: {e}")
         return None
 
-def get_glucose_data(token):
+def get_glucose_data(token, since=None):
+    """Fetch the last 24 hours, or only records after the systemTime `since`"""
     headers = {
         'Authorization': f'Bearer {token}',
         'Content-Type': 'application/json'
@@ -187,15 +557,22 @@ def get_glucose_data(token):
 
     end_time = datetime.datetime.now(datetime.timezone.utc)
     start_time = end_time - datetime.timedelta(hours=24)
+    if since:
+        try:
+            since_dt = datetime.datetime.fromtimestamp(to_epoch(since) + 1, datetime.timezone.utc)
+            start_time = max(start_time, since_dt)
+        except ValueError:
+            pass
     
     params = {
         'startDate': start_time.strftime('%Y-%m-%dT%H:%M:%S'),
         'endDate': end_time.strftime('%Y-%m-%dT%H:%M:%S')
     }
     
+    response = None  # stays None if the request itself fails
     try:
         print_to_serial("Fetching glucose data from Dexcom API...")
-        response = requests.get(DATA_URL, headers=headers, params=params)
+        response = transport.get(DATA_URL, headers=headers, params=params)
         response.raise_for_status()
         print_to_serial("Glucose data retrieved successfully")
         return response.json()
@@ -203,78 +580,192 @@ def get_glucose_data(token):
         print_to_serial(f"Error fetching glucose data: {e}")
         return {'error': str(e), 'status_code': getattr(response, 'status_code', 'unknown')}
 
-def refresh_access_token():
-    global access_token, refresh_token
+def set_latest_data(session, data, new_records=None):
+    """Publish new data for a session, updating latest_reading from only the new records"""
+    with session.update_lock:
+        if not isinstance(data, dict) or 'error' in data:
+            latest_reading = None
+        elif new_records is None:
+            latest_reading = latest_record(data.get('records') or [])
+        else:
+            current = session.latest_reading
+            latest_reading = latest_record(([current] if current else []) + list(new_records))
+        session.publish(data, latest_reading, render_data_views(data, latest_reading))
+
+    if isinstance(data, dict) and 'error' not in data:
+        to_store = data.get('records') if new_records is None else new_records
+        if to_store:
+            store.upsert(session.account, (r for r in to_store if r.get('systemTime')))
+        # A full load only pushes its newest reading; merges push everything new
+        if new_records is None:
+            publish_readings(session.account, [latest_reading] if latest_reading else [])
+        else:
+            publish_readings(session.account, new_records)
+
+def restore_latest_data():
+    """Load every stored account's last 24 hours so a restart starts warm
     
-    if not refresh_token:
-        print_to_serial("No refresh token available. Re-authentication required.")
-        return False
+    Tokens are not persisted, so restored accounts show their readings
+    again once they log in.
+    """
+    end = int(time.time())
+    for account in store.accounts():
+        records = store.query(account, end - 24 * 3600, end).to_dicts()
+        if records:
+            session = sessions.get_or_create(account)
+            data = {'records': records}
+            with session.update_lock:
+                session.publish(data, records[-1], render_data_views(data, records[-1]))
+            publish_readings(account, records[-1:])
+            print_to_serial(f"Restored {len(records)} readings for {account} from local store")
+
+def merge_glucose_data(session, new_data):
+    """Merge newly fetched records into the held 24-hour window without duplicates
     
-    payload = {
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET,
-        'grant_type': 'refresh_token',
-        'refresh_token': refresh_token,
-        'redirect_uri': REDIRECT_URI
-    }
+    A failed fetch is recorded in session.last_error and leaves a held
+    window in place; it is only published when there is nothing to keep.
+    """
+    # Held across the merge so the callback and the monitor cannot interleave
+    with session.update_lock:
+        old_data = session.latest_data
+        has_window = isinstance(old_data, dict) and 'error' not in old_data and old_data.get('records')
+        if not isinstance(new_data, dict) or 'error' in new_data:
+            session.last_error = new_data
+            if has_window:
+                print_to_serial(f"Error fetching glucose data for {session.account}: "
+                                f"{new_data.get('error') if isinstance(new_data, dict) else new_data}; "
+                                "keeping the held readings")
+            else:
+                set_latest_data(session, new_data)
+            return
+        session.last_error = None
+        if not has_window:
+            set_latest_data(session, new_data)
+            return
+
+        # Compare times as epoch seconds so differently formatted timestamps still match
+        seen = {to_epoch(r['systemTime']) for r in old_data['records'] if r.get('systemTime')}
+        added = [r for r in new_data.get('records', [])
+                 if r.get('systemTime') and to_epoch(r['systemTime']) not in seen]
+
+        # Keep only the rolling 24-hour window
+        cutoff = int(time.time()) - 24 * 3600
+        merged = dict(new_data)
+        merged['records'] = [r for r in old_data['records'] + added
+                             if r.get('systemTime') and to_epoch(r['systemTime']) >= cutoff]
+        set_latest_data(session, merged, added)
+
+def store_tokens(session, token_data):
+    """Save a token response and schedule the next refresh (caller holds session.lock)"""
+    session.access_token = token_data['access_token']
+    session.refresh_token = token_data.get('refresh_token', session.refresh_token)
+    expires_in = token_data.get('expires_in')
+    session.expires_at = time.time() + float(expires_in) if expires_in else None
+    session.generation += 1
+    if session.expires_at is not None:
+        schedule_token_refresh(session, max(session.expires_at - REFRESH_MARGIN - time.time(), 0))
+
+def schedule_token_refresh(session, delay):
+    """Queue the session's next token refresh on the shared refresh thread"""
+    refresher.schedule(session, delay)
+
+def refresh_access_token(session):
+    """Refresh the access token; concurrent callers share one in-flight refresh"""
+    generation = session.generation
+    with session.lock:
+        if session.generation != generation:
+            return session.access_token is not None
+
+        if not session.refresh_token:
+            print_to_serial(f"No refresh token available for {session.account}. Re-authentication required.")
+            return False
+
+        payload = {
+            'client_id': CLIENT_ID,
+            'client_secret': CLIENT_SECRET,
+            'grant_type': 'refresh_token',
+            'refresh_token': session.refresh_token,
+            'redirect_uri': REDIRECT_URI
+        }
+
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+
+        try:
+            print_to_serial(f"Refreshing access token for {session.account}...")
+            response = transport.post(TOKEN_URL, data=payload, headers=headers)
+            response.raise_for_status()
+            store_tokens(session, response.json())
+            print_to_serial("Access token refreshed successfully")
+            return True
+        except Exception as e:
+            print_to_serial(f"Error refreshing token for {session.account}: {e}")
+            # Keep a token that has not expired yet and retry soon
+            if session.expires_at is None or time.time() >= session.expires_at:
+                session.access_token = None
+            schedule_token_refresh(session, REFRESH_RETRY)
+            return False
+
+# One thread refreshes every session's token ahead of its expiry
+refresher = RefreshScheduler(refresh_access_token)
+
+def fresh_access_token(session):
+    """Return an access token that is not about to expire, refreshing first if needed"""
+    expires_at = session.expires_at
+    if expires_at is not None and expires_at - time.time() <= REFRESH_MARGIN:
+        refresh_access_token(session)
+    return session.access_token
+
+def poll_session(session):
+    """Fetch and merge one account's new readings"""
+    latest_reading = session.latest_reading
+    since = latest_reading.get('systemTime') if latest_reading else None
+    new_data = get_glucose_data(fresh_access_token(session), since=since)
     
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
+    # Token rejected before its expiry (e.g. revoked): refresh once and retry
+    if isinstance(new_data, dict) and 'error' in new_data:
+        if 'status_code' in new_data and new_data['status_code'] == 401:
+            print_to_serial(f"Token for {session.account} rejected, attempting refresh...")
+            if refresh_access_token(session):
+                new_data = get_glucose_data(session.access_token, since=since)
+            else:
+                print_to_serial(f"Token refresh for {session.account} failed; it is retried in {REFRESH_RETRY} seconds")
+                return
     
-    try:
-        print_to_serial("Refreshing access token...")
-        response = requests.post(TOKEN_URL, data=payload, headers=headers)
-        response.raise_for_status()
-        token_data = response.json()
-        access_token = token_data['access_token']
-        refresh_token = token_data.get('refresh_token', refresh_token)
-        print_to_serial("Access token refreshed successfully")
-        return True
-    except Exception as e:
-        print_to_serial(f"Error refreshing token: {e}")
-        access_token = None
-        return False
+    merge_glucose_data(session, new_data)
+    
+    # Display the glucose data
+    display_glucose_data(session)
 
 def background_monitor():
-    global access_token, refresh_token, latest_data
+    global next_poll_at
     print_to_serial("Background glucose monitor started")
     print_to_serial("   Updates every 5 minutes")
     
     while True:
-        if access_token:
-            try:
-                print_to_serial("--- 5-Minute Update Check ---")
-                latest_data = get_glucose_data(access_token)
-                
-                # Check if token expired
-                if isinstance(latest_data, dict) and 'error' in latest_data:
-                    if 'status_code' in latest_data and latest_data['status_code'] == 401:
-                        print_to_serial("Token expired, attempting refresh...")
-                        if refresh_access_token():
-                            latest_data = get_glucose_data(access_token)
-                        else:
-                            print_to_serial("Token refresh failed. Please restart and re-authenticate.")
-                            time.sleep(300)
-                            continue
-                
-                # Display the glucose data
-                display_glucose_data()
-                
-            except Exception as e:
-                print_to_serial(f"Background monitor error: {e}")
+        next_poll_at = time.time() + POLL_INTERVAL
+        active = sessions.authenticated()
+        if active:
+            print_to_serial(f"--- 5-Minute Update Check ({len(active)} accounts) ---")
+            for session in active:
+                try:
+                    poll_session(session)
+                except Exception as e:
+                    print_to_serial(f"Background monitor error for {session.account}: {e}")
         else:
             print_to_serial("Waiting for authentication...")
         
-        # Wait 5 minutes (300 seconds) before next update
+        # Wait until 5 minutes after this round started
         print_to_serial("Next update in 5 minutes...")
-        time.sleep(300)
+        time.sleep(max(next_poll_at - time.time(), 0))
 
 if __name__ == '__main__':
     print_to_serial("    Starting Dexcom Glucose Monitor")
     print_to_serial(f"   Server: http://localhost:5000")
     print_to_serial(f"   Update interval: 5 minutes")
     print_to_serial("-" * 50)
+    restore_latest_data()
     
     # Start background monitoring thread
     monitor_thread = threading.Thread(target=background_monitor, daemon=True)
@@ -0,0 +1,116 @@
+"""Request coalescing for identical concurrent fetches
+
+When several threads ask for the same thing at once (e.g. dashboards
+refreshing the same account's last 6 hours), a SingleFlight lets the
+first caller make the request and hands its result to everyone who asked
+for the same key while it was in flight. Callers that arrive after it
+finished make a new call, so pollers always see fresh data. With a ttl,
+results are also kept for `ttl` seconds, so a burst of identical
+requests costs one API call. Keys are any hashable value; DexcomData
+uses (account, endpoint, window).
+
+Callers share one result object and must not modify it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical in-flight calls and optionally cache their results
+
+    ttl=0 (the default) only coalesces calls that overlap in time. At most
+    max_entries results are cached; the oldest are evicted first.
+    """
+
+    def __init__(self, ttl: float = 0.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._cache: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self.counts = {'hits': 0, 'shared': 0, 'misses': 0, 'errors': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return fn()'s result for key, calling fn only if no fresh or pending result exists
+
+        Exceptions raised by fn propagate to every caller that shared the
+        call. Results for which cacheable(result) is false (e.g. error
+        responses) are shared with concurrent callers but not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self.counts['hits'] += 1
+                    return cached[1]
+                del self._cache[key]
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.counts['shared'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.counts['misses'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is not None:
+                    self.counts['errors'] += 1
+                elif self.ttl > 0 and (cacheable is None or cacheable(call.result)):
+                    self._cache[key] = (time.monotonic() + self.ttl, call.result)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+            call.done.set()
+        return call.result
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one cached result, or all of them"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus the current number of cached and in-flight keys
+
+        hits were answered from the cache, shared joined an in-flight
+        call, misses made the call themselves.
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counts)
+            stats['cached'] = len(self._cache)
+            stats['in_flight'] = len(self._calls)
+        requests = stats['hits'] + stats['shared'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['shared']) / requests if requests else 0.0
+        return stats
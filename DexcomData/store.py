@@ -0,0 +1,164 @@
+"""Persistent SQLite reading store"""
+
+import math
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from .readings import Reading, ReadingSeries, RecordLike
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    account      TEXT    NOT NULL,
+    system_time  INTEGER NOT NULL,
+    display_time INTEGER NOT NULL,
+    value        INTEGER,
+    trend        TEXT,
+    trend_rate   REAL,
+    PRIMARY KEY (account, system_time)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS fetched (
+    account TEXT    NOT NULL,
+    start   INTEGER NOT NULL,
+    end     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fetched_account ON fetched (account, start);
+"""
+
+_UPSERT = """
+INSERT INTO readings (account, system_time, display_time, value, trend, trend_rate)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (account, system_time) DO UPDATE SET
+    display_time = excluded.display_time,
+    value = excluded.value,
+    trend = excluded.trend,
+    trend_rate = excluded.trend_rate
+"""
+
+
+class ReadingStore:
+    """Readings persisted in SQLite (WAL mode), keyed by (account, system_time)
+
+    Besides the readings themselves the store remembers which time
+    intervals have already been fetched from the API, so range queries can
+    be answered locally and only the gaps need a network request. All
+    times are epoch seconds.
+    """
+
+    def __init__(self, path: str = 'dexcom_readings.db', batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def upsert(self, account: str, readings: Iterable[RecordLike]) -> int:
+        """Insert or update readings in batches, returning how many were written"""
+        count = 0
+        batch = []
+        with self._lock:
+            for reading in readings:
+                if not isinstance(reading, Reading):
+                    reading = Reading.from_dict(reading)
+                rate = reading.trend_rate
+                if rate is not None and math.isnan(rate):
+                    rate = None
+                batch.append((account, reading.system_time, reading.display_time,
+                              reading.value, reading.trend, rate))
+                if len(batch) >= self.batch_size:
+                    self._conn.executemany(_UPSERT, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._conn.executemany(_UPSERT, batch)
+                count += len(batch)
+            self._conn.commit()
+        return count
+
+    def query(self, account: str, start: int, end: int, limit: Optional[int] = None) -> ReadingSeries:
+        """Readings with start <= system_time <= end, oldest first (at most `limit`)"""
+        return ReadingSeries(Reading(*row) for row in self.query_rows(account, start, end, limit))
+
+    def query_rows(self, account: str, start: int, end: int,
+                   limit: Optional[int] = None) -> List[Tuple]:
+        """Like query(), as raw (system_time, value, display_time, trend, trend_rate) rows
+
+        trend_rate keeps the stored double precision, where a ReadingSeries
+        holds it as float32.
+        """
+        sql = ('SELECT system_time, value, display_time, trend, trend_rate FROM readings '
+               'WHERE account = ? AND system_time BETWEEN ? AND ? ORDER BY system_time')
+        params: Tuple = (account, start, end)
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params += (limit,)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def latest(self, account: str) -> Optional[Reading]:
+        """Newest stored reading for an account"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT system_time, value, display_time, trend, trend_rate FROM readings '
+                'WHERE account = ? ORDER BY system_time DESC LIMIT 1', (account,)).fetchone()
+        return Reading(*row) if row else None
+
+    def count(self, account: str) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM readings WHERE account = ?',
+                                      (account,)).fetchone()[0]
+
+    def accounts(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT DISTINCT account FROM readings')]
+
+    def mark_fetched(self, account: str, start: int, end: int) -> None:
+        """Record that [start, end] has been fully fetched from the API"""
+        if end <= start:
+            return
+        with self._lock:
+            # Coalesce with overlapping or adjacent intervals to keep the table small
+            rows = self._conn.execute(
+                'SELECT rowid, start, end FROM fetched WHERE account = ? AND start <= ? AND end >= ?',
+                (account, end, start)).fetchall()
+            for rowid, other_start, other_end in rows:
+                start = min(start, other_start)
+                end = max(end, other_end)
+                self._conn.execute('DELETE FROM fetched WHERE rowid = ?', (rowid,))
+            self._conn.execute('INSERT INTO fetched (account, start, end) VALUES (?, ?, ?)',
+                               (account, start, end))
+            self._conn.commit()
+
+    def missing_intervals(self, account: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Sub-intervals of [start, end] that have not been fetched yet"""
+        with self._lock:
+            covered = self._conn.execute(
+                'SELECT start, end FROM fetched WHERE account = ? AND start <= ? AND end >= ? '
+                'ORDER BY start', (account, end, start)).fetchall()
+        missing = []
+        cursor = start
+        for covered_start, covered_end in covered:
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'ReadingStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
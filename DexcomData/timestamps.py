@@ -0,0 +1,137 @@
+"""Dexcom timestamp parsing and formatting
+
+Dexcom timestamps are fixed-format ISO 8601 strings: systemTime is UTC
+('2024-01-01T12:00:00', sometimes with 'Z' or '+00:00') and displayTime
+carries the device offset ('2024-01-01T21:00:00+09:00'). They are parsed
+into epoch-second integers once at ingest so every later comparison,
+sort and range query works on ints.
+
+The parser slices the fixed positions and looks the date, the clock time
+and the offset suffix up in memo tables, so a steady stream of 5-minute
+readings costs a few dict lookups per timestamp. Anything that does not
+fit the fixed layout falls back to datetime.fromisoformat.
+"""
+
+import datetime
+import re
+import time
+from typing import Dict
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# Memo tables. Dates are keyed with their separator ('YYYY-MM-DDT') so a
+# hit also validates the layout; the date tables grow by one entry per day.
+_MAX_DAYS = 100_000
+_DAYS: Dict[str, int] = {}          # 'YYYY-MM-DDT' -> epoch of 00:00 UTC
+_CLOCKS: Dict[str, int] = {}        # 'HH:MM:SS' -> seconds since midnight
+_OFFSETS: Dict[str, int] = {'': 0, 'Z': 0}  # suffix -> UTC offset in seconds
+_DATE_STRINGS: Dict[int, str] = {}  # day number -> 'YYYY-MM-DD'
+_CLOCK_STRINGS: Dict[int, str] = {}  # seconds since midnight -> 'HH:MM:SS'
+
+_OFFSET_PATTERN = re.compile(r'(?:\.\d+)?(Z|[+-]\d\d:?\d\d)?')
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _parse_fields(timestamp: str):
+    """(day epoch, seconds since midnight, offset), filling the memo tables"""
+    date, clock, suffix = timestamp[:11], timestamp[11:19], timestamp[19:]
+    if len(date) != 11 or date[4] != '-' or date[7] != '-' or date[10] not in 'T ':
+        raise ValueError(f"Invalid timestamp: {timestamp!r}")
+    day = _DAYS.get(date)
+    if day is None:
+        ordinal = datetime.date(int(date[:4]), int(date[5:7]), int(date[8:10])).toordinal()
+        day = (ordinal - _EPOCH_ORDINAL) * 86400
+        if len(_DAYS) >= _MAX_DAYS:
+            _DAYS.clear()
+        _DAYS[date] = day
+
+    seconds = _CLOCKS.get(clock)
+    if seconds is None:
+        if len(clock) != 8 or clock[2] != ':' or clock[5] != ':':
+            raise ValueError(f"Invalid timestamp: {timestamp!r}")
+        hours, minutes, secs = int(clock[:2]), int(clock[3:5]), int(clock[6:8])
+        if hours > 23 or minutes > 59 or secs > 59:
+            raise ValueError(f"Invalid timestamp: {timestamp!r}")
+        seconds = _CLOCKS[clock] = hours * 3600 + minutes * 60 + secs
+
+    offset = _OFFSETS.get(suffix)
+    if offset is None:
+        match = _OFFSET_PATTERN.fullmatch(suffix)
+        if match is None:
+            raise ValueError(f"Invalid timestamp: {timestamp!r}")
+        zone = match.group(1)
+        if not zone or zone == 'Z':
+            offset = 0
+        else:
+            digits = zone[1:].replace(':', '')
+            offset = int(digits[:2]) * 3600 + int(digits[2:]) * 60
+            if zone[0] == '-':
+                offset = -offset
+        # Fractional seconds make suffixes nearly unique; only memoize plain offsets
+        if not suffix.startswith('.'):
+            _OFFSETS[suffix] = offset
+    return day, seconds, offset
+
+
+def _fallback(timestamp: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def to_epoch(timestamp: str) -> int:
+    """Epoch seconds of the instant a timestamp names (naive means UTC)"""
+    try:
+        # Fast path: three memo-table hits
+        return _DAYS[timestamp[:11]] + _CLOCKS[timestamp[11:19]] - _OFFSETS[timestamp[19:]]
+    except KeyError:
+        pass
+    try:
+        day, seconds, offset = _parse_fields(timestamp)
+        return day + seconds - offset
+    except ValueError:
+        dt = _fallback(timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return int(dt.timestamp())
+
+
+def wall_clock_epoch(timestamp: str) -> int:
+    """Epoch seconds of the timestamp's wall-clock time, ignoring any offset
+
+    Used for displayTime, which is meant to be shown in the device's
+    local time.
+    """
+    try:
+        if timestamp[19:] in _OFFSETS:
+            return _DAYS[timestamp[:11]] + _CLOCKS[timestamp[11:19]]
+    except KeyError:
+        pass
+    try:
+        day, seconds, _ = _parse_fields(timestamp)
+        return day + seconds
+    except ValueError:
+        dt = _fallback(timestamp)
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _format(seconds: int, separator: str) -> str:
+    day, clock = divmod(int(seconds), 86400)
+    date = _DATE_STRINGS.get(day)
+    if date is None:
+        if len(_DATE_STRINGS) >= _MAX_DAYS:
+            _DATE_STRINGS.clear()
+        date = _DATE_STRINGS[day] = time.strftime('%Y-%m-%d', time.gmtime(day * 86400))
+    text = _CLOCK_STRINGS.get(clock)
+    if text is None:
+        hours, rest = divmod(clock, 3600)
+        text = _CLOCK_STRINGS[clock] = f"{hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+    return date + separator + text
+
+
+def from_epoch(seconds: int) -> str:
+    """Format epoch seconds in the Dexcom timestamp format (UTC, no offset)"""
+    return _format(seconds, 'T')
+
+
+def format_utc(seconds: int) -> str:
+    """Format epoch seconds for display, as 'YYYY-MM-DD HH:MM:SS UTC'"""
+    return _format(seconds, ' ') + ' UTC'
@@ -0,0 +1,94 @@
+"""Shared HTTP transport for Dexcom API calls"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_TIMEOUT = 30
+
+
+class DexcomTransport:
+    """Pooled, keep-alive HTTP session shared by the Dexcom clients
+
+    One transport can be handed to any number of DexcomAuth and DexcomData
+    instances so that every token and EGV request reuses the same
+    connection pool instead of paying a new TCP + TLS handshake per call.
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = False,
+                 keep_alive: bool = True,
+                 max_retries: int = 0,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None):
+        """
+        pool_connections: number of per-host pools to cache
+        pool_maxsize: connections kept alive per host
+        pool_block: block instead of opening extra connections once a host
+            pool is exhausted (caps concurrent connections per host)
+        keep_alive: send 'Connection: keep-alive' (False closes after each call)
+        session: pre-configured session to use instead of building one
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = session if session is not None else self._build_session()
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              max_retries=self.max_retries,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive' if self.keep_alive else 'close'
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        self.session.close()
+
+    def __enter__(self) -> 'DexcomTransport':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_default_transport: Optional[DexcomTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport() -> DexcomTransport:
+    """Return the process-wide transport, creating it on first use"""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = DexcomTransport()
+    return _default_transport
+
+
+def set_default_transport(transport: Optional[DexcomTransport]) -> None:
+    """Replace the process-wide transport (None resets to a fresh default)"""
+    global _default_transport
+    with _default_lock:
+        _default_transport = transport
@@ -0,0 +1,182 @@
+"""Incremental glucose trend estimation and short-horizon forecasts"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from .readings import Reading
+from .store import ReadingStore
+
+
+DEFAULT_HORIZONS = (15, 30)  # minutes ahead
+
+# Dexcom reports 40-400 mg/dL; projections are clamped to that range
+SENSOR_MIN = 40
+SENSOR_MAX = 400
+
+
+def _clamp(value: float) -> float:
+    return float(min(max(value, SENSOR_MIN), SENSOR_MAX))
+
+
+def trend_arrow(rate: Optional[float]) -> str:
+    """Dexcom trend arrow name for a rate of change in mg/dL per minute"""
+    if rate is None:
+        return 'notComputable'
+    if rate > 3:
+        return 'doubleUp'
+    if rate > 2:
+        return 'singleUp'
+    if rate > 1:
+        return 'fortyFiveUp'
+    if rate >= -1:
+        return 'flat'
+    if rate >= -2:
+        return 'fortyFiveDown'
+    if rate >= -3:
+        return 'singleDown'
+    return 'doubleDown'
+
+
+class TrendEstimator:
+    """Sliding-window linear regression over the most recent readings
+
+    Each add() updates running sums of t, v, t*t and t*v for the readings
+    of the last `window` seconds, so the slope and the projected values
+    15 and 30 minutes ahead are recomputed in constant time per reading,
+    without refetching or rescanning history. Times are kept relative to
+    the window's first reading and the sums are exact integers.
+
+    With fewer than min_points readings in the window (startup, or after a
+    gap in the data) the device's own trendRate is used when the record
+    carries one. Readings older than the newest one seen are ignored.
+    """
+
+    def __init__(self, window: int = 1200, min_points: int = 3,
+                 horizons: Sequence[int] = DEFAULT_HORIZONS):
+        self.window = window
+        self.min_points = min_points
+        self.horizons = tuple(horizons)
+        self.latest: Optional[Reading] = None
+        self.skipped = 0
+        self._points: deque = deque()  # (seconds since origin, value)
+        self._origin = 0
+        self._sum_t = 0
+        self._sum_v = 0
+        self._sum_tt = 0
+        self._sum_tv = 0
+
+    def add(self, reading: Reading) -> bool:
+        """Add one reading, returning False if it was skipped"""
+        value = reading.value
+        ts = reading.system_time
+        if not value or (self.latest is not None and ts <= self.latest.system_time):
+            self.skipped += 1
+            return False
+        self.latest = reading
+        points = self._points
+        if points and ts - self._origin - points[-1][0] > self.window:
+            points.clear()  # gap: nothing left in the window
+        if not points:
+            self._origin = ts
+            self._sum_t = self._sum_v = self._sum_tt = self._sum_tv = 0
+        t = ts - self._origin
+        points.append((t, value))
+        self._sum_t += t
+        self._sum_v += value
+        self._sum_tt += t * t
+        self._sum_tv += t * value
+
+        cutoff = t - self.window
+        while points[0][0] <= cutoff:
+            old_t, old_v = points.popleft()
+            self._sum_t -= old_t
+            self._sum_v -= old_v
+            self._sum_tt -= old_t * old_t
+            self._sum_tv -= old_t * old_v
+        return True
+
+    def extend(self, readings: Iterable[Reading]) -> int:
+        """Add readings oldest first, returning how many were used"""
+        return sum(self.add(r) for r in readings)
+
+    def load(self, store: ReadingStore, account: str, now: Optional[int] = None) -> int:
+        """Prime the window from stored readings (once, e.g. at startup)"""
+        now = int(time.time()) if now is None else now
+        return self.extend(store.query(account, now - self.window, now))
+
+    def _fit(self):
+        """(value at the latest reading, mg/dL per minute, source), or Nones"""
+        latest = self.latest
+        if latest is None:
+            return None, None, None
+        n = len(self._points)
+        if n >= self.min_points:
+            denominator = n * self._sum_tt - self._sum_t * self._sum_t
+            if denominator:
+                slope = (n * self._sum_tv - self._sum_t * self._sum_v) / denominator
+                t = self._points[-1][0]
+                value = self._sum_v / n + slope * (t - self._sum_t / n)
+                return value, slope * 60, 'regression'
+        rate = latest.trend_rate
+        if rate is not None and not math.isnan(rate):
+            return float(latest.value), float(rate), 'device'
+        return float(latest.value), None, None
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Current rate of change in mg/dL per minute, or None"""
+        return self._fit()[1]
+
+    def project(self, minutes: float) -> Optional[float]:
+        """Projected value `minutes` after the latest reading, or None"""
+        value, rate, _ = self._fit()
+        if rate is None:
+            return None
+        return _clamp(value + rate * minutes)
+
+    def minutes_until(self, threshold: float) -> Optional[float]:
+        """Minutes from the latest reading until the trend line reaches threshold
+
+        None when the trend is heading away from it or is not available.
+        """
+        value, rate, _ = self._fit()
+        if value is None:
+            return None
+        if value == threshold:
+            return 0.0
+        if not rate:
+            return None
+        minutes = (threshold - value) / rate
+        return minutes if minutes >= 0 else None
+
+    def predicts_below(self, threshold: float, horizon: Optional[float] = None) -> bool:
+        """True if the value is projected to be below threshold within horizon minutes
+
+        horizon defaults to the longest configured horizon. Use this for
+        predictive low alerts: they fire while the reading is still in
+        range, a poll or more before the low itself is measured.
+        """
+        horizon = max(self.horizons) if horizon is None else horizon
+        projected = self.project(horizon)
+        if projected is None:
+            return self.latest is not None and self.latest.value < threshold
+        return min(projected, self.latest.value) < threshold
+
+    def forecast(self) -> Dict[str, Any]:
+        """Rate, trend arrow and projected values at each horizon"""
+        value, rate, source = self._fit()
+        latest = self.latest
+        return {
+            'time': latest.system_time if latest else None,
+            'value': round(value, 1) if value is not None else None,
+            'rate': round(rate, 2) if rate is not None else None,
+            'trend': trend_arrow(rate),
+            'source': source,
+            'points': len(self._points),
+            'device_trend': latest.trend if latest else None,
+            'device_rate': latest.trend_rate if latest else None,
+            'projected': {h: round(_clamp(value + rate * h), 1) if rate is not None else None
+                          for h in self.horizons},
+        }
@@ -0,0 +1,48 @@
+"""Glucose unit conversion for scalars, sequences and NumPy arrays"""
+
+from typing import Any, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+
+MG_DL_PER_MMOL_L = 18.018
+
+Number = Union[int, float]
+Values = Union[Number, Sequence[Number], Any]  # Any covers numpy.ndarray
+
+
+def _is_array(values: Any) -> bool:
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def mg_dl_to_mmol_l(mg_dl: Values) -> Values:
+    """Convert mg/dL to mmol/L, rounded to 2 decimals
+
+    Accepts a number, a sequence (returns a list) or a NumPy array
+    (returns a float array).
+    """
+    if _is_array(mg_dl):
+        return np.round(mg_dl / MG_DL_PER_MMOL_L, 2)
+    if not hasattr(mg_dl, '__len__'):
+        return round(mg_dl / MG_DL_PER_MMOL_L, 2)
+    if np is not None and len(mg_dl) > 64:
+        return mg_dl_to_mmol_l(np.asarray(mg_dl, dtype=np.float64)).tolist()
+    return [round(v / MG_DL_PER_MMOL_L, 2) for v in mg_dl]
+
+
+def mmol_l_to_mg_dl(mmol_l: Values) -> Values:
+    """Convert mmol/L to whole mg/dL
+
+    Accepts a number, a sequence (returns a list of ints) or a NumPy
+    array (returns an int64 array).
+    """
+    if _is_array(mmol_l):
+        return np.rint(mmol_l * MG_DL_PER_MMOL_L).astype(np.int64)
+    if not hasattr(mmol_l, '__len__'):
+        return int(round(mmol_l * MG_DL_PER_MMOL_L))
+    if np is not None and len(mmol_l) > 64:
+        return mmol_l_to_mg_dl(np.asarray(mmol_l, dtype=np.float64)).tolist()
+    return [int(round(v * MG_DL_PER_MMOL_L)) for v in mmol_l]
@@ -0,0 +1,72 @@
+"""AGP percentile bands for 1,000 patients x 14 days (about 4 million readings)
+
+Times agp_batch, which sorts one packed key array for the whole batch,
+against calling numpy.percentile per patient and time-of-day bin.
+
+Run from the repository root:
+    python -m benchmarks.bench_agp --patients 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from DexcomData.agp import DEFAULT_PERCENTILES, agp_batch
+from DexcomData.readings import ReadingSeries
+
+
+def synthetic_batch(patients: int, days: int):
+    rng = np.random.default_rng(0)
+    points = days * 288
+    base = 1_700_000_000
+    batch = {}
+    for i in range(patients):
+        times = base + rng.integers(0, 300) + np.arange(points, dtype=np.int64) * 300
+        phase = 2 * np.pi * (times % 86400) / 86400
+        values = 130 + 40 * np.sin(phase + i) + rng.normal(0, 20, points)
+        batch[f'patient-{i}'] = ReadingSeries.from_arrays(
+            times, np.clip(values, 40, 400).astype(np.uint16), times + 9 * 3600)
+    return batch
+
+
+def per_bin_baseline(batch, bin_minutes: int):
+    bins = 1440 // bin_minutes
+    for series in batch.values():
+        columns = series.to_numpy()
+        bin_index = (columns['display_time'] % 86400) // (bin_minutes * 60)
+        for b in range(bins):
+            np.percentile(columns['value'][bin_index == b], DEFAULT_PERCENTILES)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--bin-minutes', type=int, default=15)
+    parser.add_argument('--baseline-patients', type=int, default=50,
+                        help='patients for the per-bin numpy.percentile baseline')
+    args = parser.parse_args()
+
+    batch = synthetic_batch(args.patients, args.days)
+    readings = sum(len(s) for s in batch.values())
+    agp_batch(batch, args.bin_minutes)  # warm up
+
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        agp_batch(batch, args.bin_minutes)
+        runs.append(time.perf_counter() - start)
+    print(f"agp_batch: {args.patients} patients, {readings:,} readings: "
+          f"{min(runs) * 1000:.1f} ms (best of 5)")
+
+    subset = dict(list(batch.items())[:args.baseline_patients])
+    start = time.perf_counter()
+    per_bin_baseline(subset, args.bin_minutes)
+    elapsed = time.perf_counter() - start
+    print(f"numpy.percentile per bin: {args.baseline_patients} patients in {elapsed * 1000:.1f} ms "
+          f"(~{elapsed * args.patients / args.baseline_patients * 1000:.0f} ms for {args.patients})")
+
+
+if __name__ == '__main__':
+    main()
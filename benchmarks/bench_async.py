@@ -0,0 +1,69 @@
+"""Load test: one event loop polling many accounts against the mock API
+
+Each account gets its own AsyncDexcomAuth/AsyncDexcomMonitor; all share
+one AsyncDexcomTransport. The benchmark runs one poll cycle per account
+concurrently and compares it with the blocking client polling the same
+accounts one after another.
+
+Run from the repository root:
+    python -m benchmarks.bench_async --accounts 2000
+"""
+
+import argparse
+import asyncio
+import time
+
+from DexcomData import DexcomData, DexcomTransport
+from DexcomData.aio import AsyncDexcomAuth, AsyncDexcomData, AsyncDexcomMonitor, AsyncDexcomTransport
+from DexcomData.mock_server import MockDexcomServer
+
+
+async def _poll_async(base_url: str, accounts: int, limit: int) -> float:
+    async with AsyncDexcomTransport(limit=limit) as transport:
+        data = AsyncDexcomData(base_url=f'{base_url}/v3', transport=transport)
+        monitors = []
+        for i in range(accounts):
+            auth = AsyncDexcomAuth('id', 'secret', base_url=f'{base_url}/v2', transport=transport)
+            auth.access_token = f'token-{i}'
+            monitors.append(AsyncDexcomMonitor(auth, data, account=f'account-{i}', verbose=False))
+
+        start = time.perf_counter()
+        readings = await asyncio.gather(*(m.poll_once() for m in monitors))
+        elapsed = time.perf_counter() - start
+        assert all(readings), "every account should receive a reading"
+        return elapsed
+
+
+def _poll_blocking(base_url: str, accounts: int) -> float:
+    with DexcomTransport() as transport:
+        data = DexcomData(base_url=f'{base_url}/v3', transport=transport, verbose=False)
+        start = time.perf_counter()
+        for i in range(accounts):
+            data.get_new_readings(f'token-{i}', account=f'account-{i}')
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=100, help='connection pool size')
+    parser.add_argument('--blocking-accounts', type=int, default=200,
+                        help='accounts for the sequential blocking baseline')
+    args = parser.parse_args()
+
+    server = MockDexcomServer().start()
+    base_url = server.base_url
+    try:
+        elapsed = asyncio.run(_poll_async(base_url, args.accounts, args.limit))
+        print(f"asyncio:  {args.accounts} accounts in {elapsed:.2f}s "
+              f"({args.accounts / elapsed:.0f} polls/s)")
+
+        blocking = _poll_blocking(base_url, args.blocking_accounts)
+        print(f"blocking: {args.blocking_accounts} accounts in {blocking:.2f}s "
+              f"({args.blocking_accounts / blocking:.0f} polls/s)")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
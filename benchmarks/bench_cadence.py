@@ -0,0 +1,71 @@
+"""Simulated freshness and wasted polls: fixed interval vs CadenceScheduler
+
+A synthetic sensor produces a reading every 5 minutes at a random phase;
+each reading becomes visible in the API after a publishing lag (60 s plus
+optional jitter). Three simulated days include a 50-minute signal loss.
+
+Run from the repository root:
+    python -m benchmarks.bench_cadence
+"""
+
+import argparse
+import random
+
+from DexcomData.cadence import CadenceScheduler
+
+PERIOD = 300
+
+
+def simulate(adaptive: bool, lag: float, jitter: float, days: float, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    phase = rnd.uniform(0, PERIOD)
+    lags = {}
+
+    def newest_available(now: float) -> float:
+        k = int((now - phase) // PERIOD)
+        while True:
+            t = phase + k * PERIOD
+            if t + lags.setdefault(t, lag + rnd.random() * jitter) <= now:
+                return t
+            k -= 1
+
+    scheduler = CadenceScheduler(period=PERIOD)
+    now = rnd.uniform(0, PERIOD)
+    end = days * 86400
+    loss = (end / 2, end / 2 + 3000)
+    last = None
+    freshness = []
+    polls = wasted = 0
+    while now < end:
+        newest = last if loss[0] < now < loss[1] else newest_available(now)
+        polls += 1
+        if last is None or newest > last:
+            freshness.append(now - newest)
+            scheduler.record_poll([newest], now)
+            last = newest
+        else:
+            wasted += 1
+            scheduler.record_poll([], now)
+        now += scheduler.next_delay(now) if adaptive else PERIOD
+    return {
+        'polls': polls,
+        'wasted': wasted,
+        'mean_freshness': sum(freshness) / len(freshness),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lag', type=float, default=60.0)
+    parser.add_argument('--jitter', type=float, default=20.0)
+    parser.add_argument('--days', type=float, default=3.0)
+    args = parser.parse_args()
+
+    for name, adaptive in (('fixed 300 s', False), ('CadenceScheduler', True)):
+        result = simulate(adaptive, args.lag, args.jitter, args.days)
+        print(f"{name:18s} polls={result['polls']:5d} wasted={result['wasted']:4d} "
+              f"mean freshness={result['mean_freshness']:6.1f} s")
+
+
+if __name__ == '__main__':
+    main()
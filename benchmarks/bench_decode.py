@@ -0,0 +1,88 @@
+"""Decoding synthetic 30- and 90-day EGV payloads
+
+Compares json.loads, orjson.loads (if installed) and the streaming
+RecordStream parser on time, time to first record and peak memory. The
+streaming parser is fed 64 KiB chunks the way iter_content delivers them.
+
+Run from the repository root:
+    python -m benchmarks.bench_decode
+"""
+
+import json
+import time
+import tracemalloc
+
+from DexcomData.decoding import iter_records, orjson
+from DexcomData.mock_server import SyntheticTrace
+
+
+CHUNK = 64 * 1024
+
+
+def payload(days: int) -> bytes:
+    end = int(time.time())
+    records = SyntheticTrace('bench').records(end - days * 86400, end)
+    return json.dumps({'recordType': 'egv', 'recordVersion': '3.0', 'userId': 'bench',
+                       'records': records}).encode()
+
+
+def chunks(body: bytes):
+    for i in range(0, len(body), CHUNK):
+        yield body[i:i + CHUNK]
+
+
+def measure(fn):
+    """(seconds, seconds to first record, peak traced bytes) for one decode
+
+    Timing runs untraced; a separate traced run gives the memory peak.
+    """
+    runs = []
+    for _ in range(3):
+        start = time.perf_counter()
+        first = fn()
+        elapsed = time.perf_counter() - start
+        runs.append((elapsed, first - start if first else elapsed))
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(r[0] for r in runs), min(r[1] for r in runs), peak
+
+
+def whole(loads, body):
+    def run():
+        records = loads(body)['records']
+        for _ in records:
+            pass
+        return None
+    return run
+
+
+def streaming(body):
+    def run():
+        first = None
+        for _ in iter_records(chunks(body)):
+            if first is None:
+                first = time.perf_counter()
+        return first
+    return run
+
+
+def main() -> None:
+    for days in (30, 90):
+        body = payload(days)
+        print(f"{days}-day payload: {len(body) / 1e6:.1f} MB, {days * 288} records")
+        cases = [('json.loads', whole(json.loads, body))]
+        if orjson is not None:
+            cases.append(('orjson.loads', whole(orjson.loads, body)))
+        cases.append(('iter_records (streaming)', streaming(body)))
+        for name, fn in cases:
+            elapsed, first, peak = measure(fn)
+            print(f"  {name:26s} {elapsed * 1000:8.1f} ms  first record {first * 1000:8.2f} ms  "
+                  f"peak {peak / 1e6:7.1f} MB")
+        if orjson is None:
+            print("  (install orjson for the fast path: pip install DexcomData[fast])")
+
+
+if __name__ == '__main__':
+    main()
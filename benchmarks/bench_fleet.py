@@ -0,0 +1,84 @@
+"""Fleet monitor scaling: threads and throughput as the account count grows
+
+Compares one DexcomMonitor thread per account with a single FleetMonitor
+polling the same accounts against the mock Dexcom server.
+
+Run from the repository root:
+    python -m benchmarks.bench_fleet --accounts 500 2000 --interval 5
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+from DexcomData import DexcomAuth, DexcomData, DexcomMonitor, DexcomTransport
+from DexcomData.fleet import FleetMonitor
+from DexcomData.mock_server import MockDexcomServer
+
+
+def _make_auth(base_url: str, transport: DexcomTransport, i: int) -> DexcomAuth:
+    auth = DexcomAuth('id', 'secret', base_url=f'{base_url}/v2', transport=transport)
+    auth.access_token = f'token-{i}'
+    return auth
+
+
+def _run_fleet(base_url: str, accounts: int, interval: float, duration: float) -> dict:
+    transport = DexcomTransport(pool_maxsize=32)
+    data = DexcomData(base_url=f'{base_url}/v3', transport=transport, verbose=False)
+    fleet = FleetMonitor(update_interval=interval, max_workers=16)
+    for i in range(accounts):
+        fleet.add_account(f'account-{i}', _make_auth(base_url, transport, i), data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fleet.start_monitoring()
+        time.sleep(duration)
+        threads = threading.active_count()
+        fleet.stop_monitoring()
+    stats = fleet.stats()
+    stats['threads'] = threads
+    return stats
+
+
+def _run_threads(base_url: str, accounts: int, interval: float, duration: float) -> dict:
+    transport = DexcomTransport(pool_maxsize=32)
+    data = DexcomData(base_url=f'{base_url}/v3', transport=transport, verbose=False)
+    monitors = [DexcomMonitor(_make_auth(base_url, transport, i), data,
+                              update_interval=interval, account=f'account-{i}')
+                for i in range(accounts)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for monitor in monitors:
+            monitor.auth.start_auto_refresh = lambda: None
+            monitor.start_monitoring()
+        time.sleep(duration)
+        threads = threading.active_count()
+        for monitor in monitors:
+            monitor.running = False
+        # Let the sleeping threads notice before stdout is restored
+        time.sleep(interval + 0.5)
+    return {'accounts': accounts, 'threads': threads}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, nargs='+', default=[200, 1000])
+    parser.add_argument('--interval', type=float, default=5.0)
+    parser.add_argument('--duration', type=float, default=6.0)
+    args = parser.parse_args()
+
+    server = MockDexcomServer().start()
+    base_url = server.base_url
+    try:
+        for accounts in args.accounts:
+            fleet = _run_fleet(base_url, accounts, args.interval, args.duration)
+            print(f"FleetMonitor   {accounts:6d} accounts: {fleet['threads']:5d} threads, "
+                  f"{fleet['polls']:6d} polls, mean lag {fleet['mean_lag'] * 1000:.1f} ms, "
+                  f"max lag {fleet['max_lag'] * 1000:.1f} ms")
+            threads = _run_threads(base_url, accounts, args.interval, args.duration)
+            print(f"DexcomMonitor  {accounts:6d} accounts: {threads['threads']:5d} threads")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Latest-reading lookup on a 30-day (8,640-record) EGV payload
+
+Compares the old sort-then-take-last approach with a single-pass scan and
+with a ReadingSeries, which keeps readings sorted so the newest is O(1).
+
+Run from the repository root:
+    python -m benchmarks.bench_latest
+"""
+
+import datetime
+import random
+import timeit
+
+from DexcomData.readings import ReadingSeries
+from DexcomData.records import latest_record
+
+
+def synthetic_records(count: int = 8640):
+    start = datetime.datetime(2024, 1, 1)
+    records = [
+        {'systemTime': (start + datetime.timedelta(minutes=5 * i)).strftime('%Y-%m-%dT%H:%M:%S'),
+         'value': 80 + (i * 7) % 120}
+        for i in range(count)
+    ]
+    random.Random(0).shuffle(records)
+    return records
+
+
+def main() -> None:
+    records = synthetic_records()
+    series = ReadingSeries(records)
+    number = 200
+
+    cases = [
+        ('sorted(...)[-1]', lambda: sorted(records, key=lambda x: x.get('systemTime', ''))[-1]),
+        ('latest_record (single pass)', lambda: latest_record(records)),
+        ('ReadingSeries.latest', lambda: series.latest),
+    ]
+    for name, fn in cases:
+        per_call = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print(f"{name:30s} {per_call * 1e6:10.2f} us/call")
+
+    ingest = min(timeit.repeat(lambda: ReadingSeries(records), number=20, repeat=3)) / 20
+    print(f"{'ReadingSeries build (once)':30s} {ingest * 1e6:10.2f} us")
+
+
+if __name__ == '__main__':
+    main()
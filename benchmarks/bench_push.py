@@ -0,0 +1,63 @@
+"""Fan-out latency of the push Broadcaster to many stream subscribers
+
+Starts one thread per subscriber, each consuming Broadcaster.stream()
+the way the /stream route does, then publishes readings and measures how
+long it takes until every subscriber has the frame. The frame is encoded
+once per reading; subscribers only copy a reference to it.
+
+Run from the repository root:
+    python -m benchmarks.bench_push
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from DexcomData.push import Broadcaster
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--readings', type=int, default=10)
+    args = parser.parse_args()
+
+    broadcaster = Broadcaster(heartbeat=60.0)
+    received = [0] * args.readings
+    lock = threading.Lock()
+    done = threading.Condition(lock)
+
+    def subscriber():
+        for frame in broadcaster.stream('bench', last_event_id=0):
+            if frame.startswith(b'id: '):
+                index = int(frame[4:frame.index(b'\n')]) - 1
+                with lock:
+                    received[index] += 1
+                    if received[index] == args.subscribers:
+                        done.notify_all()
+
+    threads = [threading.Thread(target=subscriber, daemon=True) for _ in range(args.subscribers)]
+    for thread in threads:
+        thread.start()
+    while broadcaster.subscribers('bench') < args.subscribers:
+        time.sleep(0.01)
+
+    latencies = []
+    for index in range(args.readings):
+        payload = json.dumps({'systemTime': index, 'value': 100 + index})
+        start = time.perf_counter()
+        broadcaster.publish('bench', index + 1, payload, 'reading')
+        with done:
+            done.wait_for(lambda: received[index] == args.subscribers, timeout=30)
+        latencies.append(time.perf_counter() - start)
+
+    broadcaster.close()
+    latencies.sort()
+    print(f"{args.subscribers} subscribers, {args.readings} readings")
+    print(f"  all delivered: median {latencies[len(latencies) // 2] * 1e3:.1f} ms, "
+          f"max {latencies[-1] * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
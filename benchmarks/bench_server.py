@@ -0,0 +1,73 @@
+"""Requests per second for the Flask server's /data route on one thread
+
+Calls the WSGI app directly (no sockets), so the numbers are the
+server's own cost per request: a full 200 response, a 304 for a client
+that sends the current ETag, and the JSON variant. Readings are rendered
+once when they are published and GET /data is answered by the
+DataFastPath middleware, so none of these touch the held records or go
+through Flask routing. Requests carry a signed session cookie, as a
+signed-in browser's would. The target is 10,000 requests per second on one
+worker; the WSGI server's socket handling comes on top of what is
+measured here.
+
+Run from the repository root:
+    python -m benchmarks.bench_server
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('DEXCOM_STORE_PATH', ':memory:')
+
+from werkzeug.test import EnvironBuilder
+
+from DexcomData import sever2_0 as server
+from DexcomData.mock_server import SyntheticTrace
+
+
+def start_response(status, headers, exc_info=None):
+    return None
+
+
+def run(environ, seconds: float) -> float:
+    app = server.app.wsgi_app
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            b''.join(app(dict(environ), start_response))
+        count += 100
+    return count / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    end = int(time.time())
+    records = SyntheticTrace('bench').records(end - 86400, end)
+    session = server.sessions.get_or_create('bench')
+    session.access_token = 'bench'
+    server.set_latest_data(session, {'records': records})
+    etag = session.views['text'][2]
+    # The signed session cookie /callback would have set
+    cookie = (server.app.config['SESSION_COOKIE_NAME'] + '=' +
+              server.app.session_interface.get_signing_serializer(server.app).dumps({'account': 'bench'}))
+
+    cases = [
+        ('200 text', {}, ''),
+        ('304 text (If-None-Match)', {'If-None-Match': etag}, ''),
+        ('200 json', {}, 'format=json'),
+    ]
+    print(f"/data with {len(records)} held readings")
+    for name, headers, query_string in cases:
+        environ = EnvironBuilder(path='/data', query_string=query_string,
+                                 headers=dict(headers, Cookie=cookie)).get_environ()
+        rate = run(environ, args.seconds)
+        print(f"  {name:26s} {rate:10,.0f} req/s  ({1e6 / rate:6.1f} us each)")
+
+
+if __name__ == '__main__':
+    main()
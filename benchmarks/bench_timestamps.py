@@ -0,0 +1,61 @@
+"""Timestamp parsing and formatting on a 30-day (8,640-record) EGV payload
+
+Compares the previous datetime.fromisoformat path with the memoized
+fixed-format parser in DexcomData.timestamps, for systemTime (UTC) and
+displayTime (with an offset), and the display formatting used by
+format_glucose_reading.
+
+Run from the repository root:
+    python -m benchmarks.bench_timestamps
+"""
+
+import datetime
+import time
+import timeit
+
+from DexcomData.mock_server import SyntheticTrace
+from DexcomData.timestamps import format_utc, to_epoch, wall_clock_epoch
+
+
+def old_to_epoch(timestamp: str) -> int:
+    dt = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        if dt.utcoffset():
+            dt = dt.replace(tzinfo=None)
+        else:
+            return int(dt.timestamp())
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def old_format(timestamp: str) -> str:
+    try:
+        dt = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return dt.strftime("%Y-%m-%d %H:%M:%S UTC")
+    except ValueError:
+        return timestamp
+
+
+def main() -> None:
+    end = int(time.time())
+    records = SyntheticTrace('bench').records(end - 30 * 86400, end)
+    system_times = [r['systemTime'] for r in records]
+    display_times = [t + '+09:00' for t in system_times]
+    epochs = [to_epoch(t) for t in system_times]
+    number = 20
+
+    cases = [
+        ('systemTime  fromisoformat', lambda: [old_to_epoch(t) for t in system_times]),
+        ('systemTime  to_epoch', lambda: [to_epoch(t) for t in system_times]),
+        ('displayTime fromisoformat', lambda: [old_to_epoch(t) for t in display_times]),
+        ('displayTime wall_clock_epoch', lambda: [wall_clock_epoch(t) for t in display_times]),
+        ('format      fromisoformat+strftime', lambda: [old_format(t) for t in system_times]),
+        ('format      format_utc(epoch)', lambda: [format_utc(t) for t in epochs]),
+    ]
+    print(f"{len(records)} timestamps per call")
+    for name, fn in cases:
+        per_call = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print(f"  {name:36s} {per_call * 1000:8.2f} ms  ({per_call / len(records) * 1e9:6.0f} ns each)")
+
+
+if __name__ == '__main__':
+    main()
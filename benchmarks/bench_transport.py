@@ -0,0 +1,53 @@
+"""Compare per-call requests.get against the pooled DexcomTransport
+
+The mock server speaks plain HTTP on localhost, so the gain shown here is only the
+TCP setup cost; against api.dexcom.jp each avoided TLS handshake saves far more.
+
+Run from the repository root:
+    python -m benchmarks.bench_transport --requests 2000
+"""
+
+import argparse
+import time
+
+import requests
+
+from DexcomData import DexcomData, DexcomTransport
+from DexcomData.mock_server import MockDexcomServer
+
+
+def _rate(count: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    server = MockDexcomServer().start()
+    base_url = server.base_url
+    url = f'{base_url}/v3/users/self/egvs'
+    kwargs = {
+        'headers': {'Authorization': 'Bearer bench'},
+        'params': {'startDate': '2024-01-01T00:00:00', 'endDate': '2024-01-01T06:00:00'}
+    }
+    try:
+        before = _rate(args.requests, lambda: requests.get(url, **kwargs).json())
+
+        with DexcomTransport() as transport:
+            data = DexcomData(base_url=f'{base_url}/v3', transport=transport)
+            after = _rate(args.requests, lambda: transport.get(data.data_url, **kwargs).json())
+
+        print(f"requests.get (new connection per call): {before:8.1f} req/s")
+        print(f"DexcomTransport (pooled keep-alive):     {after:8.1f} req/s")
+        print(f"speedup: {after / before:.2f}x")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""End-to-end benchmark suite against the bundled mock Dexcom server
+
+Reports throughput, p50/p99 latency and peak Python memory for single
+fetches, a DexcomMonitor and a FleetMonitor, and writes the results as
+JSON so runs can be compared for regressions.
+
+Run from the repository root:
+    python -m benchmarks.run --output benchmarks/results/current.json
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from DexcomData import DexcomAuth, DexcomData, DexcomMonitor, DexcomTransport
+from DexcomData.fleet import FleetMonitor
+from DexcomData.mock_server import MockDexcomServer
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _summarise(latencies: List[float], elapsed: float, peak_bytes: int, **extra: Any) -> Dict[str, Any]:
+    result = {
+        'operations': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+        'peak_memory_kb': peak_bytes / 1024,
+    }
+    result.update(extra)
+    return result
+
+
+def _timed(fn: Callable, latencies: List[float]) -> Callable:
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def bench_single_fetch(server: MockDexcomServer, requests: int, hours: int) -> Dict[str, Any]:
+    """Sequential 24-hour EGV fetches over one pooled transport"""
+    with DexcomTransport() as transport:
+        # Every fetch must reach the server, not a coalesced or cached result
+        data = DexcomData(base_url=server.data_base_url, transport=transport, verbose=False,
+                          coalesce=False)
+        latencies: List[float] = []
+        fetch = _timed(data.get_glucose_data, latencies)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            start = time.perf_counter()
+            errors = sum('error' in fetch('bench', hours_back=hours) for _ in range(requests))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return _summarise(latencies, elapsed, peak, errors=errors, hours=hours)
+
+
+def bench_monitor(server: MockDexcomServer, duration: float) -> Dict[str, Any]:
+    """One DexcomMonitor polling as fast as it can"""
+    with DexcomTransport() as transport:
+        auth = DexcomAuth('bench', 'secret', base_url=server.auth_base_url, transport=transport)
+        data = DexcomData(base_url=server.data_base_url, transport=transport, verbose=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            auth.exchange_code_for_tokens('monitor-account')
+            monitor = DexcomMonitor(auth, data, update_interval=0)
+            latencies: List[float] = []
+            data.get_new_readings = _timed(data.get_new_readings, latencies)
+            tracemalloc.start()
+            start = time.perf_counter()
+            monitor.start_monitoring()
+            time.sleep(duration)
+            monitor.stop_monitoring()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return _summarise(latencies, elapsed, peak)
+
+
+def bench_fleet(server: MockDexcomServer, accounts: int, interval: float,
+                duration: float) -> Dict[str, Any]:
+    """A FleetMonitor polling many accounts"""
+    transport = DexcomTransport(pool_maxsize=32)
+    data = DexcomData(base_url=server.data_base_url, transport=transport, verbose=False)
+    fleet = FleetMonitor(update_interval=interval, max_workers=16)
+    latencies: List[float] = []
+    fleet.poll_account = _timed(fleet.poll_account, latencies)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        for i in range(accounts):
+            auth = DexcomAuth('bench', 'secret', base_url=server.auth_base_url, transport=transport)
+            auth.access_token = f'fleet-{i}'
+            fleet.add_account(f'fleet-{i}', auth, data)
+        start = time.perf_counter()
+        fleet.start_monitoring()
+        time.sleep(duration)
+        fleet.stop_monitoring()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    transport.close()
+    stats = fleet.stats()
+    return _summarise(latencies, elapsed, peak, accounts=accounts,
+                      failures=stats['failures'], mean_schedule_lag_ms=stats['mean_lag'] * 1000)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print relative change for the headline numbers of each scenario"""
+    print(f"\nComparison with baseline from {baseline.get('timestamp', '?')}:")
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            print(f"  {name}: no baseline")
+            continue
+        parts = []
+        for key in ('throughput', 'p50_ms', 'p99_ms', 'peak_memory_kb'):
+            if base.get(key):
+                change = (result[key] - base[key]) / base[key] * 100
+                parts.append(f"{key} {change:+.1f}%")
+        print(f"  {name}: " + ", ".join(parts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help='single-fetch requests')
+    parser.add_argument('--hours', type=int, default=24, help='window per single fetch')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per monitor/fleet run')
+    parser.add_argument('--accounts', type=int, default=500, help='fleet size')
+    parser.add_argument('--interval', type=float, default=2.0, help='fleet update interval')
+    parser.add_argument('--latency', type=float, default=0.0, help='mock server latency (s)')
+    parser.add_argument('--error-rate', action='append', default=[], metavar='STATUS=RATE')
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'results', 'latest.json'))
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    args = parser.parse_args()
+
+    error_rates = {int(s): float(r) for s, r in (item.split('=') for item in args.error_rate)}
+    results: Dict[str, Any] = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': vars(args),
+        'scenarios': {},
+    }
+
+    with MockDexcomServer(latency=args.latency, error_rates=error_rates) as server:
+        scenarios = [
+            ('single_fetch', lambda: bench_single_fetch(server, args.requests, args.hours)),
+            ('monitor', lambda: bench_monitor(server, args.duration)),
+            ('fleet', lambda: bench_fleet(server, args.accounts, args.interval, args.duration)),
+        ]
+        for name, run in scenarios:
+            result = run()
+            results['scenarios'][name] = result
+            print(f"{name:14s} {result['operations']:6d} ops  {result['throughput']:8.1f} ops/s  "
+                  f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                  f"peak {result['peak_memory_kb']:9.1f} KiB")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
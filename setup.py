@@ -38,5 +38,18 @@ setup(
         "web": [
             "flask>=2.0.0",
         ],
+        "websocket": [
+            "flask>=2.0.0",
+            "flask-sock>=0.7",
+        ],
+        "async": [
+            "aiohttp>=3.8",
+        ],
+        "fast": [
+            "orjson>=3.6",
+        ],
+        "numpy": [
+            "numpy>=1.20",
+        ],
     },
 )
\ No newline at end of file
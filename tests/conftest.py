@@ -0,0 +1,22 @@
+import pytest
+
+from DexcomData import DexcomAuth, DexcomData
+from DexcomData.mock_server import MockDexcomServer
+
+
+@pytest.fixture
+def mock_server():
+    with MockDexcomServer(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def auth(mock_server):
+    auth = DexcomAuth('id', 'secret', base_url=mock_server.auth_base_url)
+    assert auth.exchange_code_for_tokens('patient-1')  # the code names the mock account
+    return auth
+
+
+@pytest.fixture
+def data(mock_server):
+    return DexcomData(base_url=mock_server.data_base_url, verbose=False)
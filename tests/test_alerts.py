@@ -0,0 +1,64 @@
+import pytest
+
+from DexcomData import AlertEngine, AlertRule, Reading
+
+START = 1_700_000_000
+
+
+def readings(*values):
+    return [Reading(START + 300 * i, value) for i, value in enumerate(values)]
+
+
+def kinds(events):
+    return [(event.kind, event.value) for event in events]
+
+
+def test_hysteresis_fires_once_and_clears_past_the_clear_level():
+    engine = AlertEngine([AlertRule('low', below=70, clear=80)])
+    events = engine.evaluate('a', readings(90, 65, 60, 72, 78, 81, 68))
+    # 72 and 78 are back above the threshold but below the clear level
+    assert kinds(events) == [('fired', 65), ('cleared', 81), ('fired', 68)]
+    assert engine.active('a') == ['low']
+    assert engine.counts['fired'] == 2 and engine.counts['cleared'] == 1
+
+
+def test_duration_requires_the_condition_to_hold():
+    engine = AlertEngine([AlertRule('high', above=250, duration=600)])
+    assert engine.evaluate('a', readings(260, 260, 200, 260, 260)) == []
+    events = engine.evaluate('a', [Reading(START + 300 * 5, 270)])
+    assert kinds(events) == [('fired', 270)]
+    assert events[0].since == START + 300 * 3
+
+
+def test_snooze_after_firing_suppresses_the_next_episode():
+    engine = AlertEngine([AlertRule('low', below=70, snooze=1800)])
+    events = engine.evaluate('a', readings(65, 75, 65, 75, 75, 75, 75, 65))
+    # Second episode starts 10 minutes after the first fired: snoozed.
+    # The third starts 35 minutes after: past the 30 minute snooze.
+    assert kinds(events) == [('fired', 65), ('cleared', 75), ('fired', 65)]
+    assert engine.counts['suppressed'] == 1
+
+
+def test_manual_snooze_and_reset():
+    engine = AlertEngine([AlertRule('low', below=70)])
+    engine.snooze('a', 'low', 3600, now=START)
+    assert engine.evaluate('a', readings(60, 60)) == []
+    assert engine.active('a') == []
+    engine.reset('a')
+    assert kinds(engine.evaluate('a', readings(60))) == [('fired', 60)]
+
+
+def test_replayed_readings_do_not_alert_again():
+    engine = AlertEngine([AlertRule('low', below=70)])
+    batch = readings(60, 90)
+    assert len(engine.evaluate('a', batch)) == 2
+    assert engine.evaluate('a', batch) == []
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        AlertRule('both', below=70, above=180)
+    with pytest.raises(ValueError):
+        AlertRule('backwards', below=70, clear=60)
+    with pytest.raises(ValueError):
+        AlertEngine([{'name': 'x', 'below': 70}, {'name': 'x', 'above': 180}])
@@ -0,0 +1,45 @@
+import datetime
+
+from DexcomData.backfill import Backfill, plan_windows
+
+
+def test_plan_windows_covers_the_range():
+    assert plan_windows(0, 250, 100) == [(0, 100), (100, 200), (200, 250)]
+    assert plan_windows(10, 10, 100) == []
+
+
+def test_interrupted_backfill_resumes_from_its_checkpoint(mock_server, auth, data, tmp_path):
+    # Window edges fall between samples, so no reading sits on a resume boundary
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp()) - 5 * 86400
+    trace = mock_server.trace('patient-1')
+    start_epoch = now - (now - trace.phase) % trace.period + trace.period // 2
+    start = datetime.datetime.fromtimestamp(start_epoch, datetime.timezone.utc)
+    end = start + datetime.timedelta(days=4)
+    checkpoint = str(tmp_path / 'backfill.json')
+    window = datetime.timedelta(hours=6)
+
+    written, windows_written = [], []
+    first = Backfill(data, window=window, max_workers=2, retry_delay=0, checkpoint=checkpoint)
+
+    def stop_after_three(readings):
+        written.extend(readings)
+        windows_written.append(len(readings))
+        if len(windows_written) == 3:
+            first.cancel()
+
+    partial = first.run(auth.access_token, start, end, stop_after_three)
+    assert not partial['complete']
+    assert 3 <= partial['written_windows'] < partial['windows']
+
+    mock_server.counts.clear()
+    second = Backfill(data, window=window, max_workers=2, retry_delay=0, checkpoint=checkpoint)
+    rest = second.run(auth.access_token, start, end, written.extend)
+    assert rest['complete']
+    assert rest['resumed_from'] == partial['done_until']
+    assert rest['windows'] == partial['windows'] - partial['written_windows']
+    assert mock_server.counts['GET /v3/users/self/egvs 200'] == rest['windows']
+
+    times = [r.system_time for r in written]
+    expected = data.get_glucose_data(auth.access_token, start_time=start, end_time=end)['records']
+    assert times == sorted(set(times))
+    assert len(times) == len(expected)
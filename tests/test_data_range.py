@@ -0,0 +1,46 @@
+import time
+
+RANGES = ['1 hour', '6 hours', '24 hours', '7 days', '30 days']
+
+
+def egv_calls(mock_server):
+    return sum(n for key, n in mock_server.counts.items() if key.startswith('GET /v3/users/self/egvs'))
+
+
+def test_debug_data_availability_downloads_only_the_narrowest_range(mock_server, auth, data):
+    results = data.debug_data_availability(auth.access_token, account='patient-1')
+    assert list(results) == RANGES
+    for entry in results.values():
+        assert set(entry) == {'hours', 'record_count', 'has_data'}
+        assert entry['has_data']
+    assert 0 < results['1 hour']['record_count'] <= 12
+    assert all(results[name]['record_count'] is None for name in RANGES[1:])
+    # One bounds request and one 1-hour download
+    assert egv_calls(mock_server) == 1
+
+
+def test_debug_data_availability_widens_past_an_empty_window(mock_server, auth, data, monkeypatch):
+    # Readings stop 3 hours ago although the bounds claim a current one
+    mock_server.publish_lag = 3 * 3600
+    now = int(time.time())
+    monkeypatch.setattr(data, 'get_data_range', lambda *args, **kwargs: (now - 86400 * 60, now))
+    results = data.debug_data_availability(auth.access_token, account='patient-1')
+    assert results['1 hour'] == {'hours': 1, 'record_count': 0, 'has_data': False}
+    assert 0 < results['6 hours']['record_count'] <= 36
+    assert results['24 hours'] == {'hours': 24, 'record_count': None, 'has_data': True}
+    assert egv_calls(mock_server) == 2
+
+
+def test_debug_data_availability_count_all(mock_server, auth, data):
+    results = data.debug_data_availability(auth.access_token, account='patient-1', count_all=True)
+    counts = [results[name]['record_count'] for name in RANGES]
+    assert counts == sorted(counts) and counts[0] > 0
+    assert all(entry['has_data'] for entry in results.values())
+    assert egv_calls(mock_server) == 1
+
+
+def test_get_data_range_is_cached_per_account(mock_server, auth, data):
+    bounds = data.get_data_range(auth.access_token, account='patient-1')
+    assert bounds is not None and bounds[0] < bounds[1]
+    assert data.data_ranges['patient-1'] == bounds
+    assert data.get_data_range(auth.access_token, account='patient-1') == bounds
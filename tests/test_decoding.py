@@ -0,0 +1,64 @@
+import datetime
+import json
+
+import pytest
+
+from DexcomData.backfill import Backfill
+from DexcomData.decoding import iter_records
+
+BODY = json.dumps({'recordType': 'egv', 'userId': 'records',
+                   'records': [{'systemTime': f'2024-01-01T00:{i:02d}:00', 'value': 100 + i}
+                               for i in range(20)]}).encode()
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_iter_records_matches_a_whole_body_parse_for_any_chunking():
+    expected = json.loads(BODY)['records']
+    for size in (1, 3, 7, 64, len(BODY)):
+        assert list(iter_records(chunked(BODY, size))) == expected
+
+
+@pytest.mark.parametrize('cut', [5, 40, len(BODY) // 2, len(BODY) - 3])
+def test_iter_records_rejects_truncated_bodies(cut):
+    with pytest.raises(ValueError):
+        list(iter_records(chunked(BODY[:cut], 16)))
+
+
+@pytest.mark.parametrize('body', [b'', b'<html><body>Service unavailable</body></html>',
+                                  b'{"records": [{"value": 1}, oops]}', b'{"records": 5}'])
+def test_iter_records_rejects_non_json_bodies(body):
+    with pytest.raises(ValueError):
+        list(iter_records(chunked(body, 8)))
+
+
+def test_streamed_non_json_body_raises_value_error(mock_server, auth, data):
+    mock_server.malformed_rate = 1.0
+    with pytest.raises(ValueError):
+        list(data.iter_glucose_data(auth.access_token, hours_back=3))
+
+
+def test_non_json_body_is_an_error_not_an_exception(mock_server, auth, data):
+    mock_server.malformed_rate = 1.0
+    result = data.get_glucose_data(auth.access_token, hours_back=3)
+    assert result['status_code'] == 200
+    assert 'error' in result and result['records'] == []
+
+
+def test_backfill_retries_windows_with_non_json_bodies(mock_server, auth, data):
+    end = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=3)
+    expected = len(data.get_glucose_data(auth.access_token, start_time=start, end_time=end)['records'])
+
+    mock_server.malformed_rate = 0.5
+    mock_server.counts.clear()
+    written = []
+    backfill = Backfill(data, window=datetime.timedelta(hours=6), max_workers=1,
+                        retries=10, retry_delay=0)
+    stats = backfill.run(auth.access_token, start, end, written.extend)
+
+    assert stats['complete']
+    assert len(written) == expected
+    assert mock_server.counts['GET /v3/users/self/egvs 200'] > stats['windows']
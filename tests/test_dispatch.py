@@ -0,0 +1,110 @@
+import threading
+import time
+
+from DexcomData import CallbackDispatcher, DexcomMonitor
+
+
+def collect():
+    calls = []
+    lock = threading.Lock()
+
+    def record(*args):
+        with lock:
+            calls.append(args)
+    return calls, record
+
+
+def test_drop_policy_rejects_calls_when_full():
+    calls, record = collect()
+    dispatcher = CallbackDispatcher(max_queue=2, workers=1, policy='drop')
+    assert dispatcher.submit(record, 1)
+    assert dispatcher.submit(record, 2)
+    assert not dispatcher.submit(record, 3)
+    dispatcher.start()
+    dispatcher.stop()
+    assert calls == [(1,), (2,)]
+    assert dispatcher.counts['dropped'] == 1
+
+
+def test_block_policy_waits_for_space():
+    calls, record = collect()
+    release = threading.Event()
+    dispatcher = CallbackDispatcher(max_queue=1, workers=1, policy='block', block_timeout=5)
+    dispatcher.start()
+    dispatcher.submit(lambda: release.wait(5))  # occupies the only worker
+    time.sleep(0.05)
+    dispatcher.submit(record, 1)                # fills the queue
+    threading.Timer(0.1, release.set).start()
+    assert dispatcher.submit(record, 2)         # waits until the worker frees the slot
+    dispatcher.stop()
+    assert calls == [(1,), (2,)]
+    assert dispatcher.counts['blocked'] == 1
+
+
+def test_block_policy_drops_after_timeout():
+    calls, record = collect()
+    dispatcher = CallbackDispatcher(max_queue=1, workers=1, policy='block', block_timeout=0.05)
+    dispatcher.submit(record, 1)
+    assert not dispatcher.submit(record, 2)
+    dispatcher.start()
+    dispatcher.stop()
+    assert calls == [(1,)]
+
+
+def test_coalesce_replaces_queued_arguments_for_same_callback_and_key():
+    calls, record = collect()
+    dispatcher = CallbackDispatcher(workers=1, policy='coalesce')
+    dispatcher.submit(record, 'a1', key='alice')
+    dispatcher.submit(record, 'b1', key='bob')
+    dispatcher.submit(record, 'a2', key='alice')
+    dispatcher.start()
+    dispatcher.stop()
+    assert calls == [('a2',), ('b1',)]
+    assert dispatcher.counts['coalesced'] == 1
+
+
+def test_coalesce_keeps_distinct_lambdas_with_the_same_key_apart():
+    first, second = [], []
+    dispatcher = CallbackDispatcher(workers=1, policy='coalesce')
+    dispatcher.submit(lambda reading: first.append(reading), 'r1', key='self')
+    dispatcher.submit(lambda reading, forecast: second.append((reading, forecast)), 'r1', 'f1', key='self')
+    dispatcher.start()
+    dispatcher.stop()
+    assert first == ['r1']
+    assert second == [('r1', 'f1')]
+    assert dispatcher.counts['coalesced'] == 0
+
+
+def test_coalesce_keeps_bound_methods_of_different_instances_apart():
+    class Sink:
+        def __init__(self):
+            self.readings = []
+
+        def on_reading(self, reading):
+            self.readings.append(reading)
+
+    one, two = Sink(), Sink()
+    dispatcher = CallbackDispatcher(workers=1, policy='coalesce')
+    dispatcher.submit(one.on_reading, 'r1', key='self')
+    dispatcher.submit(two.on_reading, 'r1', key='self')
+    dispatcher.submit(one.on_reading, 'r2', key='self')  # same bound method: coalesced
+    dispatcher.start()
+    dispatcher.stop()
+    assert one.readings == ['r2']
+    assert two.readings == ['r1']
+
+
+def test_monitor_delivers_every_lambda_callback_through_dispatcher(auth, data):
+    received = {'reading': [], 'metrics': [], 'trend': []}
+    dispatcher = CallbackDispatcher(policy='coalesce')
+    monitor = DexcomMonitor(auth, data, update_interval=60, account='patient-1', dispatcher=dispatcher)
+    monitor.set_callback(lambda reading: received['reading'].append(reading))
+    monitor.set_metrics_callback(lambda reading, metrics: received['metrics'].append(metrics))
+    monitor.set_trend_callback(lambda reading, forecast: received['trend'].append(forecast))
+    assert monitor.start_monitoring()
+    deadline = time.time() + 5
+    while time.time() < deadline and not all(received.values()):
+        time.sleep(0.02)
+    monitor.stop_monitoring()
+    assert all(received.values()), received
+    assert dispatcher.stats()['callbacks']
@@ -0,0 +1,45 @@
+import time
+
+from DexcomData import FleetMonitor
+
+
+def live_entries(fleet, account):
+    entry = fleet.accounts.get(account)
+    return [item for item in fleet._heap if entry is not None and item[2] == account
+            and item[3] == entry.generation]
+
+
+def test_re_added_account_is_scheduled_once(mock_server, auth, data):
+    fleet = FleetMonitor(update_interval=0.5, jitter=0)
+    fleet.add_account('patient-1', auth, data, first_poll=time.monotonic())
+    fleet.remove_account('patient-1')
+    fleet.add_account('patient-1', auth, data, first_poll=time.monotonic())
+    assert len(live_entries(fleet, 'patient-1')) == 1
+
+    fleet.start_monitoring()
+    try:
+        time.sleep(1.2)
+    finally:
+        fleet.stop_monitoring()
+    # Polls due at 0, 0.5 and 1.0 s; a duplicate schedule would double them
+    assert fleet.accounts['patient-1'].polls <= 3
+    assert len(live_entries(fleet, 'patient-1')) <= 1
+
+
+def test_replacing_an_account_drops_its_old_schedule(mock_server, auth, data):
+    fleet = FleetMonitor(update_interval=60)
+    fleet.add_account('patient-1', auth, data)
+    fleet.add_account('patient-1', auth, data)
+    fleet.remove_account('patient-1')
+    fleet.add_account('patient-1', auth, data)
+    assert len(live_entries(fleet, 'patient-1')) == 1
+    assert len(fleet._heap) == 3
+
+
+def test_removing_an_account_drops_its_incremental_state(mock_server, auth, data):
+    fleet = FleetMonitor(update_interval=60)
+    fleet.add_account('patient-1', auth, data)
+    assert fleet.poll_account(fleet.accounts['patient-1']) is not None
+    assert 'patient-1' in data.history and 'patient-1' in data.last_seen
+    fleet.remove_account('patient-1')
+    assert 'patient-1' not in data.history and 'patient-1' not in data.last_seen
@@ -0,0 +1,62 @@
+import datetime
+
+from DexcomData import DexcomData, ReadingSeries
+from DexcomData.timestamps import from_epoch
+
+START = 1_700_000_000
+
+
+def records(indices):
+    return [{'systemTime': from_epoch(START + 300 * i), 'value': 100 + i} for i in indices]
+
+
+def test_merge_orders_newest_first_responses_and_skips_duplicates():
+    data = DexcomData(verbose=False)
+    first = data._merge_incremental('a', {'records': records(range(9, -1, -1))})
+    assert [r.system_time for r in first] == [START + 300 * i for i in range(10)]
+
+    # Overlapping response: only the readings after the last seen one are new
+    second = data._merge_incremental('a', {'records': records(range(14, 4, -1))})
+    assert [r.value for r in second] == [110, 111, 112, 113, 114]
+    assert len(data.history['a']) == 15
+    assert list(data.history['a'].system_time) == sorted(data.history['a'].system_time)
+    assert data.last_seen['a'] == START + 300 * 14
+
+
+def test_merge_ignores_records_without_system_time():
+    data = DexcomData(verbose=False)
+    new = data._merge_incremental('a', {'records': records([1]) + [{'value': 99}]})
+    assert [r.value for r in new] == [101]
+
+
+def test_series_from_newest_first_records_is_sorted():
+    series = ReadingSeries(records(range(5, -1, -1)) + records([3]))
+    assert list(series.value) == [100, 101, 102, 103, 104, 105]
+
+
+def test_get_new_readings_fetches_only_newer_readings(mock_server, auth, data):
+    first = data.get_new_readings(auth.access_token, account='patient-1')
+    assert first and [r.system_time for r in first] == sorted(r.system_time for r in first)
+    again = data.get_new_readings(auth.access_token, account='patient-1')
+    assert again == []
+    assert len(data.history['patient-1']) == len(first)
+
+
+def test_history_keeps_only_the_retention_window():
+    data = DexcomData(verbose=False, history_retention=datetime.timedelta(hours=1))
+    for day in range(3):
+        data._merge_incremental('a', {'records': records(range(288 * day + 287, 288 * day - 1, -1))})
+    history = data.history['a']
+    assert len(history) == 13
+    assert history.system_time[0] == data.last_seen['a'] - 3600
+
+    unbounded = DexcomData(verbose=False, history_retention=None)
+    unbounded._merge_incremental('a', {'records': records(range(288 * 3))})
+    assert len(unbounded.history['a']) == 288 * 3
+
+
+def test_series_drop_before():
+    series = ReadingSeries(records(range(10)))
+    assert series.drop_before(START + 300 * 4) == 4
+    assert list(series.value) == list(range(104, 110))
+    assert series.drop_before(START) == 0
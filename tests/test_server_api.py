@@ -0,0 +1,102 @@
+import os
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('dotenv')
+os.environ.setdefault('DEXCOM_STORE_PATH', ':memory:')
+
+from DexcomData import sever2_0 as server
+
+
+@pytest.fixture
+def client(mock_server, monkeypatch):
+    monkeypatch.setattr(server, 'TOKEN_URL', mock_server.auth_base_url + '/oauth2/token')
+    monkeypatch.setattr(server, 'DATA_URL', mock_server.data_base_url + '/users/self/egvs')
+    client = server.app.test_client()
+    location = client.get('/login').headers['Location']
+    state = parse_qs(urlparse(location).query)['state'][0]
+    client.get(f'/callback?code=api-test&state={state}')
+    yield client
+    server.sessions.remove('api-test')
+
+
+def test_readings_requires_login():
+    response = server.app.test_client().get('/api/readings?account=nobody')
+    assert response.status_code == 401
+
+
+def test_cursor_pagination_walks_every_reading_once(client):
+    everything = client.get('/api/readings?account=api-test&limit=10000').get_json()
+    assert everything['next_cursor'] is None
+    end = everything['end']
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = f'/api/readings?account=api-test&end={end}&limit=100&fields=systemTime'
+        page = client.get(query + (f'&cursor={cursor}' if cursor else '')).get_json()
+        seen.extend(r['systemTime'] for r in page['readings'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [r['systemTime'] for r in everything['readings']]
+    assert len(seen) == len(set(seen)) > 100
+    assert pages == -(-len(seen) // 100)
+
+
+def test_field_projection_and_full_precision_trend_rate(client):
+    server.store.upsert('api-test', [{'systemTime': '2030-01-01T00:00:00', 'value': 120,
+                                      'trend': 'flat', 'trendRate': -0.2}])
+    page = client.get('/api/readings?account=api-test&start=2030-01-01T00:00:00'
+                      '&end=2030-01-01T00:00:00&fields=value,trendRate').get_json()
+    assert page['readings'] == [{'value': 120, 'trendRate': -0.2}]
+
+
+def test_invalid_parameters_are_rejected(client):
+    for query in ('fields=nope', 'limit=0', 'cursor=x', 'start=yesterday'):
+        response = client.get('/api/readings?account=api-test&' + query)
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+
+def test_large_pages_are_gzipped_when_accepted(client):
+    response = client.get('/api/readings?account=api-test', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert client.get('/api/readings?account=api-test').headers.get('Content-Encoding') is None
+
+
+def test_merge_tracks_the_newest_record(client):
+    session = server.sessions.get('api-test')
+    current = session.latest_reading
+    older = {'systemTime': '2000-01-01T00:00:00', 'value': 50}
+    newer = {'systemTime': '2099-01-01T00:00:00', 'value': 150}
+    server.merge_glucose_data(session, {'records': [older]})
+    assert session.latest_reading['systemTime'] == current['systemTime']
+    server.merge_glucose_data(session, {'records': [newer]})
+    assert session.latest_reading is newer
+
+
+def test_failed_fetch_keeps_the_held_window(client):
+    session = server.sessions.get('api-test')
+    data, reading, _, views = session.snapshot
+    error = {'error': '503 Server Error', 'status_code': 503}
+    server.merge_glucose_data(session, error)
+    assert session.latest_data is data and session.latest_reading is reading
+    assert session.views is views
+    assert session.last_error == error
+
+    newer = {'systemTime': '2099-01-01T00:00:00', 'value': 150}
+    server.merge_glucose_data(session, {'records': [newer]})
+    assert session.last_error is None
+    assert session.latest_reading is newer
+    assert len(session.latest_data['records']) == len(data['records']) + 1
+
+
+def test_connection_failure_is_reported_as_an_error(monkeypatch):
+    # Nothing listens on port 1, so the request fails before any response exists
+    monkeypatch.setattr(server, 'DATA_URL', 'http://127.0.0.1:1/v3/users/self/egvs')
+    result = server.get_glucose_data('token')
+    assert result['status_code'] == 'unknown' and 'error' in result
@@ -0,0 +1,64 @@
+import os
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('dotenv')
+os.environ.setdefault('DEXCOM_STORE_PATH', ':memory:')
+
+from DexcomData import sever2_0 as server
+
+
+def sign_in(client, code):
+    location = client.get('/login').headers['Location']
+    state = parse_qs(urlparse(location).query)['state'][0]
+    return client.get(f'/callback?code={code}&state={state}')
+
+
+@pytest.fixture
+def clients(mock_server, monkeypatch):
+    monkeypatch.setattr(server, 'TOKEN_URL', mock_server.auth_base_url + '/oauth2/token')
+    monkeypatch.setattr(server, 'DATA_URL', mock_server.data_base_url + '/users/self/egvs')
+    alice, bob = server.app.test_client(), server.app.test_client()
+    sign_in(alice, 'alice')
+    sign_in(bob, 'bob')
+    yield alice, bob
+    for account in ('alice', 'bob'):
+        server.sessions.remove(account)
+
+
+def test_sessions_are_keyed_by_dexcom_user_id(clients):
+    alice, _ = clients
+    assert server.sessions.get('alice').is_authenticated()
+    assert server.sessions.get('bob').is_authenticated()
+    assert alice.get('/data').status_code == 200
+    assert alice.get('/api/readings?fields=value').get_json()['account'] == 'alice'
+
+
+def test_other_accounts_are_forbidden(clients):
+    alice, _ = clients
+    for path in ('/data', '/api/readings', '/stream'):
+        assert alice.get(path + '?account=bob').status_code == 403
+
+
+def test_requests_without_the_session_cookie_are_rejected(clients):
+    stranger = server.app.test_client()
+    for path in ('/data', '/data?account=alice', '/api/readings?account=alice', '/stream?account=alice'):
+        assert stranger.get(path).status_code == 401
+
+
+def test_forged_session_cookie_is_rejected(clients):
+    forger = server.app.test_client()
+    forger.set_cookie(server.app.config['SESSION_COOKIE_NAME'], 'eyJhY2NvdW50IjoiYWxpY2UifQ.forged')
+    assert forger.get('/data').status_code == 401
+
+
+def test_callback_needs_the_state_issued_to_this_browser(clients, mock_server):
+    alice, _ = clients
+    location = server.app.test_client().get('/login').headers['Location']
+    state = parse_qs(urlparse(location).query)['state'][0]
+    # Someone else's login link opened in alice's browser does not sign it in as mallory
+    assert alice.get(f'/callback?code=mallory&state={state}').status_code == 403
+    assert 'mallory' not in server.sessions
+    assert alice.get('/api/readings?fields=value').get_json()['account'] == 'alice'
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from DexcomData.sessions import AccountSession, RefreshScheduler, SessionStore
+
+
+def recording_scheduler():
+    refreshed = []
+    done = threading.Condition()
+
+    def refresh(session):
+        with done:
+            refreshed.append((session.account, threading.current_thread().name))
+            done.notify_all()
+
+    return RefreshScheduler(refresh), refreshed, done
+
+
+def test_refreshes_run_in_due_order_on_one_thread():
+    scheduler, refreshed, done = recording_scheduler()
+    sessions = [AccountSession(f'user-{i}') for i in range(50)]
+    for i, session in enumerate(sessions):
+        scheduler.schedule(session, 0.2 - i * 0.003)
+    threads_before = threading.active_count()
+
+    with done:
+        assert done.wait_for(lambda: len(refreshed) == 50, timeout=5)
+    assert [account for account, _ in refreshed] == [s.account for s in reversed(sessions)]
+    assert {thread for _, thread in refreshed} == {'dexcom-token-refresh'}
+    assert threading.active_count() <= threads_before
+    assert scheduler.pending() == 0
+
+
+def test_rescheduling_replaces_and_cancel_drops_the_pending_refresh():
+    scheduler, refreshed, done = recording_scheduler()
+    moved, cancelled = AccountSession('moved'), AccountSession('cancelled')
+    scheduler.schedule(moved, 0.05)
+    scheduler.schedule(moved, 0.3)
+    scheduler.schedule(cancelled, 0.05)
+    cancelled.cancel_refresh()
+    assert scheduler.pending() == 1
+
+    time.sleep(0.15)
+    assert refreshed == []
+    with done:
+        assert done.wait_for(lambda: refreshed, timeout=5)
+    time.sleep(0.05)
+    assert [account for account, _ in refreshed] == ['moved']
+
+
+def test_removing_a_session_cancels_its_refresh():
+    scheduler, refreshed, _ = recording_scheduler()
+    store = SessionStore()
+    scheduler.schedule(store.get_or_create('gone'), 0.05)
+    store.remove('gone')
+    time.sleep(0.15)
+    assert refreshed == [] and scheduler.pending() == 0
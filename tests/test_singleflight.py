@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from DexcomData import DexcomData, SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'records': []}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('k', fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do('k', fetch)))
+                 for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    while flights._calls['k'].waiters < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 6 and all(r is results[0] for r in results)
+    stats = flights.stats()
+    assert (stats['misses'], stats['shared'], stats['hits']) == (1, 5, 0)
+
+
+def test_no_ttl_does_not_reuse_finished_results():
+    flights = SingleFlight()
+    assert flights.do('k', lambda: 1) == 1
+    assert flights.do('k', lambda: 2) == 2
+    assert flights.stats()['cached'] == 0
+
+
+def test_ttl_caches_until_expiry():
+    flights = SingleFlight(ttl=0.1)
+    assert flights.do('k', lambda: 1) == 1
+    assert flights.do('k', lambda: 2) == 1
+    assert flights.stats()['hits'] == 1
+    time.sleep(0.15)
+    assert flights.do('k', lambda: 3) == 3
+
+
+def test_uncacheable_results_and_exceptions_are_not_cached():
+    flights = SingleFlight(ttl=60)
+    error = {'error': 'boom'}
+    assert flights.do('k', lambda: error, cacheable=lambda d: 'error' not in d) is error
+    assert flights.do('k', lambda: {'records': []}, cacheable=lambda d: 'error' not in d) == {'records': []}
+
+    def fail():
+        raise RuntimeError('down')
+
+    with pytest.raises(RuntimeError):
+        flights.do('other', fail)
+    assert flights.do('other', lambda: 'ok') == 'ok'
+    assert flights.stats()['errors'] == 1
+
+
+def test_dexcom_data_does_not_cache_errors(mock_server):
+    mock_server.strict_tokens = True
+    data = DexcomData(base_url=mock_server.data_base_url, verbose=False,
+                      single_flight=SingleFlight(ttl=60))
+    assert 'error' in data.get_glucose_data('not-a-token')
+    assert 'error' in data.get_glucose_data('not-a-token')
+    assert mock_server.counts.get('GET /v3/users/self/egvs 401') == 2
+
+
+def test_dexcom_data_fetches_again_by_default(mock_server, auth, data):
+    data.get_glucose_data(auth.access_token)
+    data.get_latest_reading(auth.access_token)
+    assert mock_server.counts['GET /v3/users/self/egvs 200'] == 2
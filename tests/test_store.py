@@ -0,0 +1,54 @@
+import datetime
+
+from DexcomData import ReadingStore
+from DexcomData.timestamps import from_epoch
+
+
+def test_missing_intervals_merges_adjacent_and_overlapping_fetches():
+    store = ReadingStore(':memory:')
+    assert store.missing_intervals('a', 0, 100) == [(0, 100)]
+    store.mark_fetched('a', 10, 30)
+    store.mark_fetched('a', 60, 80)
+    assert store.missing_intervals('a', 0, 100) == [(0, 10), (30, 60), (80, 100)]
+    store.mark_fetched('a', 25, 65)  # bridges both
+    assert store.missing_intervals('a', 0, 100) == [(0, 10), (80, 100)]
+    assert store.missing_intervals('a', 20, 70) == []
+    assert store.missing_intervals('b', 20, 70) == [(20, 70)]
+
+
+def test_upsert_query_and_limit():
+    store = ReadingStore(':memory:')
+    records = [{'systemTime': from_epoch(1000 + 300 * i), 'value': 100 + i} for i in range(10)]
+    assert store.upsert('a', records[::-1]) == 10
+    store.upsert('a', [{'systemTime': from_epoch(1000), 'value': 42}])  # update in place
+    assert store.count('a') == 10
+    series = store.query('a', 1000, 1000 + 300 * 9, limit=3)
+    assert list(series.value) == [42, 101, 102]
+    assert store.latest('a').value == 109
+    assert store.accounts() == ['a']
+
+
+def utc(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+
+
+def test_get_range_fetches_only_missing_intervals(mock_server, auth, data):
+    store = ReadingStore(':memory:')
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+    start, end = now - 3 * 86400, now - 2 * 86400
+    egv = 'GET /v3/users/self/egvs 200'
+
+    first = data.get_range(auth.access_token, utc(start), utc(end), store, account='patient-1')
+    assert len(first) > 250
+    assert store.missing_intervals('patient-1', start, end) == []
+    calls = mock_server.counts[egv]
+
+    # Fully stored: answered without touching the API
+    again = data.get_range(auth.access_token, utc(start), utc(end), store, account='patient-1')
+    assert list(again.system_time) == list(first.system_time)
+    assert mock_server.counts[egv] == calls
+
+    # Extending the range fetches only the new part
+    data.get_range(auth.access_token, utc(start - 3600), utc(end), store, account='patient-1')
+    assert mock_server.counts[egv] == calls + 1
+    assert store.missing_intervals('patient-1', start - 3600, end) == []
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from DexcomData import DexcomAuth, DexcomData
+from DexcomData.mock_server import MockDexcomServer
+
+REFRESHES = 'POST /v2/oauth2/token 200'
+
+
+@pytest.fixture
+def short_lived():
+    # Two-second tokens that the data endpoint really rejects once expired
+    with MockDexcomServer(token_lifetime=2, strict_tokens=True, seed=1) as server:
+        yield server
+
+
+def signed_in(server, **options):
+    auth = DexcomAuth('id', 'secret', base_url=server.auth_base_url, **options)
+    assert auth.exchange_code_for_tokens('patient-1')
+    return auth
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_get_access_token_refreshes_only_inside_the_margin(short_lived):
+    auth = signed_in(short_lived, refresh_margin=1)
+    first = auth.access_token
+    assert auth.get_access_token() == first
+    assert short_lived.counts[REFRESHES] == 1
+
+    time.sleep(1.1)
+    assert auth.get_access_token() != first
+    assert short_lived.counts[REFRESHES] == 2
+    assert auth.token_expires_in() > 1.5
+
+
+def test_auto_refresh_fires_margin_seconds_before_expiry(short_lived):
+    auth = signed_in(short_lived, refresh_margin=1.5)
+    first, issued = auth.access_token, time.monotonic()
+    auth.start_auto_refresh()
+    try:
+        assert wait_for(lambda: auth.access_token != first, timeout=3)
+        elapsed = time.monotonic() - issued
+        assert 0.3 <= elapsed < 1.5
+        # The new token works past the first one's expiry
+        time.sleep(max(2.2 - elapsed, 0))
+        data = DexcomData(base_url=short_lived.data_base_url, verbose=False)
+        assert 'error' not in data.get_glucose_data(auth.access_token, hours_back=1)
+    finally:
+        auth.stop_auto_refresh()
+
+
+def test_failed_auto_refresh_is_retried_after_retry_interval(short_lived):
+    auth = signed_in(short_lived, refresh_margin=1.9, retry_interval=0.2)
+    first = auth.access_token
+    short_lived.error_rates = {503: 1.0}
+    auth.start_auto_refresh()
+    try:
+        time.sleep(0.45)
+        failures = short_lived.counts.get('POST /v2/oauth2/token 503', 0)
+        assert 2 <= failures <= 3
+        assert auth.access_token == first  # still valid, so kept while retrying
+        short_lived.error_rates = {}
+        assert wait_for(lambda: auth.access_token != first, timeout=1)
+        assert auth.token_expires_in() > 1.5
+    finally:
+        auth.stop_auto_refresh()